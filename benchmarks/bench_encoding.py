@@ -0,0 +1,96 @@
+# encoding time and size of stills per encoder profile, on the reference 360 frame examples/GS__2098.JPG, and per encoder
+# on synthetic frames of increasing size. Run with asv, or directly with `python benchmarks/bench_encoding.py` to print
+# a table of encode time and bytes per frame.
+import io
+import os
+import sys
+import time
+import cv2
+import odmax
+
+try:
+    from . import fixtures
+except ImportError:
+    import fixtures
+
+REFERENCE_FRAME = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "GS__2098.JPG")
+ENCODERS = ["jpg", "png", "webp"]
+PROFILES = [None] + list(odmax.io.PROFILES)
+# EXIF tag with a location, as written to each still
+EXIF_BYTES = odmax.exif.ExifTemplate().dump(52.0, 4.0, 10.0)
+
+
+def encode(img, encoder, profile, backend="opencv"):
+    """
+    Encode one frame to bytes
+
+    :param img: ND-array [H, W, 3], BGR frame
+    :param encoder: str, encoder
+    :param profile: str, encoder profile
+    :param backend: str, writing backend (default: "opencv")
+    :return: bytes, encoded frame
+    """
+    buffer = io.BytesIO()
+    odmax.io.write_frame(img, buffer, encoder=encoder, exif_bytes=EXIF_BYTES, backend=backend, profile=profile)
+    return buffer.getvalue()
+
+
+class Encoding:
+    params = (ENCODERS, PROFILES)
+    param_names = ["encoder", "profile"]
+
+    def setup(self, encoder, profile):
+        self.img = cv2.imread(REFERENCE_FRAME)
+
+    def time_encode(self, encoder, profile):
+        encode(self.img, encoder, profile)
+
+    def track_bytes(self, encoder, profile):
+        return len(encode(self.img, encoder, profile))
+    track_bytes.unit = "bytes"
+
+
+class EncodingWidth:
+    params = (ENCODERS, fixtures.WIDTHS)
+    param_names = ["encoder", "width"]
+    timeout = 300
+
+    def setup(self, encoder, width):
+        self.img = fixtures.equirect_frame(width // 2, width)
+
+    def time_encode(self, encoder, width):
+        encode(self.img, encoder, None)
+
+    def track_bytes(self, encoder, width):
+        return len(encode(self.img, encoder, None))
+    track_bytes.unit = "bytes"
+
+
+def profile_table(repeat=3):
+    """
+    Make a reStructuredText table with encode time and bytes per frame for each encoder and profile
+
+    :param repeat: int, amount of encodings per encoder and profile, the fastest is reported (default: 3)
+    :return: str, table
+    """
+    img = cv2.imread(REFERENCE_FRAME)
+    rows = []
+    for encoder in ENCODERS:
+        for profile in PROFILES:
+            times = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                data = encode(img, encoder, profile)
+                times.append(time.perf_counter() - t0)
+            rows.append((encoder, profile or "(default)", f"{min(times) * 1000:.0f}", f"{len(data) / 1024:.0f}"))
+    header = ("Encoder", "Profile", "Encode time (ms)", "Size (kB)")
+    widths = [max(len(r[i]) for r in rows + [header]) for i in range(len(header))]
+    line = "  ".join("=" * w for w in widths)
+    fmt = lambda r: "  ".join(c.ljust(w) for c, w in zip(r, widths)).rstrip()
+    return "\n".join([line, fmt(header), line] + [fmt(r) for r in rows] + [line])
+
+
+if __name__ == "__main__":
+    shape = cv2.imread(REFERENCE_FRAME).shape
+    print(f"Reference frame {os.path.basename(REFERENCE_FRAME)} ({shape[1]} x {shape[0]} pixels), {sys.platform}")
+    print(profile_table())
@@ -0,0 +1,50 @@
+# building of EXIF tags with GPS locations for many frames: the EXIF template of odmax (odmax.exif.ExifTemplate) that
+# patches all locations into one serialised tag, against building and serialising a tag per frame with piexif. Also the
+# tags of 360 photos, that are read and reduced once per photo and written to every cube face.
+import os
+import piexif
+import odmax
+
+try:
+    from . import fixtures
+except ImportError:
+    import fixtures
+
+REFERENCE_PHOTO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "GS__2098.JPG")
+FRAME_COUNTS = [1, 100, 10000]
+# static EXIF tags of videos from a GoPro Max
+STATIC_TAGS = {"0th": {piexif.ImageIFD.Make: "GoPro", piexif.ImageIFD.Model: "GoPro Max"}}
+
+
+class ExifTags:
+    params = FRAME_COUNTS
+    param_names = ["frames"]
+
+    def setup(self, frames):
+        self.lat, self.lon, self.elev, _ = fixtures.gps_track(frames)
+        self.template = odmax.exif.ExifTemplate(STATIC_TAGS)
+
+    def time_template(self, frames):
+        odmax.exif.ExifTemplate(STATIC_TAGS)
+
+    def time_dump_batch(self, frames):
+        self.template.dump_batch(self.lat, self.lon, self.elev)
+
+    def time_dump_per_frame(self, frames):
+        # baseline, a tag is built and serialised with piexif for each frame
+        for lat, lon, elev in zip(self.lat, self.lon, self.elev):
+            odmax.exif.dump({**STATIC_TAGS, "GPS": odmax.exif.set_gps_location(lat, lon, elev)})
+
+
+class StillTags:
+    def setup(self):
+        self.exif_dict = piexif.load(REFERENCE_PHOTO)
+
+    def time_load(self):
+        piexif.load(REFERENCE_PHOTO)
+
+    def time_face_tags(self):
+        odmax.exif.dump(odmax.exif.face_tags(self.exif_dict))
+
+    def time_still(self):
+        odmax.Still(REFERENCE_PHOTO)
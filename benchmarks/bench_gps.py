@@ -0,0 +1,48 @@
+# interpolation of synthetic GPS tracks of increasing length to frame timestamps, and selection of frames by distance.
+# The tracks belong to a small synthetic video of 100 seconds, and are read from the GPS track cache (odmax.cache).
+import numpy as np
+import odmax
+
+try:
+    from . import fixtures
+except ImportError:
+    import fixtures
+
+TRACK_LENGTHS = [100, 10000, 1000000]
+# frames of the synthetic video, 100 seconds at 30 frames per second
+N_FRAMES = 3000
+# amount of timestamps interpolated at once, and distance between frames selected by distance in metres
+N_TIMESTAMPS = 1000
+DISTANCE = 1.
+
+
+class GPS:
+    params = TRACK_LENGTHS
+    param_names = ["track_length"]
+
+    def setup(self, track_length):
+        fixtures.setup_cache()
+        self.video = fixtures.open_video(32, 64, n_frames=N_FRAMES, gps_points=track_length)
+        duration = N_FRAMES / fixtures.FPS
+        rng = np.random.default_rng(0)
+        self.timestamps = fixtures.T0 + np.sort(rng.uniform(0., duration, N_TIMESTAMPS))
+        self.frames = np.arange(0, N_FRAMES, N_FRAMES // N_TIMESTAMPS)
+
+    def teardown(self, track_length):
+        self.video.cap.release()
+        fixtures.teardown_cache()
+
+    def time_open_video(self, track_length):
+        odmax.Video(self.video.fn, cache=True)
+
+    def time_get_gps(self, track_length):
+        self.video.get_gps(self.timestamps[0])
+
+    def time_get_gps_batch(self, track_length):
+        self.video.get_gps_batch(self.timestamps)
+
+    def time_get_coords(self, track_length):
+        self.video.get_coords(self.frames)
+
+    def time_get_frames_by_distance(self, track_length):
+        self.video.get_frames_by_distance(DISTANCE)
@@ -0,0 +1,66 @@
+# startup time of ODMax, measured in a fresh interpreter. Run with asv, or directly with
+# `python benchmarks/bench_import.py` to check the startup time against a time budget, and that the command-line
+# interface and other heavy submodules are not imported by `import odmax`.
+import subprocess
+import sys
+import time
+
+# maximum startup time in seconds, heavy dependencies (pandas, geopandas, matplotlib, scipy) must be imported lazily
+STARTUP_BUDGET = 0.5
+
+IMPORT_ODMAX = "import odmax"
+CLI_HELP = """
+import sys
+from odmax.cli import main
+sys.argv = ["odmax", "--help"]
+try:
+    main()
+except SystemExit:
+    pass
+"""
+
+
+# submodules of odmax that must not be imported by ``import odmax``
+LAZY_MODULES = ["cli", "pipeline", "batch", "stills", "upload", "rig"]
+EAGER_MODULES = f"""
+import sys
+import odmax
+print(" ".join(name for name in {LAZY_MODULES!r} if "odmax." + name in sys.modules))
+"""
+
+
+def timeraw_import_odmax():
+    return IMPORT_ODMAX
+
+
+def timeraw_cli_help():
+    return CLI_HELP
+
+
+def startup_time(code, repeat=5):
+    """
+    Measure the time needed to run code in a fresh interpreter
+
+    :param code: str, python code
+    :param repeat: int, amount of runs, the fastest is returned (default: 5)
+    :return: float, time in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+if __name__ == "__main__":
+    baseline = startup_time("pass")
+    exceeded = False
+    for name, code in [("import odmax", IMPORT_ODMAX), ("odmax --help", CLI_HELP)]:
+        t = startup_time(code) - baseline
+        print(f"{name:15s}: {t:.3f} s (budget {STARTUP_BUDGET:.3f} s)")
+        exceeded = exceeded or t > STARTUP_BUDGET
+    eager = subprocess.run([sys.executable, "-c", EAGER_MODULES], check=True, capture_output=True, text=True).stdout.split()
+    if eager:
+        print(f"imported by 'import odmax': {', '.join(eager)}")
+    sys.exit(1 if exceeded or eager else 0)
@@ -0,0 +1,81 @@
+# end-to-end throughput of the odmax command-line interface in frames per second, on synthetic equirectangular videos
+# with a synthetic GPS track. Run with asv, or directly with `python benchmarks/bench_pipeline.py` to print a table of
+# frames per second.
+import contextlib
+import io
+import shutil
+import sys
+import tempfile
+import time
+from odmax import cli
+
+try:
+    from . import fixtures
+except ImportError:
+    import fixtures
+
+WIDTHS = [fixtures.WIDTHS[0], fixtures.WIDTHS[-1]]
+OUTPUTS = ["equirect", "cube"]
+N_FRAMES = 30
+FRAME_INTERVAL = 3
+
+
+def run_cli(fn, outpath, reproject=False, workers=1):
+    """
+    Process a video with the odmax command-line interface, in the running interpreter and without printing
+
+    :param fn: str, video file
+    :param outpath: str, directory to write the frames to
+    :param reproject: bool, reproject frames to cube faces (default: False)
+    :param workers: int, amount of worker processes (default: 1)
+    :return: float, frames per second
+    """
+    args = ["odmax", "-i", fn, "-o", outpath, "-d", str(FRAME_INTERVAL), "-w", str(workers), "--overwrite"]
+    if reproject:
+        args.append("-r")
+    argv = sys.argv
+    sys.argv = args
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            t0 = time.perf_counter()
+            cli.main()
+            seconds = time.perf_counter() - t0
+    finally:
+        sys.argv = argv
+    return len(range(0, N_FRAMES, FRAME_INTERVAL)) / seconds
+
+
+class Pipeline:
+    params = (WIDTHS, OUTPUTS)
+    param_names = ["width", "output"]
+    timeout = 600
+
+    def setup(self, width, output):
+        fixtures.setup_cache()
+        self.fn = fixtures.make_video(width // 2, width, n_frames=N_FRAMES)
+        self.outpath = tempfile.mkdtemp(prefix="odmax_bench_")
+
+    def teardown(self, width, output):
+        shutil.rmtree(self.outpath, ignore_errors=True)
+        fixtures.teardown_cache()
+
+    def track_frames_per_second(self, width, output):
+        return run_cli(self.fn, self.outpath, reproject=output == "cube")
+    track_frames_per_second.unit = "frames/s"
+
+
+if __name__ == "__main__":
+    print(f"{N_FRAMES // FRAME_INTERVAL} frames of synthetic videos, {sys.platform}")
+    fixtures.setup_cache()
+    try:
+        for width in WIDTHS:
+            fn = fixtures.make_video(width // 2, width, n_frames=N_FRAMES)
+            for output in OUTPUTS:
+                outpath = tempfile.mkdtemp(prefix="odmax_bench_")
+                try:
+                    fps = run_cli(fn, outpath, reproject=output == "cube")
+                finally:
+                    shutil.rmtree(outpath, ignore_errors=True)
+                print(f"{width} x {width // 2} {output:<8} : {fps:.1f} frames/s")
+    finally:
+        fixtures.teardown_cache()
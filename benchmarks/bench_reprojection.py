@@ -0,0 +1,123 @@
+# reprojection of synthetic equirectangular frames at 2K, 4K and 5.7K: construction of the sampling maps, sampling of
+# cube faces and rig views, and stitching of cube faces back to equirectangular frames. The scipy backend is the slow
+# reference implementation, and is only timed on 2K frames.
+import os
+import odmax
+
+try:
+    from . import fixtures
+except ImportError:
+    import fixtures
+
+RIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "rig.json")
+MODES = ["bilinear", "nearest"]
+BACKENDS = ["opencv", "scipy"]
+
+
+def face_width(w, overlap=0.1):
+    """
+    Width of cube faces as chosen by odmax.process.reproject_cube for frames of a given width
+
+    :param w: int, width of the equirectangular frame
+    :param overlap: float, fractional overlap between faces (default: 0.1)
+    :return: int, width of the faces
+    """
+    return odmax.process.cube_kwargs((w // 2, w), overlap=overlap)["face_w"]
+
+
+def get_rig(mode, backend):
+    """
+    Virtual camera rig of examples/rig.json, with the views sampled in a given mode
+
+    :param mode: str, interpolation method
+    :param backend: str, sampling backend
+    :return: odmax.rig.Rig instance
+    """
+    # the mode of the rig file would overrule the mode passed to odmax.rig.Rig.from_file
+    return odmax.rig.Rig(odmax.rig.Rig.from_file(RIG_FILE).views, mode=mode, backend=backend)
+
+
+def skip_reference(width, backend):
+    # asv skips parameter combinations for which setup raises NotImplementedError
+    if backend == "scipy" and width != fixtures.WIDTHS[0]:
+        raise NotImplementedError("the scipy backend is only timed on the smallest frames")
+
+
+class Maps:
+    params = (fixtures.WIDTHS, MODES, BACKENDS)
+    param_names = ["width", "mode", "backend"]
+    timeout = 300
+
+    def setup(self, width, mode, backend):
+        skip_reference(width, backend)
+
+    def time_cube_plan(self, width, mode, backend):
+        # constructed directly, as plans from odmax.plan.get_plan are cached
+        odmax.plan.ReprojectionPlan(
+            width // 2,
+            width,
+            face_w=face_width(width),
+            overlap=0.1,
+            mode=mode,
+            cube_format="list",
+            backend=backend
+        )
+
+    def time_equirect_plan(self, width, mode, backend):
+        odmax.plan.EquirectPlan(width // 2, width, face_width(width, overlap=0.), mode=mode, backend=backend)
+
+    def time_rig_maps(self, width, mode, backend):
+        get_rig(mode, backend).get_maps((width // 2, width))
+
+
+class Sampling:
+    params = (fixtures.WIDTHS, MODES, BACKENDS)
+    param_names = ["width", "mode", "backend"]
+    timeout = 300
+
+    def setup(self, width, mode, backend):
+        skip_reference(width, backend)
+        h = width // 2
+        self.img = fixtures.equirect_frame(h, width)
+        self.plan = odmax.plan.ReprojectionPlan(
+            h,
+            width,
+            face_w=face_width(width),
+            overlap=0.1,
+            mode=mode,
+            cube_format="list",
+            backend=backend
+        )
+        self.faces = self.plan.sample_faces(self.img)
+        self.rig = get_rig(mode, backend)
+        self.rig.get_maps(self.img.shape)
+        # faces without overlap, as stitched by c2e
+        self.cube = odmax.process.reproject_cube(self.img, overlap=0., mode=mode, backend=backend)
+        self.equirect_plan = odmax.plan.get_equirect_plan(h, width, self.cube[0].shape[0], mode=mode, backend=backend)
+
+    def time_sample_faces(self, width, mode, backend):
+        self.plan.sample_faces(self.img)
+
+    def time_sample_faces_out(self, width, mode, backend):
+        # faces sampled into the buffers of a previous frame, as when writing a video
+        self.plan.sample_faces(self.img, out=self.faces)
+
+    def time_reproject_cube(self, width, mode, backend):
+        odmax.process.reproject_cube(self.img, mode=mode, backend=backend, plan=self.plan)
+
+    def time_rig(self, width, mode, backend):
+        self.rig.sample(self.img)
+
+    def time_c2e(self, width, mode, backend):
+        odmax.py360.c2e(
+            self.cube,
+            width // 2,
+            width,
+            mode=mode,
+            cube_format="list",
+            backend=backend,
+            plan=self.equirect_plan
+        )
+
+    def peakmem_sample_faces(self, width, mode, backend):
+        self.plan.sample_faces(self.img)
@@ -0,0 +1,43 @@
+# decoding of synthetic equirectangular videos at 2K, 4K and 5.7K: reading frames by seeking, sequential decoding with
+# odmax.io.iter_frames, and streaming of encoded frames with odmax.Video.stream.
+import odmax
+
+try:
+    from . import fixtures
+except ImportError:
+    import fixtures
+
+N_FRAMES = 30
+FRAME_INTERVAL = 3
+
+
+class Decoding:
+    params = fixtures.WIDTHS
+    param_names = ["width"]
+    timeout = 300
+
+    def setup(self, width):
+        fixtures.setup_cache()
+        self.video = fixtures.open_video(width // 2, width, n_frames=N_FRAMES)
+        self.frames = list(range(0, N_FRAMES, FRAME_INTERVAL))
+
+    def teardown(self, width):
+        self.video.cap.release()
+        fixtures.teardown_cache()
+
+    def time_read_frame(self, width):
+        # every frame is found by seeking
+        for n in self.frames:
+            odmax.io.read_frame(self.video.cap, n)
+
+    def time_iter_frames(self, width):
+        for _ in odmax.io.iter_frames(self.video.cap, self.frames):
+            pass
+
+    def time_stream(self, width):
+        for _ in self.video.stream(frames=self.frames):
+            pass
+
+    def time_stream_read_ahead(self, width):
+        for _ in self.video.stream(frames=self.frames, read_ahead=2):
+            pass
@@ -0,0 +1,146 @@
+# synthetic fixtures for the benchmarks: equirectangular videos written with cv2.VideoWriter and GPS tracks. Fixtures
+# are written once to ODMAX_BENCH_DIR (default: odmax_bench in the temporary directory) and reused by later runs. The
+# GPS tracks of the videos are kept in a temporary GPS track cache, see setup_cache, the cache of the user is not used.
+import os
+import shutil
+import tempfile
+import cv2
+import numpy as np
+import odmax
+
+FIXTURE_DIR = os.environ.get("ODMAX_BENCH_DIR", os.path.join(tempfile.gettempdir(), "odmax_bench"))
+# widths of equirectangular frames: 2K, 4K and 5.7K (GoPro Max), frames are half as high as wide
+WIDTHS = [2048, 4096, 5760]
+FPS = 30
+# start of synthetic GPS tracks, and speed in metres per second
+LAT, LON, ELEV = 52.0, 4.0, 10.0
+SPEED = 1.5
+# start time of synthetic GPS tracks, 2021-12-17 10:00:00 UTC
+T0 = 1639735200.
+# GPS track caches and environment replaced by setup_cache, restored by teardown_cache
+_caches = []
+
+
+def setup_cache():
+    """
+    Use a temporary GPS track cache in the fixture directory instead of the cache of the user, in odmax.cache and (with
+    ODMAX_CACHE_DIR) in processes started from here. Call in the setup of benchmarks that use videos, and call
+    teardown_cache in their teardown.
+
+    :return: str, cache directory
+    """
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    cache_dir = tempfile.mkdtemp(prefix="cache_", dir=FIXTURE_DIR)
+    _caches.append((odmax.cache.CACHE_DIR, os.environ.get("ODMAX_CACHE_DIR")))
+    odmax.cache.CACHE_DIR = cache_dir
+    os.environ["ODMAX_CACHE_DIR"] = cache_dir
+    return cache_dir
+
+
+def teardown_cache():
+    """
+    Remove the temporary GPS track cache made by setup_cache, and use the previous cache again
+
+    :return: None
+    """
+    cache_dir = odmax.cache.CACHE_DIR
+    odmax.cache.CACHE_DIR, env = _caches.pop()
+    if env is None:
+        os.environ.pop("ODMAX_CACHE_DIR", None)
+    else:
+        os.environ["ODMAX_CACHE_DIR"] = env
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def equirect_frame(h, w, seed=0):
+    """
+    Make a synthetic equirectangular frame, with a grid of parallels and meridians over smooth colour gradients and
+    noise, so that encoders and samplers see both edges and texture
+
+    :param h: int, height in pixels
+    :param w: int, width in pixels
+    :param seed: int, seed of the noise (default: 0)
+    :return: ND-array [h, w, 3], uint8 BGR image
+    """
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    lon = x / w * 360.
+    lat = y / h * 180.
+    img = np.stack([
+        127 + 100 * np.sin(np.radians(lon)),
+        127 + 100 * np.cos(np.radians(lat)),
+        127 + 100 * np.sin(np.radians(lon + lat)),
+    ], axis=-1)
+    grid = (np.mod(lon, 15) < 0.5) | (np.mod(lat, 15) < 0.5)
+    img[grid] = 20
+    img += np.random.default_rng(seed).normal(0, 8, img.shape).astype(np.float32)
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def gps_track(n, duration=None):
+    """
+    Make a synthetic GPS track, a walk along a slowly turning path with varying elevation
+
+    :param n: int, amount of GPS points
+    :param duration: float, duration of the track in seconds (default: None, 10 points per second)
+    :return: lats, lons, elevs, timestamps, np.ndarray vectors as read by odmax.io.get_gps_track
+    """
+    if duration is None:
+        duration = n / 10.
+    t = T0 + np.linspace(0., duration, n)
+    heading = np.linspace(0., 2 * np.pi, n)
+    step = SPEED * duration / max(n - 1, 1)
+    north = np.cumsum(step * np.cos(heading))
+    east = np.cumsum(step * np.sin(heading))
+    lat = LAT + np.degrees(north / odmax.consts.EARTH_RADIUS)
+    lon = LON + np.degrees(east / (odmax.consts.EARTH_RADIUS * np.cos(np.radians(LAT))))
+    elev = ELEV + 2 * np.sin(heading)
+    return lat, lon, elev, t
+
+
+def make_video(h, w, n_frames=30, gps_points=None):
+    """
+    Write a synthetic equirectangular video, in which the scene turns slowly as if the camera rotates, and register a
+    synthetic GPS track for it in the temporary GPS track cache (see setup_cache), as if it was read from the video.
+    Videos are only written if they do not exist yet.
+
+    :param h: int, height in pixels
+    :param w: int, width in pixels
+    :param n_frames: int, amount of frames (default: 30)
+    :param gps_points: int, amount of GPS points, spread over the duration of the video (default: None, 10 points per
+        second)
+    :return: str, filename of the video
+    """
+    duration = n_frames / FPS
+    name = f"equirect_{w}x{h}_{n_frames}" + (f"_gps{gps_points}" if gps_points is not None else "")
+    if gps_points is None:
+        gps_points = max(int(duration * 10), 2)
+    fn = os.path.join(FIXTURE_DIR, f"{name}.mp4")
+    if not(os.path.isfile(fn)):
+        os.makedirs(FIXTURE_DIR, exist_ok=True)
+        img = equirect_frame(h, w)
+        fn_tmp = f"{fn}.{os.getpid()}.mp4"
+        writer = cv2.VideoWriter(fn_tmp, cv2.VideoWriter_fourcc(*"mp4v"), FPS, (w, h))
+        if not(writer.isOpened()):
+            raise IOError(f"Video {fn} cannot be written, OpenCV has no mp4v encoder")
+        for i in range(n_frames):
+            writer.write(np.roll(img, i * max(w // 360, 1), axis=1))
+        writer.release()
+        os.replace(fn_tmp, fn)
+    assert (len(_caches) > 0), "call fixtures.setup_cache first, so that the GPS track cache of the user is not used"
+    # the cache is keyed on the modification time of the video, so the track is registered again for a rewritten video
+    if odmax.cache.load_track(fn, cache_dir=odmax.cache.CACHE_DIR) is None:
+        odmax.cache.save_track(fn, *gps_track(gps_points, duration=duration), cache_dir=odmax.cache.CACHE_DIR)
+    return fn
+
+
+def open_video(h, w, n_frames=30, gps_points=None):
+    """
+    Open a synthetic video with its synthetic GPS track
+
+    :param h: int, height in pixels
+    :param w: int, width in pixels
+    :param n_frames: int, amount of frames (default: 30)
+    :param gps_points: int, amount of GPS points (default: None, 10 points per second), see make_video
+    :return: odmax.Video instance
+    """
+    return odmax.Video(make_video(h, w, n_frames=n_frames, gps_points=gps_points), cache=True)
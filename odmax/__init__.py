@@ -1,9 +1,25 @@
 __version__ = "0.1.2"
-from odmax import cli
+import importlib
 from odmax import consts
+from odmax import cache
+from odmax import gpmf
 from odmax import io
 from odmax import process
+from odmax import plan
+from odmax import manifest
 from odmax import helpers
 from odmax import exif
-from odmax import py360
-from .api import *
\ No newline at end of file
+from .api import *
+
+# submodules that are only needed for the command-line interface, batch processing and uploads, imported on first use
+LAZY_MODULES = ["cli", "pipeline", "batch", "stills", "upload", "rig", "py360"]
+
+
+def __getattr__(name):
+    if name in LAZY_MODULES:
+        return importlib.import_module(f"odmax.{name}")
+    raise AttributeError(f"module 'odmax' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(list(globals()) + LAZY_MODULES)
@@ -2,45 +2,84 @@
 import io as IO
 import os
 import numpy as np
-from scipy.interpolate import interp1d
-import geopandas as gpd
-import pandas as pd
 import cv2
+import piexif
 import odmax
-from datetime import timedelta, datetime
-import matplotlib.pyplot as plt
+from collections import namedtuple
+from datetime import timedelta, datetime, timezone
+# pandas, geopandas and matplotlib are imported on first use, to keep startup fast
 
 exif_available = odmax.helpers.assert_cli_exe("exiftool")
+# one encoded image of a frame, as yielded by Video.stream. face is the cube face suffix or rig view name, or None
+# without reprojection, data holds the encoded image with its EXIF tag
+StreamRecord = namedtuple("StreamRecord", ["frame_number", "timestamp", "coord", "face", "data"])
 
 class Video:
-    def __init__(self, fn):
+    def __init__(self, fn, cache=True, exif_dict=None):
         """
         Create a new Video instance. Properties of the video, relevant for extracting frames will be extracted.
-        Also GPS information, if available (tested for GoPro .mp4 format) will be automatically extracted, provided
-        that `exiftool` is available on your system and in your system's path. You will receive warnings if `exiftool`
-        is not available.
+        Also GPS information, if available (tested for GoPro .mp4 format) will be automatically extracted. GoPro MP4
+        files are read directly from their GPMF telemetry. Other formats require that `exiftool` is available on your
+        system and in your system's path. Parsed GPS tracks are cached, so that reopening the same video is fast.
 
         :param fn: filename of video file on disk
+        :param cache: bool, use the persistent cache of parsed GPS tracks, see odmax.cache (default: True)
+        :param exif_dict: dict, static EXIF tags written to every frame, e.g. {"0th": {piexif.ImageIFD.Make: "GoPro"}}
+            (default: None, make and model of GoPro cameras are read from the video)
         """
         self.fn = fn
         self.cap = odmax.io.open_file(self.fn)
         self.fps = self.cap.get(cv2.CAP_PROP_FPS)
         self.start_datetime = None
         self.exif = False
-        if exif_available:
-            self.exif = True
-            self.gpx = odmax.io.get_gpx(self.fn)
-            # make lists of lats, lons and timestamps, for use in interpolation
-            lat, lon, elev, t = odmax.helpers.parse_coords_from_gpx(self.gpx)
-            self.df_gps = pd.DataFrame(
-                {
-                    "lat": lat,
-                    "lon": lon,
-                    "elev": elev,
-                },
-                index=t,
-            )
-            self.gdf_gps = gpd.GeoDataFrame(
+        self._gpx = None
+        self._gdf_gps = None
+        # make lists of lats, lons and timestamps, for use in interpolation
+        track = odmax.io.get_gps_track(self.fn, cache=cache)
+        if exif_dict is None:
+            # read after the GPS track, so that the device name is found in the cache
+            device_name = odmax.io.get_device_name(self.fn, cache=cache)
+            exif_dict = {"0th": {piexif.ImageIFD.Make: "GoPro", piexif.ImageIFD.Model: device_name}} if device_name else {}
+        # the static EXIF tags are serialised once, frames only patch in their GPS location
+        self.exif_template = odmax.exif.ExifTemplate(exif_dict)
+        if track is not None:
+            lat, lon, elev, t = track
+            # check if we have proper GPS data with time stamps available or not
+            valid = np.isfinite(t)
+            if len(t) == 0:
+                print(f"Warning: No GPS information found in file {self.fn}. Skipping GPS parsing.")
+            elif not(valid.any()):
+                # we can't parse coordinates without any time info
+                print(f"Warning: No time information found in GPS track of {fn}. Skipping GPS parsing.")
+            else:
+                import pandas as pd
+                self.exif = True
+                lat, lon, elev, t = lat[valid], lon[valid], elev[valid], t[valid]
+                self.df_gps = pd.DataFrame(
+                    {
+                        "lat": lat,
+                        "lon": lon,
+                        "elev": elev,
+                    },
+                    index=t,
+                )
+                self.start_datetime = datetime.fromtimestamp(t[0], tz=timezone.utc)
+                print("Found first location and time stamp in video on lat: {}, lon: {}, elev: {}, time: {}".format(
+                    lat[0],
+                    lon[0],
+                    elev[0],
+                    self.start_datetime.strftime("%Y-%m-%dT%H:%M:%S.%f")[0:-3] + "Z"
+                )
+                )
+
+    @property
+    def gdf_gps(self):
+        """
+        GeoDataFrame with the GPS track of the video as points, built on first use
+        """
+        if self._gdf_gps is None:
+            import geopandas as gpd
+            self._gdf_gps = gpd.GeoDataFrame(
                 self.df_gps,
                 geometry=gpd.points_from_xy(
                     self.df_gps.lon,
@@ -48,26 +87,16 @@ class Video:
                     crs=4326,
                 )
             )
-            try:
-                point = odmax.helpers.gpx_find_first_timestamp(self.gpx)
-            except:
-                print(f"Warning: No GPS information found in file {self.fn}. Skipping GPS parsing.")
-                self.exif = False
-        # check if we have proper GPS data with time stamps available or not
-        if self.exif:
-            if point.time is None:
-                print(f"Warning: No time information found in GPS track of {fn}. Skipping GPS parsing.")
-                # set exif processing to False because we can't parse coordinates without any time info
-                self.exif = False
-            else:
-                print("Found first location and time stamp in video on lat: {}, lon: {}, elev: {}, time: {}".format(
-                    point.latitude,
-                    point.longitude,
-                    point.elevation,
-                    point.time.strftime("%Y-%m-%dT%H:%M:%S.%f")[0:-3] + "Z"
-                )
-                )
-                self.start_datetime = point.time
+        return self._gdf_gps
+
+    @property
+    def gpx(self):
+        """
+        GPX track of the video, parsed with gpxpy on first use
+        """
+        if self._gpx is None:
+            self._gpx = odmax.io.get_gpx(self.fn)
+        return self._gpx
 
     def get_gps(self, t):
         """
@@ -76,22 +105,34 @@ class Video:
         :param t: float from datetime.timestamp (i.e. seconds since 1970-01-01 00:00:00)
         :return: Pandas DataFrame row with location (lat, lon, elev) and index as time epoch, using linear interpolation
         """
-        if t <= self.df_gps.index[0]:
-            return self.df_gps.drop(columns="geometry").iloc[0]
-        if t >= self.df_gps.index[-1]:
-            return self.df_gps.drop(columns="geometry").iloc[-1]
-        df_select = pd.concat(
-            [
-                self.df_gps[self.df_gps.index <= t].iloc[-1:],
-                pd.DataFrame({k: np.nan for k in self.df_gps.keys()}, index=[t]),
-                self.df_gps[self.df_gps.index >= t].iloc[:1],
-            ], axis=0
+        return self.get_gps_batch([t]).iloc[0]
+
+    def get_gps_batch(self, timestamps):
+        """
+        Returns GPS information at many timestamps at once (measured as time epoch, e.g. returned from
+        datetime.timestamp). All timestamps are located in the GPS track with one sorted search, and interpolated
+        linearly. Timestamps before the start or after the end of the track get the first or last location.
+
+        :param timestamps: list or ND-array of floats from datetime.timestamp (i.e. seconds since 1970-01-01 00:00:00)
+        :return: Pandas DataFrame with location (lat, lon, elev) and index as time epoch, using linear interpolation
+        """
+        import pandas as pd
+        t = np.atleast_1d(np.asarray(timestamps, dtype="float"))
+        t_gps = self.df_gps.index.values.astype("float")
+        values = self.df_gps[["lat", "lon", "elev"]].values.astype("float")
+        if len(t_gps) == 1:
+            return pd.DataFrame(values.repeat(len(t), axis=0), columns=["lat", "lon", "elev"], index=t)
+        # index of the last GPS point before each timestamp, and the relative position towards the next point
+        idx = np.clip(np.searchsorted(t_gps, t, side="right") - 1, 0, len(t_gps) - 2)
+        dt = t_gps[idx + 1] - t_gps[idx]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight = np.where(dt > 0, (t - t_gps[idx]) / dt, 0.)
+        weight = np.clip(weight, 0., 1.)[:, None]
+        return pd.DataFrame(
+            values[idx] + weight * (values[idx + 1] - values[idx]),
+            columns=["lat", "lon", "elev"],
+            index=t
         )
-        # interpolate to the missing value
-        df_select.drop(columns=["geometry"], inplace=True)
-        df_select.interpolate(method="index", inplace=True)
-        # return the middle filled value by linear interpolation
-        return df_select.iloc[1]
 
     def get_frame(self, n, reproject=False, **kwargs):
         """
@@ -99,32 +140,205 @@ class Video:
 
         :param n: int, frame number
         :param reproject: bool, set to True if you want to reproject to 6 cube-faces
-        :param kwargs: keyword arguments for cube reprojection, see odmax.process.reproject_cube.
+        :param kwargs: keyword arguments for cube reprojection, see odmax.process.reproject_cube. Pass rig= (an
+            odmax.rig.Rig instance) to reproject to the perspective views of the rig instead of cube faces.
         :return: odmax.Frame instance
         """
+        img = odmax.io.read_frame(self.cap, n)
+        return self._to_frame(n, img, reproject=reproject, **kwargs)
+
+    def iter_frames(
+            self,
+            start=0,
+            end=None,
+            step=1,
+            frames=None,
+            window=0,
+            motion_gate=None,
+            reproject=False,
+            max_gap=None,
+            **kwargs
+    ):
+        """
+        Iterate over Frames from Video for processing. The video is decoded sequentially, which is much faster than
+        retrieving frames one by one with get_frame, as the video does not need to be wound for each frame.
+
+        :param start: int, first frame number (default: 0)
+        :param end: int, frame number to stop at, not included (default: None, until the end of the video)
+        :param step: int, frame step size (default: 1)
+        :param frames: list of ints, frame numbers in increasing order, used instead of start, end and step (default:
+            None)
+        :param window: int, if larger than zero, the sharpest frame within window frames before and after each
+            requested frame is returned instead of the requested frame, see odmax.io.iter_sharpest_frames (default: 0)
+        :param motion_gate: odmax.io.MotionGate instance, if provided, frames that hardly differ from the last returned
+            frame are skipped (e.g. while the camera stands still). The gate counts the kept and skipped frames
+            (default: None, all frames are returned)
+        :param reproject: bool, set to True if you want to reproject to 6 cube-faces
+        :param max_gap: int, gap in frames above which seeking is used instead of sequential decoding (default: None,
+            one second of frames)
+        :param kwargs: keyword arguments for cube reprojection, see odmax.process.reproject_cube. Pass rig= (an
+            odmax.rig.Rig instance) to reproject to the perspective views of the rig instead of cube faces.
+        :return: generator of odmax.Frame instances
+        """
+        if frames is None:
+            if end is None:
+                end = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            frames = range(start, end, step)
+        else:
+            frames = [int(n) for n in frames]
+        if max_gap is None:
+            max_gap = max(int(round(self.fps)), 1)
+        if window > 0:
+            # any frame in the windows around the requested frames may be returned
+            candidates = [n for w in odmax.io.sharpness_windows(frames, window) for n in w]
+            frame_iter = odmax.io.iter_sharpest_frames(self.cap, frames, window, max_gap=max_gap)
+        else:
+            candidates = frames
+            frame_iter = odmax.io.iter_frames(self.cap, frames, max_gap=max_gap)
+        if motion_gate is not None:
+            frame_iter = motion_gate.filter(frame_iter)
+        # look up the coordinates and make the EXIF tags of all frames at once
+        coords = self.get_coords(candidates)
+        exif_bytes = self.get_exif_bytes(coords) if coords is not None else None
+        index = {n: i for i, n in enumerate(candidates)}
+        for n, img in frame_iter:
+            i = index[n]
+            yield self._to_frame(
+                n,
+                img,
+                coord=coords.iloc[i] if coords is not None else None,
+                exif_bytes=exif_bytes[i] if exif_bytes is not None else None,
+                reproject=reproject,
+                **kwargs
+            )
+
+    def stream(
+            self,
+            start=0,
+            end=None,
+            step=1,
+            frames=None,
+            reproject=False,
+            encoder="jpg",
+            writer="opencv",
+            profile=None,
+            encoder_params={},
+            read_ahead=0,
+            **kwargs
+    ):
+        """
+        Stream encoded images from Video, for services that need images in memory instead of files. The video is decoded
+        sequentially as with iter_frames, and each frame (or each of its cube faces or rig views) is encoded with its
+        EXIF tag directly to bytes. With read_ahead, frames are decoded, reprojected and encoded in a background thread
+        while the consumer handles earlier images. At most read_ahead frames are kept ahead, so the background thread
+        waits when the consumer is slow.
+
+        :param start: int, first frame number (default: 0)
+        :param end: int, frame number to stop at, not included (default: None, until the end of the video)
+        :param step: int, frame step size (default: 1)
+        :param frames: list of ints, frame numbers in increasing order, used instead of start, end and step (default:
+            None)
+        :param reproject: bool, set to True if you want to reproject to 6 cube-faces
+        :param encoder: str, default is "jpg"
+        :param writer: str, writing backend, can be "opencv" or "pil", see odmax.io.write_frame (default: "opencv")
+        :param profile: str, encoder profile, can be "fast", "balanced" or "archive", see odmax.io.PROFILES (default:
+            None, use PIL defaults)
+        :param encoder_params: dict, encoder parameters as used by PIL (e.g. {"quality": 90}), that overrule the profile
+        :param read_ahead: int, amount of frames that are processed ahead of the consumer in a background thread
+            (default: 0, frames are processed when the consumer asks for them)
+        :param kwargs: keyword arguments for iter_frames (e.g. window, motion_gate) and cube reprojection (e.g. faces,
+            face_w, rig), see odmax.Video.iter_frames
+        :return: generator of odmax.StreamRecord (frame_number, timestamp, coord, face, data) tuples, one per encoded
+            image
+        """
+        def encode(frame_iter):
+            for frame in frame_iter:
+                data = frame.to_bytes(encoder=encoder, backend=writer, profile=profile, encoder_params=encoder_params)
+                if isinstance(data, list):
+                    faces = frame.face_suffixes
+                else:
+                    faces, data = [None], [data]
+                yield [
+                    StreamRecord(frame.frame_number, frame.timestamp, frame.coord, face, d) for face, d in zip(faces, data)
+                ]
+
+        records = encode(
+            self.iter_frames(start=start, end=end, step=step, frames=frames, reproject=reproject, **kwargs)
+        )
+        if read_ahead > 0:
+            records = odmax.io.read_ahead(records, depth=read_ahead)
+        for frame_records in records:
+            yield from frame_records
+
+    def get_coords(self, frames):
+        """
+        Returns the GPS location of many frames at once
+
+        :param frames: list of ints, frame numbers
+        :return: Pandas DataFrame with location (lat, lon, elev) per frame and index as time epoch, or None if no GPS
+            information is available
+        """
+        if not(self.exif):
+            return None
+        timestamps = self.start_datetime.timestamp() + np.asarray(frames, dtype="float") / self.fps
+        return self.get_gps_batch(timestamps)
+
+    def get_frames_by_distance(self, distance, start=0, end=None, step=1):
+        """
+        Select frames at a regular distance along the GPS track, so that the amount of frames does not depend on the
+        speed of the camera. The cumulative distance along the track is interpolated to all candidate frames at once,
+        and the first candidate frame at or beyond each multiple of the distance is selected. The first candidate frame
+        is always selected.
+
+        :param distance: float, distance between selected frames in metres
+        :param start: int, first candidate frame number (default: 0)
+        :param end: int, frame number to stop at, not included (default: None, until the end of the video)
+        :param step: int, step size between candidate frames (default: 1)
+        :return: list of ints, selected frame numbers
+        """
+        if not(self.exif):
+            raise AttributeError("GPS data not available, frames cannot be selected by distance")
+        assert (distance > 0), f"distance {distance} must be larger than zero"
+        if end is None:
+            end = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        frames = np.arange(start, end, step)
+        if len(frames) == 0:
+            return []
+        t_gps = self.df_gps.index.values.astype("float")
+        track_distance = odmax.helpers.track_distance(self.df_gps.lat.values, self.df_gps.lon.values)
+        t = self.start_datetime.timestamp() + frames / self.fps
+        frame_distance = np.interp(t, t_gps, track_distance)
+        # count of distance thresholds passed at each candidate frame, a frame is selected where this count increases
+        passed = np.floor((frame_distance - frame_distance[0]) / distance)
+        selected = np.concatenate([[0], np.flatnonzero(np.diff(passed) > 0) + 1])
+        return frames[selected].tolist()
+
+    def get_exif_bytes(self, coords):
+        """
+        Returns the serialised EXIF tags for many frames at once, made from the EXIF template of the video
+
+        :param coords: Pandas DataFrame with location (lat, lon, elev) per frame as returned by get_coords
+        :return: list of bytes, EXIF tag per frame
+        """
+        return self.exif_template.dump_batch(coords.lat.values, coords.lon.values, coords.elev.values)
+
+    def _to_frame(self, n, img, coord=None, exif_bytes=None, reproject=False, **kwargs):
         # compute timestamp of requested frame
         if self.start_datetime:
             t = self.start_datetime + timedelta(seconds=n/self.fps)
         else:
             t = None
-        img = odmax.io.read_frame(self.cap, n)
-        if reproject:
-            img = odmax.process.reproject_cube(
-                img,
-                **kwargs
-            )
+        img, faces = _reproject(img, reproject=reproject, **kwargs)
         if self.exif:
             # retrieve coordinate
-            coord = self.get_gps(t.timestamp())
-            # lat, lon, elev = odmax.helpers.coord_interp(t.timestamp(), timestamps, lats, lons, elevs)
-            gps_exif = odmax.exif.set_gps_location(**coord)
-            exif_dict = {
-                "GPS": gps_exif
-            }
+            if coord is None:
+                coord = self.get_gps(t.timestamp())
+            if exif_bytes is None:
+                exif_bytes = self.exif_template.dump(coord.lat, coord.lon, coord.elev)
         else:
             coord = None
-            exif_dict = {}
-        return Frame(img, n, t, coord, exif=self.exif, exif_dict=exif_dict)
+            exif_bytes = self.exif_template.static
+        return Frame(img, n, t, coord, exif=self.exif, exif_bytes=exif_bytes, faces=faces)
 
     def plot_gps(self, geographical=False, figsize=(13, 8), ax=None, crs=None, tiles=None, plot_kwargs={}, zoom_level=8, tiles_kwargs={}):
         """
@@ -142,6 +356,7 @@ class Video:
         """
         if not(self.exif):
             raise AttributeError("GPS data not available")
+        import matplotlib.pyplot as plt
         # determine a bbox
         if ax is None:
             f = plt.figure(figsize=figsize)
@@ -171,8 +386,21 @@ class Video:
         return ax
 
 
+def _reproject(img, reproject=False, **kwargs):
+    # reproject an equirectangular image to cube faces, or to the perspective views of a rig if rig= is provided, and
+    # return the images with their face suffixes (None without reprojection)
+    if reproject and kwargs.get("rig") is not None:
+        # perspective views of a virtual camera rig instead of cube faces
+        rig = kwargs["rig"]
+        return rig.sample(img), rig.names
+    elif reproject:
+        kwargs = {k: v for k, v in kwargs.items() if k != "rig"}
+        return odmax.process.reproject_cube(img, **kwargs), odmax.process.get_face_suffixes(kwargs.get("faces"))
+    return img, None
+
+
 class Frame:
-    def __init__(self, img, n, t, coord, exif=False, exif_dict={}):
+    def __init__(self, img, n, t, coord, exif=False, exif_dict={}, exif_bytes=None, faces=None, name=None):
         """
         Create a new Frame instance. A Frame holds the image, but also which frame number it came from, the coordinate
         of the frame if GPS information is available, and the EXIF tag that belongs to the frame, comprised of a dictionary
@@ -182,74 +410,149 @@ class Frame:
         :param t: timestamp as datetime.datetime object
         :param coord: pandas DataFrame row holding latitude, longitude, elevation and time
         :param exif_dict: dict, holding EXIF tag information, e.g. exif_dict["GPS"] should contain a dict with GPS tags
+        :param exif_bytes: bytes, serialised EXIF tag (e.g. made with odmax.exif.ExifTemplate), used instead of
+            exif_dict, so that the tag does not need to be serialised for every written image
+        :param faces: list of str, suffixes of the cube faces or names of the rig views in img, if img is a list of
+            images (default: None, all 6 faces as in odmax.consts.CUBE_SUFFIX)
+        :param name: str, name used in written file names instead of the frame number, e.g. the name of the photo a
+            frame was read from (default: None, the frame number is used)
         """
         self.frame_number = n
+        self.name = name
+        self.faces = faces
         self.timestamp = t
         self.coord = coord
-        self.exif_dict = exif_dict
+        if exif_bytes is None:
+            exif_bytes = odmax.exif.dump(exif_dict)
+        self.exif_bytes = exif_bytes
         self.img = img
 
-    def to_file(self, path=".", prefix="still", encoder="jpg"):
+    @property
+    def face_suffixes(self):
+        """
+        Suffixes of the cube faces (or names of rig views) in img, used in the names of written files
+        """
+        return self.faces if self.faces is not None else odmax.consts.CUBE_SUFFIX
+
+    def file_stem(self, prefix="still"):
+        """
+        Name of written files without face suffix and extension, "<prefix>_<frame_number>", or "<prefix>_<name>" if the
+        frame has a name. Named frames are written without prefix if prefix is empty.
+
+        :param prefix: str, Prefix for files
+        :return: str
+        """
+        if self.name is None:
+            return "{:s}_{:04d}".format(prefix, self.frame_number)
+        return "{:s}_{:s}".format(prefix, self.name) if prefix else self.name
+
+    def file_names(self, prefix="still", encoder="jpg"):
+        """
+        Names of the files that to_file writes, without path
+
+        :param prefix: str, Prefix for files
+        :param encoder: str, default is "jpg"
+        :return: str, filename; or list of str filenames, one per cube face or rig view
+        """
+        if isinstance(self.img, list):
+            return ["{:s}_{:s}.{:s}".format(self.file_stem(prefix), c, encoder.lower()) for c in self.face_suffixes]
+        return "{:s}.{:s}".format(self.file_stem(prefix), encoder.lower())
+
+    @property
+    def exif_dict(self):
+        """
+        EXIF tag of the frame as dictionary of tag groups and tags within groups, decoded from exif_bytes
+        """
+        return piexif.load(self.exif_bytes)
+
+    def to_file(self, path=".", prefix="still", encoder="jpg", backend="opencv", profile=None, encoder_params={}):
         """
         Write a frame to one or multiple files. If cube-face reprojection has been used
         6 images will be written at the selected path and prefix. Names of files will follow
         the following conventions:
         In case no reprojection used: <path>/<prefix>_<frame_number>.<encoder>
         In case cube-face reprojection is applied: <path>/<prefix>_<frame_number>_<cube face>.<encoder>
+        Frames with a name (e.g. read from a photo) use the name instead of the frame number, see file_stem.
 
         where cube_face is one of "F", "R", "B", "L", "U", "D" as suffixes for
-        "front", "right", "back", "left", "up" and "down".
+        "front", "right", "back", "left", "up" and "down". If only a selection of faces was reprojected, only these
+        faces are written, with the same suffixes.
 
         :param path: str, Path to write frames to
         :param prefix: str, Prefix for files
         :param encoder: str, default is "jpg"
+        :param backend: str, writing backend, can be "opencv" or "pil", see odmax.io.write_frame (default: "opencv")
+        :param profile: str, encoder profile, can be "fast", "balanced" or "archive", see odmax.io.PROFILES (default:
+            None, use PIL defaults)
+        :param encoder_params: dict, encoder parameters as used by PIL (e.g. {"quality": 90}), that overrule the profile
         :return: str, output filename; or list of str filenames
         """
         if isinstance(self.img, list):
-            # a 6-face cube is provided, write 6 individual images
-            assert (len(self.img) == 6), f"6 images are expected with cube reprojection, but {len(self.img)} were found"
+            # cube faces are provided, write each face to an individual image
+            faces = self.face_suffixes
+            assert (len(self.img) == len(faces)), f"{len(faces)} images are expected with cube reprojection, but {len(self.img)} were found"
             fns = []
-            for i, c in zip(self.img, odmax.consts.CUBE_SUFFIX):
+            for i, fn in zip(self.img, self.file_names(prefix=prefix, encoder=encoder)):
                 assert ((len(i.shape) == 3) and (i.shape[
                                                      -1] >= 3)), "One of the images you provided is incorrectly shaped, must be 3 dimensional with the last dimension as RGB"
-                fn = os.path.join(path, "{:s}_{:04d}_{:s}.{:s}".format(prefix, self.frame_number, c, encoder.lower()))
-                # write file in PIL
-                odmax.io.write_frame(i, fn, encoder=encoder, exif_dict=self.exif_dict)
+                fn = os.path.join(path, fn)
+                odmax.io.write_frame(
+                    i,
+                    fn,
+                    encoder=encoder,
+                    exif_bytes=self.exif_bytes,
+                    backend=backend,
+                    profile=profile,
+                    encoder_params=encoder_params
+                )
                 fns.append(fn)
             return fns
         else:
             # a single image is provided
-            fn = os.path.join(path, "{:s}_{:04d}.{:s}").format(prefix, self.frame_number, encoder.lower())
-            odmax.io.write_frame(self.img, fn, encoder=encoder, exif_dict=self.exif_dict)
+            fn = os.path.join(path, self.file_names(prefix=prefix, encoder=encoder))
+            odmax.io.write_frame(
+                self.img,
+                fn,
+                encoder=encoder,
+                exif_bytes=self.exif_bytes,
+                backend=backend,
+                profile=profile,
+                encoder_params=encoder_params
+            )
             return fn
 
-    def to_bytes(self, encoder="jpg"):
+    def to_bytes(self, encoder="jpg", backend="opencv", profile=None, encoder_params={}):
         """
         Write a frame to one or more bytestreams, ready to push to an online service.
-        If cube-face reprojection has been used 6 images will be written in a list of bytestreams
+        If cube-face reprojection has been used 6 images (or the selected faces) will be written in a list of
+        bytestreams
 
         :param encoder: str, default is "jpg"
+        :param backend: str, writing backend, can be "opencv" or "pil", see odmax.io.write_frame (default: "opencv")
+        :param profile: str, encoder profile, can be "fast", "balanced" or "archive", see odmax.io.PROFILES (default:
+            None, use PIL defaults)
+        :param encoder_params: dict, encoder parameters as used by PIL (e.g. {"quality": 90}), that overrule the profile
         :return: bytestream
         """
+        write_kwargs = {
+            "encoder": encoder,
+            "exif_bytes": self.exif_bytes,
+            "backend": backend,
+            "profile": profile,
+            "encoder_params": encoder_params
+        }
         if isinstance(self.img, list):
-            # a 6-face cube is provided, write 6 individual images
-            assert (len(self.img) == 6), f"6 images are expected with cube reprojection, but {len(self.img)} were found"
+            # cube faces are provided, write each face to an individual image
+            faces = self.face_suffixes
+            assert (len(self.img) == len(faces)), f"{len(faces)} images are expected with cube reprojection, but {len(self.img)} were found"
             bytes = []
-            for i, c in zip(self.img, odmax.consts.CUBE_SUFFIX):
+            for i in self.img:
                 assert ((len(i.shape) == 3) and (i.shape[
                                                      -1] >= 3)), "One of the images you provided is incorrectly shaped, must be 3 dimensional with the last dimension as RGB"
-                buffer = IO.BytesIO()
-                # write file in PIL
-                odmax.io.write_frame(i, buffer, encoder=encoder, exif_dict=self.exif_dict)
-                # to_pil(i).save(fn_out, p_encoder.lower(), exif=exif)
-                buffer.seek(0)
-                bytes.append(buffer.read())
+                bytes.append(odmax.io.encode_frame(i, **write_kwargs))
             return bytes
         else:
-            buffer = IO.BytesIO()
-            odmax.io.write_frame(self.img, buffer, encoder=encoder, exif_dict=self.exif_dict)
-            buffer.seek(0)
-            return buffer.read()
+            return odmax.io.encode_frame(self.img, **write_kwargs)
 
     def plot(self, figsize=(8, 8), rows=2, cols=3):
         """
@@ -259,6 +562,7 @@ class Frame:
         :param cols: int, number of cols to use for plotting 6 cube-faces, default: 3
         :return: f, ax, figure and axes handle
         """
+        import matplotlib.pyplot as plt
         # make a simple plot, and make it dependent on this
         f = plt.figure(figsize=figsize)
         if self.coord is not None:
@@ -270,9 +574,10 @@ class Frame:
         else:
             timestr = "Time: unknown"
         if isinstance(self.img, list):
-            # a 6-face cube is provided, write 6 individual images
-            assert (len(self.img) == 6), f"6 images are expected with cube reprojection, but {len(self.img)} were found"
-            for n, (i, c) in enumerate(zip(self.img, odmax.consts.CUBE_SUFFIX)):
+            # cube faces are provided, plot each face in its own panel
+            faces = self.face_suffixes
+            assert (len(self.img) == len(faces)), f"{len(faces)} images are expected with cube reprojection, but {len(self.img)} were found"
+            for n, (i, c) in enumerate(zip(self.img, faces)):
                 ax = plt.subplot(rows, cols, n + 1)
                 ax.imshow(i)
                 ax.set_title(c)
@@ -295,3 +600,118 @@ class Frame:
             )
         f.suptitle(f"{timestr} \n {coordstr}")
         return f, ax
+
+
+class Still:
+    def __init__(self, fn):
+        """
+        Create a new Still instance. A Still is one 360 degree photo, stored as equirectangular image (e.g. a GoPro Max
+        .JPG photo). The EXIF tag of the photo is read once: its GPS location and time are used as coordinate and
+        timestamp of the photo, and the tags that remain valid for reprojected images (e.g. camera, time and GPS
+        location, see odmax.exif.face_tags) are serialised once, so that the same tag is written to every cube face or
+        rig view without parsing the photo again.
+
+        :param fn: filename of photo on disk
+        """
+        self.fn = fn
+        self.name = os.path.splitext(os.path.basename(fn))[0]
+        try:
+            exif_dict = piexif.load(fn)
+        except Exception:
+            print(f"Warning: No EXIF tag could be read from {fn}. Writing faces without EXIF tag.")
+            exif_dict = {}
+        self.timestamp = odmax.exif.get_datetime(exif_dict)
+        location = odmax.exif.get_location(exif_dict)
+        self.exif = location is not None
+        self.coord = None
+        if self.exif:
+            import pandas as pd
+            self.coord = pd.Series(
+                location,
+                index=["lat", "lon", "elev"],
+                name=self.timestamp.timestamp() if self.timestamp is not None else None
+            )
+        self.exif_bytes = odmax.exif.dump(odmax.exif.face_tags(exif_dict))
+
+    def read(self):
+        """
+        Read the equirectangular image of the photo. The EXIF orientation is not applied, as 360 degree photos are
+        stored upright.
+
+        :return: ND-array [H, W, 3], BGR image
+        """
+        img = cv2.imread(self.fn, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+        if img is None:
+            raise IOError(f"Photo {self.fn} cannot be read")
+        return img
+
+    def get_frame(self, n=0, reproject=False, **kwargs):
+        """
+        Get the photo as Frame for processing. The Frame is named after the photo, so that written files are named
+        "<prefix>_<name>_<cube face>.<encoder>", or "<name>_<cube face>.<encoder>" with an empty prefix.
+
+        :param n: int, number of the photo, e.g. its position in an odmax.PhotoSet (default: 0)
+        :param reproject: bool, set to True if you want to reproject to 6 cube-faces
+        :param kwargs: keyword arguments for cube reprojection, see odmax.process.reproject_cube. Pass rig= (an
+            odmax.rig.Rig instance) to reproject to the perspective views of the rig instead of cube faces.
+        :return: odmax.Frame instance
+        """
+        img, faces = _reproject(self.read(), reproject=reproject, **kwargs)
+        return Frame(
+            img,
+            n,
+            self.timestamp,
+            self.coord,
+            exif=self.exif,
+            exif_bytes=self.exif_bytes,
+            faces=faces,
+            name=self.name
+        )
+
+
+class PhotoSet:
+    def __init__(self, inputs):
+        """
+        Create a new PhotoSet instance. A PhotoSet is a collection of 360 degree photos, e.g. all photos of a field day,
+        that are reprojected with the same cube faces or rig. Photos are collected from directories, glob patterns,
+        text files with one photo per line, or given as photo files, see odmax.stills.find_stills.
+
+        :param inputs: str or list of str, directories, glob patterns (e.g. "/data/*/GS*.JPG"), list files or photo files
+        """
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        self.fns = odmax.stills.find_stills(inputs)
+
+    def __len__(self):
+        return len(self.fns)
+
+    def __getitem__(self, i):
+        return Still(self.fns[i])
+
+    def iter_frames(self, reproject=False, **kwargs):
+        """
+        Iterate over the photos as Frames, one by one in the calling process. Use to_files to process many photos in
+        parallel.
+
+        :param reproject: bool, set to True if you want to reproject to 6 cube-faces
+        :param kwargs: keyword arguments for cube reprojection, see odmax.Still.get_frame
+        :return: generator of odmax.Frame instances, numbered in the order of the photos
+        """
+        for n, fn in enumerate(self.fns):
+            yield Still(fn).get_frame(n, reproject=reproject, **kwargs)
+
+    def to_files(self, path=".", prefix="", workers=1, **kwargs):
+        """
+        Reproject and write all photos, scheduled over a pool of worker processes. The reprojection plan (or rig with
+        its maps) is computed once and shared with all workers, see odmax.stills.run.
+
+        :param path: str, Path to write files to
+        :param prefix: str, Prefix for files, placed before the name of each photo (default: "", files are named after
+            the photos)
+        :param workers: int, amount of photos processed in parallel (default: 1, photos are processed one by one in the
+            calling process)
+        :param kwargs: keyword arguments for writing and reprojection, see odmax.stills.process_still
+        :return: generator of dicts with the summary of each photo (see odmax.stills.process_still), in order of
+            completion
+        """
+        return odmax.stills.run(self.fns, path=path, prefix=prefix, workers=workers, **kwargs)
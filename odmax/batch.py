@@ -0,0 +1,211 @@
+# processing of many videos at once, scheduled over a pool of worker processes
+import csv
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import odmax
+
+# extensions of video files that are collected from directories
+VIDEO_EXTENSIONS = [".mp4", ".360", ".mov"]
+# options that determine the content of the written files, recorded in the manifest of each output folder
+SIGNATURE_KEYS = [
+    "encoder", "profile", "encoder_params", "reproject", "face_w", "faces", "rig", "mode", "overlap", "backend",
+    "motion_threshold"
+]
+# columns of the summary file
+SUMMARY_COLUMNS = ["file", "outpath", "frames", "skipped", "static", "bytes", "seconds", "error"]
+
+
+def find_videos(inputs):
+    """
+    Collect video files from directories, glob patterns and list files
+
+    :param inputs: list of str, each a directory (all video files in it are used), a glob pattern (e.g.
+        "/data/*/GS*.360"), a text file with one video file per line, or a video file
+    :return: list of str, video files, each file occurs once
+    """
+    return find_files(inputs, extensions=VIDEO_EXTENSIONS)
+
+
+def find_files(inputs, extensions=VIDEO_EXTENSIONS):
+    """
+    Collect files from directories, glob patterns and list files
+
+    :param inputs: list of str, each a directory (all files with one of the extensions in it are used), a glob pattern,
+        a text file with one file per line, or a file
+    :param extensions: list of str, lower case extensions of files that are collected from directories (default:
+        odmax.batch.VIDEO_EXTENSIONS)
+    :return: list of str, files, each file occurs once
+    """
+    fns = []
+    for item in inputs:
+        if os.path.isdir(item):
+            fns += sorted(
+                os.path.join(item, fn) for fn in os.listdir(item)
+                if os.path.splitext(fn)[-1].lower() in extensions
+            )
+        elif os.path.isfile(item) and os.path.splitext(item)[-1].lower() == ".txt":
+            with open(item, "r") as f:
+                listed = [line.strip() for line in f if line.strip() and not(line.startswith("#"))]
+            for fn in listed:
+                if not(os.path.isfile(fn)):
+                    raise IOError(f"File {fn}, listed in {item}, does not exist")
+            fns += listed
+        elif os.path.isfile(item):
+            fns.append(item)
+        else:
+            matches = sorted(glob.glob(item))
+            if len(matches) == 0:
+                raise IOError(f"No files found for {item}")
+            fns += matches
+    # remove duplicates, keeping the first occurrence
+    unique = {}
+    for fn in fns:
+        unique.setdefault(os.path.abspath(fn), fn)
+    return list(unique.values())
+
+
+def output_paths(fns, outpath="."):
+    """
+    Output folder per video, named after the video file. Videos with the same name (e.g. from different cameras) get a
+    numbered suffix.
+
+    :param fns: list of str, video files
+    :param outpath: str, path in which the folders are made (default: ".")
+    :return: list of str, output folder per video
+    """
+    paths = []
+    for fn in fns:
+        name = os.path.splitext(os.path.basename(fn))[0]
+        path = os.path.join(outpath, name)
+        i = 1
+        while path in paths:
+            path = os.path.join(outpath, f"{name}_{i}")
+            i += 1
+        paths.append(path)
+    return paths
+
+
+def process_video(
+        fn,
+        outpath=".",
+        start_time=0.,
+        end_time=None,
+        d_frame=1,
+        distance_interval=None,
+        sharpness_window=0,
+        motion_threshold=None,
+        cache=True,
+        overwrite=False,
+        **kwargs
+):
+    """
+    Extract the stills of one video. Used by the workers of odmax.batch.run, but can also be called directly.
+
+    :param fn: str, video file
+    :param outpath: str, output folder of the video, made if it does not exist
+    :param start_time: float, start time in seconds from start of video (default: 0.)
+    :param end_time: float, end time in seconds from start of video (default: None, until the end of the video)
+    :param d_frame: int, frame step size (default: 1)
+    :param distance_interval: float, distance between frames in metres along the GPS track, see
+        odmax.Video.get_frames_by_distance (default: None, frames are selected with d_frame only)
+    :param sharpness_window: int, amount of frames before and after each selected frame, within which the sharpest
+        frame is written instead, see odmax.Video.iter_frames (default: 0)
+    :param motion_threshold: float, minimum motion with the last written frame for a frame to be written, see
+        odmax.io.MotionGate. Not used when frames are selected by distance_interval in a video with GPS information
+        (default: None, frames are written regardless of motion)
+    :param cache: bool, use the persistent cache of parsed GPS tracks (default: True)
+    :param overwrite: bool, write all frames again, also those that were recorded in the manifest of the output folder
+        by an earlier run (default: False, recorded frames are skipped), see odmax.manifest.Manifest
+    :param kwargs: keyword arguments for writing and reprojection, see odmax.pipeline.run
+    :return: dict with the video file, output folder, amount of frames written, amount of frames skipped as they were
+        written in an earlier run, amount of frames skipped without motion, amount of bytes written, wall time in seconds
+        and error message (None if the video was processed successfully)
+    """
+    t0 = time.perf_counter()
+    summary = {"file": fn, "outpath": outpath, "frames": 0, "skipped": 0, "static": 0, "bytes": 0, "seconds": 0., "error": None}
+    try:
+        video = odmax.Video(fn, cache=cache)
+        if not(os.path.isdir(outpath)):
+            os.makedirs(outpath)
+        start_frame = odmax.io.get_frame_number(video.cap, start_time)
+        end_frame = odmax.io.get_frame_number(video.cap, end_time if end_time is not None else float("inf"))
+        # frames skipped by the motion gate are recorded without files, and only count as done with the same gate
+        signature = {k: v for k, v in dict(kwargs, motion_threshold=motion_threshold).items() if k in SIGNATURE_KEYS}
+        if signature.get("rig") is not None:
+            signature["rig"] = signature["rig"].to_dict()
+        manifest = odmax.manifest.Manifest(
+            outpath,
+            prefix=kwargs.get("prefix", "still"),
+            signature=odmax.manifest.get_signature(fn, **signature),
+            overwrite=overwrite
+        )
+        motion_gate = None
+        if distance_interval is not None and video.exif:
+            frame_n = video.get_frames_by_distance(distance_interval, start_frame, end_frame, d_frame)
+        elif distance_interval is not None and motion_threshold is None:
+            raise ValueError(f"No GPS information found in {fn}, frames cannot be selected by distance interval")
+        else:
+            frame_n = range(start_frame, end_frame, d_frame)
+        if motion_threshold is not None and not(distance_interval is not None and video.exif):
+            motion_gate = odmax.io.MotionGate(motion_threshold)
+        todo = manifest.todo(frame_n)
+        summary["skipped"] = len(frame_n) - len(todo)
+        coords = video.get_coords(range(start_frame, end_frame))
+        slots = odmax.io.frame_slots(todo, sharpness_window)
+        frames = video.iter_frames(frames=todo, window=sharpness_window, motion_gate=motion_gate)
+        # videos are already processed in parallel, each video is processed serially within its worker
+        for n, fns in odmax.pipeline.run(frames, path=outpath, workers=1, **kwargs):
+            manifest.add(n, fns, coord=coords.iloc[n - start_frame] if coords is not None else None, slot=slots[n])
+            fns = fns if isinstance(fns, list) else [fns]
+            summary["frames"] += 1
+            summary["bytes"] += sum(os.path.getsize(f) for f in fns)
+        if motion_gate is not None:
+            for n in motion_gate.skipped_frames:
+                manifest.add(n, [], slot=slots[n])
+            summary["static"] = motion_gate.skipped
+    except Exception as e:
+        # a broken video should not stop the other videos
+        summary["error"] = f"{type(e).__name__}: {e}"
+    summary["seconds"] = time.perf_counter() - t0
+    return summary
+
+
+def run(fns, outpath=".", workers=1, **kwargs):
+    """
+    Extract the stills of many videos, scheduled over a pool of worker processes. The largest videos are started first,
+    so that no long video is left running alone at the end. Each worker keeps its reprojection plans and exiftool
+    process alive between videos. Stills of each video are written in their own folder, see odmax.batch.output_paths.
+
+    :param fns: list of str, video files
+    :param outpath: str, path in which the output folders are made (default: ".")
+    :param workers: int, amount of videos processed in parallel (default: 1, videos are processed one by one in the
+        calling process)
+    :param kwargs: keyword arguments for processing each video, see odmax.batch.process_video
+    :return: generator of dicts with the summary of each video (see odmax.batch.process_video), in order of completion
+    """
+    jobs = sorted(zip(fns, output_paths(fns, outpath)), key=lambda job: os.path.getsize(job[0]), reverse=True)
+    if workers <= 1:
+        for fn, path in jobs:
+            yield process_video(fn, outpath=path, **kwargs)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_video, fn, outpath=path, **kwargs) for fn, path in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def write_summary(summaries, fn):
+    """
+    Write the summaries of processed videos to a CSV file
+
+    :param summaries: list of dicts, summary per video as returned by odmax.batch.run
+    :param fn: str, filename of CSV file
+    :return: None
+    """
+    with open(fn, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        for summary in summaries:
+            writer.writerow({**summary, "seconds": f"{summary['seconds']:.2f}"})
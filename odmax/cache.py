@@ -0,0 +1,132 @@
+# persistent cache of parsed GPS tracks, so that videos do not need to be scanned again when reopened
+import os
+import hashlib
+import numpy as np
+
+# central cache directory, can be overruled with the environment variable ODMAX_CACHE_DIR
+CACHE_DIR = os.environ.get(
+    "ODMAX_CACHE_DIR",
+    os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "odmax")
+)
+# maximum total size of cached tracks in bytes, least recently used tracks are removed first
+MAX_CACHE_SIZE = 256 * 1024 ** 2
+
+
+def track_fn(fn, cache_dir=None):
+    """
+    Filename of the cached GPS track of a video. The name is derived from the absolute path, size and modification time
+    of the video, so that a changed or replaced video is never matched with an outdated track.
+
+    :param fn: video filename
+    :param cache_dir: str, cache directory (default: odmax.cache.CACHE_DIR)
+    :return: str, filename of cached track
+    """
+    if cache_dir is None:
+        cache_dir = CACHE_DIR
+    stat = os.stat(fn)
+    key = f"{os.path.abspath(fn)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return os.path.join(cache_dir, "gps", hashlib.sha1(key.encode()).hexdigest() + ".npz")
+
+
+def load_track(fn, cache_dir=None):
+    """
+    Read the cached GPS track of a video
+
+    :param fn: video filename
+    :param cache_dir: str, cache directory (default: odmax.cache.CACHE_DIR)
+    :return: lats, lons, elevs, timestamps, np.ndarray vectors, or None if the track is not cached
+    """
+    fn_track = track_fn(fn, cache_dir=cache_dir)
+    if not(os.path.isfile(fn_track)):
+        return None
+    try:
+        with np.load(fn_track) as data:
+            # tracks cached without device name are parsed again, so that the device name is cached as well
+            track = data["lat"], data["lon"], data["elev"], data["t"], data["device_name"]
+    except Exception:
+        # unreadable cache file, e.g. from an interrupted write, parse the video again
+        return None
+    # mark the track as recently used
+    os.utime(fn_track)
+    return track[:4]
+
+
+def load_device_name(fn, cache_dir=None):
+    """
+    Read the cached device name of a video, stored together with its GPS track
+
+    :param fn: video filename
+    :param cache_dir: str, cache directory (default: odmax.cache.CACHE_DIR)
+    :return: str, device name ("" if the video holds no device name), or None if the video is not cached
+    """
+    fn_track = track_fn(fn, cache_dir=cache_dir)
+    if not(os.path.isfile(fn_track)):
+        return None
+    try:
+        with np.load(fn_track) as data:
+            return str(data["device_name"])
+    except Exception:
+        return None
+
+
+def save_track(fn, lat, lon, elev, t, cache_dir=None, max_size=MAX_CACHE_SIZE, device_name=None):
+    """
+    Write the GPS track of a video to the cache, and remove least recently used tracks if the cache grows beyond
+    max_size
+
+    :param fn: video filename
+    :param lat, lon, elev, t: np.ndarray vectors with latitudes, longitudes, elevations and timestamps
+    :param cache_dir: str, cache directory (default: odmax.cache.CACHE_DIR)
+    :param max_size: int, maximum size of the cache in bytes (default: odmax.cache.MAX_CACHE_SIZE)
+    :param device_name: str, name of the camera, e.g. "GoPro Max" (default: None, no device name)
+    :return: str, filename of cached track
+    """
+    fn_track = track_fn(fn, cache_dir=cache_dir)
+    os.makedirs(os.path.dirname(fn_track), exist_ok=True)
+    # write to a temporary file first, so that other processes never read a partially written track
+    fn_tmp = f"{fn_track}.{os.getpid()}.tmp"
+    with open(fn_tmp, "wb") as f:
+        np.savez(f, lat=lat, lon=lon, elev=elev, t=t, device_name=device_name or "")
+    os.replace(fn_tmp, fn_track)
+    evict(cache_dir=cache_dir, max_size=max_size)
+    return fn_track
+
+
+def evict(cache_dir=None, max_size=MAX_CACHE_SIZE):
+    """
+    Remove least recently used tracks from the cache until its size is at most max_size
+
+    :param cache_dir: str, cache directory (default: odmax.cache.CACHE_DIR)
+    :param max_size: int, maximum size of the cache in bytes (default: odmax.cache.MAX_CACHE_SIZE)
+    :return: None
+    """
+    if cache_dir is None:
+        cache_dir = CACHE_DIR
+    path = os.path.join(cache_dir, "gps")
+    if not(os.path.isdir(path)):
+        return
+    entries = []
+    for entry in os.scandir(path):
+        if entry.is_file() and entry.name.endswith(".npz"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    size = sum(e[1] for e in entries)
+    for _, entry_size, entry_path in sorted(entries):
+        if size <= max_size:
+            break
+        try:
+            os.remove(entry_path)
+        except FileNotFoundError:
+            # already removed by another process
+            pass
+        size -= entry_size
+
+
+def clear(cache_dir=None):
+    """
+    Remove all cached tracks
+
+    :param cache_dir: str, cache directory (default: odmax.cache.CACHE_DIR)
+    :return: None
+    """
+    evict(cache_dir=cache_dir, max_size=0)
@@ -1,4 +1,5 @@
 #!/usr/bin/python3
+import json
 import os.path
 import sys
 import cv2
@@ -17,37 +18,59 @@ def main():
 
     :return:
     """
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        return main_batch()
+    if len(sys.argv) > 1 and sys.argv[1] == "stills":
+        return main_stills()
     parser = create_parser()
     (options, args) = parser.parse_args()
     # assertions below
     if not(options.infile):
         raise IOError("No input file provided, please use -i option to provide a valid video file")
-    if options.end_time < 0:
-        options.end_time = np.inf
-    if options.end_time <= options.start_time:
-        raise ValueError(f"End time {options.end_time} is smaller or equal than start time {options.start_time}")
-    if options.d_frame < 1:
-        raise ValueError(f"Frame difference {options.d_frame} is smaller than one, has to be at least one")
+    check_options(options)
+    if options.queue_depth is not None and options.queue_depth < 1:
+        raise ValueError(f"Queue depth {options.queue_depth} is smaller than one, has to be at least one")
+    check_upload_options(options)
     exif = assert_cli_exe("exiftool")
     # do something
     print(f"Processing video  : {options.infile}")
     print(f"Output path       : {options.outpath}")
     print(f"Encoder           : {options.encoder.lower()}")
+    print(f"Writer            : {options.writer}")
+    print(f"Encoder profile   : {options.profile if options.profile is not None else 'not set, using defaults'}")
     print(f"File prefix       : {options.prefix}")
     print(f"Start time        : {options.start_time} seconds")
     print(f"End time          : {options.end_time} seconds")
     print(f"Frame interval    : {options.d_frame}")
+    if options.distance_interval is not None:
+        print(f"Distance interval : {options.distance_interval} m")
+    if options.sharpness_window > 0:
+        print(f"Sharpness window  : {options.sharpness_window} frames")
+    if options.motion_threshold is not None:
+        print(f"Motion threshold  : {options.motion_threshold}")
     print(f"Reprojection      : {'enabled' if options.reproject else 'disabled'}")
-    if options.reproject:
+    if options.rig is not None:
+        print(f"Rig               : {len(options.rig.views)} views ({' '.join(options.rig.names)})")
+    print(f"Workers           : {options.workers}")
+    if options.workers > 1:
+        print(f"Queue depth       : {options.queue_depth if options.queue_depth is not None else 2 * options.workers}")
+    if options.reproject and options.rig is None:
         print(f"Reprojection mode : {options.mode}")
         print(f"Face width        : {options.face_w if options.face_w is not None else 'not set, estimated from video'}")
-    if not(os.path.isdir(options.outpath)):
+        print(f"Cube faces        : {' '.join(odmax.process.get_face_suffixes(options.faces))}")
+        print(f"Sampler           : {options.backend}")
+        print(f"Map cache         : {options.cache_dir if options.cache_dir is not None else 'in memory only'}")
+        print(f"Memory budget     : {options.memory_budget if options.memory_budget is not None else odmax.plan.MEMORY_BUDGET} MB")
+    if options.upload is not None:
+        print(f"Upload            : {options.upload}{f' (WebODM project {options.project})' if options.project is not None else ' (NodeODM)'}")
+        print(f"Connections       : {options.connections} ({options.chunk_size} images per request)")
+    elif not(os.path.isdir(options.outpath)):
         print(f"Output path {options.outpath} does not exist, creating path...")
         os.makedirs(options.outpath)
     if exif:
         print(f"exiftool          : found! Processing with GPS coordinates if available")
     else:
-        print(f"exiftool          : NOT found. Processing WITHOUT GPS coordinates. Install exiftool if you wish to process with coordinates.")
+        print(f"exiftool          : NOT found. GPS coordinates are only read from GoPro MP4 telemetry. Install exiftool if you wish to process other formats with coordinates.")
 
     print(f"====================")
     print(f"Start processing:")
@@ -55,7 +78,7 @@ def main():
     print(f"Collecting metadata:")
     print(f"--------------------")
     # make a Video object
-    Video = odmax.Video(options.infile)
+    Video = odmax.Video(options.infile, cache=options.gps_cache)
     # get start and end frame
     start_frame = odmax.io.get_frame_number(Video.cap, options.start_time)
     end_frame = odmax.io.get_frame_number(Video.cap, options.end_time)
@@ -65,35 +88,427 @@ def main():
     print(f"Running for all frames:")
     print(f"-----------------------")
 
-    frame_n = list(range(start_frame, end_frame, options.d_frame))
+    motion_gate = None
+    if options.distance_interval is not None and Video.exif:
+        frame_n = Video.get_frames_by_distance(options.distance_interval, start_frame, end_frame, options.d_frame)
+        print(f"Selected {len(frame_n)} frames at {options.distance_interval} m distance intervals")
+        if options.motion_threshold is not None:
+            print(f"Frames are selected by distance, --motion-threshold is not used")
+    elif options.distance_interval is not None and options.motion_threshold is None:
+        raise ValueError(f"No GPS information found in {options.infile}, frames cannot be selected with --distance-interval")
+    else:
+        if options.distance_interval is not None:
+            print(f"No GPS information found in {options.infile}, frames without motion are skipped instead of selecting frames by distance")
+        frame_n = range(start_frame, end_frame, options.d_frame)
+    if options.motion_threshold is not None and not(options.distance_interval is not None and Video.exif):
+        motion_gate = odmax.io.MotionGate(options.motion_threshold)
+    manifest = None
+    task = None
+    if options.upload is not None:
+        # frames are uploaded from memory, nothing is written to the output path
+        task = get_task(options)
+        print(f"Uploading into task {task.create()} on {options.upload}")
+        todo = list(frame_n)
+    else:
+        # frames that were completely written in an earlier run with the same options are skipped
+        try:
+            manifest = odmax.manifest.Manifest(
+                options.outpath,
+                prefix=options.prefix,
+                signature=get_signature(options.infile, options),
+                overwrite=options.overwrite
+            )
+        except ValueError as e:
+            # output of an earlier run with other options
+            parser.error(str(e))
+        todo = manifest.todo(frame_n)
+        if len(todo) < len(frame_n):
+            print(f"Skipping {len(frame_n) - len(todo)} frames that were already written")
+    # coordinates of all frames, as with --sharpness-window other frames than the requested frames may be written
+    coords = Video.get_coords(range(start_frame, end_frame))
+    # decode the video sequentially, only the requested frames are retrieved
+    slots = odmax.io.frame_slots(todo, options.sharpness_window)
+    frames = Video.iter_frames(frames=todo, window=options.sharpness_window, motion_gate=motion_gate)
+    # reproject and write frames, concurrently if more than one worker is used
+    results = odmax.pipeline.run(
+        frames,
+        path=options.outpath,
+        prefix=options.prefix,
+        encoder=options.encoder,
+        writer=options.writer,
+        profile=options.profile,
+        encoder_params=get_encoder_params(options),
+        reproject=options.reproject,
+        rig=options.rig,
+        workers=options.workers,
+        queue_depth=options.queue_depth,
+        face_w=options.face_w,
+        faces=options.faces,
+        mode=options.mode,
+        overlap=options.overlap,
+        backend=options.backend,
+        cache_dir=options.cache_dir,
+        memory_budget=options.memory_budget,
+        upload=task,
+    )
     # make a list of work to do
-    work = tqdm(frame_n)
-    for n in work:
-        work.set_description("Processing frame {:5d}".format(n))
-        # extract a Frame object
-        Frame = Video.get_frame(
-            n,
-            options.reproject,
-            face_w=options.face_w,
-            mode=options.mode,
-            overlap=options.overlap
-        )
-        # write to files(s)
-        fn_imgs = Frame.to_file(
-            path=options.outpath,
-            prefix=options.prefix,
-            encoder=options.encoder,
+    work = tqdm(results, total=len(todo))
+    try:
+        for n, fn_imgs in work:
+            work.set_description("Processing frame {:5d}".format(n))
+            if manifest is not None:
+                manifest.add(n, fn_imgs, coord=coords.iloc[n - start_frame] if coords is not None else None, slot=slots[n])
+        if task is not None:
+            task.commit()
+            print(f"Uploaded {task.uploaded} images ({task.bytes / 1024 ** 2:.1f} MB) into task {task.id}, processing has started")
+    finally:
+        if task is not None:
+            task.close()
+    if motion_gate is not None:
+        if manifest is not None:
+            # frames without motion are recorded without files, so that they are skipped when the run is resumed
+            for n in motion_gate.skipped_frames:
+                manifest.add(n, [], slot=slots[n])
+        print(f"Kept {motion_gate.kept} frames, skipped {motion_gate.skipped} frames without motion")
+
+def main_batch():
+    """
+    odmax batch processes many videos at once, e.g. all videos of a field day. Please type `odmax batch` without input
+    arguments or `odmax batch --help` for command-line arguments
+
+    :return:
+    """
+    parser = create_batch_parser()
+    (options, args) = parser.parse_args(sys.argv[2:])
+    if len(args) == 0:
+        raise IOError("No videos provided, please provide one or more directories, glob patterns, list files or video files")
+    check_options(options)
+    fns = odmax.batch.find_videos(args)
+    if len(fns) == 0:
+        raise IOError(f"No video files found in {' '.join(args)}")
+    print(f"Processing videos : {len(fns)}")
+    print(f"Output path       : {options.outpath}")
+    print(f"Encoder           : {options.encoder.lower()}")
+    print(f"Writer            : {options.writer}")
+    print(f"Encoder profile   : {options.profile if options.profile is not None else 'not set, using defaults'}")
+    print(f"Start time        : {options.start_time} seconds")
+    print(f"End time          : {options.end_time} seconds")
+    print(f"Frame interval    : {options.d_frame}")
+    if options.distance_interval is not None:
+        print(f"Distance interval : {options.distance_interval} m")
+    if options.sharpness_window > 0:
+        print(f"Sharpness window  : {options.sharpness_window} frames")
+    if options.motion_threshold is not None:
+        print(f"Motion threshold  : {options.motion_threshold}")
+    print(f"Reprojection      : {'enabled' if options.reproject else 'disabled'}")
+    if options.rig is not None:
+        print(f"Rig               : {len(options.rig.views)} views ({' '.join(options.rig.names)})")
+    print(f"Workers           : {options.workers}")
+    if not(os.path.isdir(options.outpath)):
+        print(f"Output path {options.outpath} does not exist, creating path...")
+        os.makedirs(options.outpath)
+    results = odmax.batch.run(
+        fns,
+        outpath=options.outpath,
+        workers=options.workers,
+        start_time=options.start_time,
+        end_time=options.end_time,
+        d_frame=options.d_frame,
+        distance_interval=options.distance_interval,
+        sharpness_window=options.sharpness_window,
+        motion_threshold=options.motion_threshold,
+        cache=options.gps_cache,
+        overwrite=options.overwrite,
+        prefix=options.prefix,
+        encoder=options.encoder,
+        writer=options.writer,
+        profile=options.profile,
+        encoder_params=get_encoder_params(options),
+        reproject=options.reproject,
+        rig=options.rig,
+        face_w=options.face_w,
+        faces=options.faces,
+        mode=options.mode,
+        overlap=options.overlap,
+        backend=options.backend,
+        cache_dir=options.cache_dir,
+        memory_budget=options.memory_budget,
+    )
+    summaries = []
+    work = tqdm(results, total=len(fns))
+    for summary in work:
+        work.set_description(f"Finished {os.path.basename(summary['file'])}")
+        summaries.append(summary)
+    # report in the order in which the videos were provided
+    order = {fn: i for i, fn in enumerate(fns)}
+    summaries.sort(key=lambda summary: order[summary["file"]])
+    fn_summary = os.path.join(options.outpath, "summary.csv")
+    odmax.batch.write_summary(summaries, fn_summary)
+    print(f"====================")
+    print(f"Summary:")
+    print(f"====================")
+    for summary in summaries:
+        status = "OK" if summary["error"] is None else f"FAILED ({summary['error']})"
+        print(
+            f"{summary['file']}: {summary['frames']} frames ({summary['skipped']} skipped, "
+            f"{summary['static']} without motion), "
+            f"{summary['bytes'] / 1024 ** 2:.1f} MB, "
+            f"{summary['seconds']:.1f} seconds, {status}"
         )
+    print(f"Summary written to {fn_summary}")
 
-def create_parser():
-    parser = OptionParser()
+
+def main_stills():
+    """
+    odmax stills reprojects 360 degree photos (e.g. GoPro Max .JPG photos) to cube faces or the views of a rig. Please
+    type `odmax stills` without input arguments or `odmax stills --help` for command-line arguments
+
+    :return:
+    """
+    parser = create_stills_parser()
+    (options, args) = parser.parse_args(sys.argv[2:])
+    if len(args) == 0:
+        raise IOError("No photos provided, please provide one or more directories, glob patterns, list files or photo files")
+    check_output_options(options)
+    fns = odmax.stills.find_stills(args)
+    if len(fns) == 0:
+        raise IOError(f"No photo files found in {' '.join(args)}")
+    print(f"Processing photos : {len(fns)}")
+    print(f"Output path       : {options.outpath}")
+    print(f"Encoder           : {options.encoder.lower()}")
+    print(f"Writer            : {options.writer}")
+    print(f"Encoder profile   : {options.profile if options.profile is not None else 'not set, using defaults'}")
+    print(f"File prefix       : {options.prefix if options.prefix else 'not set, files are named after the photos'}")
+    print(f"Reprojection      : {'enabled' if options.reproject else 'disabled'}")
+    if options.rig is not None:
+        print(f"Rig               : {len(options.rig.views)} views ({' '.join(options.rig.names)})")
+    if options.reproject and options.rig is None:
+        print(f"Reprojection mode : {options.mode}")
+        print(f"Face width        : {options.face_w if options.face_w is not None else 'not set, estimated from photos'}")
+        print(f"Cube faces        : {' '.join(odmax.process.get_face_suffixes(options.faces))}")
+        print(f"Sampler           : {options.backend}")
+        print(f"Map cache         : {options.cache_dir if options.cache_dir is not None else 'in memory only'}")
+        print(f"Memory budget     : {options.memory_budget if options.memory_budget is not None else odmax.plan.MEMORY_BUDGET} MB")
+    print(f"Workers           : {options.workers}")
+    if not(os.path.isdir(options.outpath)):
+        print(f"Output path {options.outpath} does not exist, creating path...")
+        os.makedirs(options.outpath)
+    results = odmax.stills.run(
+        fns,
+        path=options.outpath,
+        workers=options.workers,
+        prefix=options.prefix,
+        encoder=options.encoder,
+        writer=options.writer,
+        profile=options.profile,
+        encoder_params=get_encoder_params(options),
+        reproject=options.reproject,
+        rig=options.rig,
+        face_w=options.face_w,
+        faces=options.faces,
+        mode=options.mode,
+        overlap=options.overlap,
+        backend=options.backend,
+        cache_dir=options.cache_dir,
+        memory_budget=options.memory_budget,
+    )
+    failed = []
+    files = 0
+    size = 0
+    work = tqdm(results, total=len(fns))
+    for summary in work:
+        work.set_description(f"Finished {os.path.basename(summary['file'])}")
+        if summary["error"] is not None:
+            failed.append(summary)
+        files += len(summary["files"])
+        size += summary["bytes"]
+    print(f"Written {len(fns) - len(failed)} photos to {files} files, {size / 1024 ** 2:.1f} MB")
+    for summary in failed:
+        print(f"{summary['file']}: FAILED ({summary['error']})")
+
+
+def check_options(options):
+    """
+    Check the options for writing, reprojection and selection of frames
+
+    :param options: parsed command-line options
+    :return: None
+    """
+    check_selection_options(options)
+    check_output_options(options)
+
+
+def check_selection_options(options):
+    """
+    Check the options for selection of frames from videos
+
+    :param options: parsed command-line options
+    :return: None
+    """
+    if options.end_time < 0:
+        options.end_time = np.inf
+    if options.end_time <= options.start_time:
+        raise ValueError(f"End time {options.end_time} is smaller or equal than start time {options.start_time}")
+    if options.d_frame < 1:
+        raise ValueError(f"Frame difference {options.d_frame} is smaller than one, has to be at least one")
+    if options.distance_interval is not None and options.distance_interval <= 0:
+        raise ValueError(f"Distance interval {options.distance_interval} must be larger than zero")
+    if options.sharpness_window < 0:
+        raise ValueError(f"Sharpness window {options.sharpness_window} is smaller than zero")
+    if options.motion_threshold is not None and options.motion_threshold <= 0:
+        raise ValueError(f"Motion threshold {options.motion_threshold} must be larger than zero")
+
+
+def check_output_options(options):
+    """
+    Check the options for writing and reprojection, used for videos and photos
+
+    :param options: parsed command-line options
+    :return: None
+    """
+    if options.workers < 1:
+        raise ValueError(f"Amount of workers {options.workers} is smaller than one, has to be at least one")
+    if options.quality is not None and not(1 <= options.quality <= 100):
+        raise ValueError(f"Quality {options.quality} must be between 1 and 100")
+    if options.compress_level is not None and not(0 <= options.compress_level <= 9):
+        raise ValueError(f"PNG compression level {options.compress_level} must be between 0 and 9")
+    if options.memory_budget is not None and options.memory_budget <= 0:
+        raise ValueError(f"Memory budget {options.memory_budget} must be larger than zero")
+    if options.faces is not None:
+        # raises an error for unknown faces, and orders the faces as in the file names, e.g. "lfrb" becomes "FRBL"
+        options.faces = "".join(odmax.process.get_face_suffixes(options.faces))
+    if options.rig is not None:
+        if options.faces is not None:
+            raise ValueError("Cube faces cannot be selected with --faces when a rig is used")
+        # read the rig, views of the rig replace the cube faces
+        options.rig = odmax.rig.Rig.from_file(options.rig, mode=options.mode, backend=options.backend)
+        options.reproject = True
+
+
+def check_upload_options(options):
+    """
+    Check the options for uploading to NodeODM or WebODM, and read the task options
+
+    :param options: parsed command-line options
+    :return: None
+    """
+    if options.upload is None:
+        return
+    if options.connections < 1:
+        raise ValueError(f"Amount of connections {options.connections} is smaller than one, has to be at least one")
+    if options.chunk_size < 1:
+        raise ValueError(f"Chunk size {options.chunk_size} is smaller than one, has to be at least one")
+    if options.task_options is None:
+        # 360 degree stills can only be processed as spherical camera
+        options.task_options = {} if options.reproject else {"camera-lens": "spherical"}
+    else:
+        if os.path.isfile(options.task_options):
+            with open(options.task_options, "r") as f:
+                options.task_options = f.read()
+        try:
+            options.task_options = json.loads(options.task_options)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Task options must be a JSON object or a JSON file: {e}")
+
+
+def get_task(options):
+    """
+    Make the upload task of the command-line options. Tokens and WebODM login details can be set with the environment
+    variables ODM_TOKEN, ODM_USER and ODM_PASSWORD.
+
+    :param options: parsed command-line options
+    :return: odmax.upload.Task instance
+    """
+    return odmax.upload.Task(
+        options.upload,
+        project=options.project,
+        token=options.token if options.token is not None else os.getenv("ODM_TOKEN"),
+        username=options.username if options.username is not None else os.getenv("ODM_USER"),
+        password=os.getenv("ODM_PASSWORD"),
+        name=options.task_name if options.task_name is not None else os.path.splitext(os.path.basename(options.infile))[0],
+        options=options.task_options,
+        connections=options.connections,
+        chunk_size=options.chunk_size,
+    )
+
+
+def get_signature(fn, options):
+    """
+    Signature of the options that determine the content of the written files, recorded in the manifest of the output
+
+    :param fn: str, video file
+    :param options: parsed command-line options
+    :return: dict
+    """
+    return odmax.manifest.get_signature(
+        fn,
+        encoder=options.encoder,
+        profile=options.profile,
+        encoder_params=get_encoder_params(options),
+        reproject=options.reproject,
+        face_w=options.face_w,
+        faces=options.faces,
+        rig=options.rig.to_dict() if options.rig is not None else None,
+        mode=options.mode,
+        overlap=options.overlap,
+        backend=options.backend,
+        motion_threshold=options.motion_threshold,
+    )
+
+
+def get_encoder_params(options):
+    """
+    Collect the encoder parameters that are explicitly set on the command line
+
+    :param options: parsed command-line options
+    :return: dict, encoder parameters as used by PIL
+    """
+    encoder = options.encoder.lower()
+    params = {}
+    if options.quality is not None and encoder in ["jpg", "jpeg", "webp"]:
+        params["quality"] = options.quality
+    if options.compress_level is not None and encoder == "png":
+        params["compress_level"] = options.compress_level
+    if options.webp_method is not None and encoder == "webp":
+        params["method"] = options.webp_method
+    return params
+
+
+def add_options(parser):
+    """
+    Add the options for writing, reprojection and selection of frames, used both for single videos and in batch mode
+
+    :param parser: optparse.OptionParser instance
+    :return: None
+    """
+    add_output_options(parser)
+    add_selection_options(parser)
+    add_reprojection_options(parser)
     parser.add_option(
-        "-i",
-        "--infile",
-        dest="infile",
-        nargs=1,
-        help='Input video file, compatible with OpenCV2. Place path between " " to ensure spaces are interpreted correctly.'
+        "--overwrite",
+        dest="overwrite",
+        action="store_true",
+        help="Write all frames again, also when written in an earlier run (default: not set, frames that were completely written in an earlier run with the same options are skipped, as recorded in <prefix>_manifest.jsonl in the output path).",
+        default=False,
+    )
+    parser.add_option(
+        "--no-gps-cache",
+        dest="gps_cache",
+        action="store_false",
+        help="Do not use the persistent cache of parsed GPS tracks (default: not set, parsed tracks are cached in the directory set by ODMAX_CACHE_DIR, or ~/.cache/odmax).",
+        default=True,
     )
+
+
+def add_output_options(parser, prefix="still", prefix_help='Prefix to use for written image files (default: "still").'):
+    """
+    Add the options for writing of stills, used for videos and photos
+
+    :param parser: optparse.OptionParser instance
+    :param prefix: str, default prefix of written files (default: "still")
+    :param prefix_help: str, help text of the prefix option
+    :return: None
+    """
     parser.add_option(
         "-o",
         "--outpath",
@@ -107,8 +522,8 @@ def create_parser():
         "--prefix",
         dest="prefix",
         nargs=1,
-        help='Prefix to use for written image files (default: "still").',
-        default="still"
+        help=prefix_help,
+        default=prefix
     )
     parser.add_option(
         "-c",
@@ -118,6 +533,53 @@ def create_parser():
         help='encoder to use to write stills (default: jpg). Can be "jpg", "bmp", "jp2", "png" or "webp".',
         default="jpg"
     )
+    parser.add_option(
+        "--writer",
+        dest="writer",
+        nargs=1,
+        type="choice",
+        choices=odmax.io.WRITERS,
+        help='Writing backend for stills, can be "opencv" (fast, encodes directly from the decoded frame) or "pil" (default: "opencv"). Encoders other than "jpg" and "webp" are always written with "pil".',
+        default="opencv"
+    )
+    parser.add_option(
+        "--profile",
+        dest="profile",
+        nargs=1,
+        type="choice",
+        choices=list(odmax.io.PROFILES),
+        help='Encoder profile, can be "fast" (fastest encoding), "balanced" (good quality at moderate file size) or "archive" (highest quality) (default: not set, the defaults of the encoder are used).',
+    )
+    parser.add_option(
+        "--quality",
+        dest="quality",
+        nargs=1,
+        type="int",
+        help='Quality of jpg and webp stills, between 1 and 100 (default: not set, taken from the encoder profile). Overrules the encoder profile.',
+    )
+    parser.add_option(
+        "--png-compression",
+        dest="compress_level",
+        nargs=1,
+        type="int",
+        help='Compression level of png stills, between 0 (fastest) and 9 (smallest) (default: not set, taken from the encoder profile). Overrules the encoder profile.',
+    )
+    parser.add_option(
+        "--webp-method",
+        dest="webp_method",
+        nargs=1,
+        type="int",
+        help='Compression method of webp stills, between 0 (fastest) and 6 (smallest) (default: not set, taken from the encoder profile). Overrules the encoder profile.',
+    )
+
+
+def add_selection_options(parser):
+    """
+    Add the options for selection of frames from videos
+
+    :param parser: optparse.OptionParser instance
+    :return: None
+    """
     parser.add_option(
         "-s",
         "--start-time",
@@ -145,6 +607,37 @@ def create_parser():
         help="Frame step size (default: 1, integer). 1 means all frames between start and end time are processed, 2 means every second frame is processed, etc.",
         default=1,
     )
+    parser.add_option(
+        "--distance-interval",
+        dest="distance_interval",
+        nargs=1,
+        type="float",
+        help="Distance between frames in metres along the GPS track (default: not set, frames are selected with --frame-interval only). When set, the first frame after each passed distance interval is selected from the frames given by --frame-interval, so that fewer frames are extracted when the camera moves slowly or stands still. Requires GPS information in the video.",
+    )
+    parser.add_option(
+        "--sharpness-window",
+        dest="sharpness_window",
+        nargs=1,
+        type="int",
+        help="Amount of frames before and after each selected frame, within which the sharpest frame is written instead of the selected frame (default: 0, the selected frames are written). Sharpness is scored on a small greyscale copy of each frame, which reduces the amount of motion-blurred stills.",
+        default=0,
+    )
+    parser.add_option(
+        "--motion-threshold",
+        dest="motion_threshold",
+        nargs=1,
+        type="float",
+        help="Minimum motion between a frame and the last written frame for the frame to be written (default: not set, frames are written regardless of motion). Motion is the mean absolute difference in grey values (0-255) between small greyscale copies of both frames, a threshold of 2 to 5 skips most frames while the camera stands still. Does not require GPS information, and is used instead of --distance-interval for videos without GPS information.",
+    )
+
+
+def add_reprojection_options(parser):
+    """
+    Add the options for reprojection to cube faces or the views of a rig, used for videos and photos
+
+    :param parser: optparse.OptionParser instance
+    :return: None
+    """
     parser.add_option(
         "-r",
         "--reproject",
@@ -161,6 +654,18 @@ def create_parser():
         type="int",
         help='Length of faces of reprojected cube in pixels (default: not set, the optimal resolution will be estimated from the video file). Only used in combination with --reproject.',
     )
+    parser.add_option(
+        "--faces",
+        dest="faces",
+        nargs=1,
+        help='Cube faces to reproject and write, as a combination of "F" (front), "R" (right), "B" (back), "L" (left), "U" (up) and "D" (down), e.g. "FRBL" to leave out the sky and the ground (default: not set, all 6 faces). Faces that are left out are not computed at all. Only used in combination with --reproject.',
+    )
+    parser.add_option(
+        "--rig",
+        dest="rig",
+        nargs=1,
+        help='JSON or YAML file with a virtual camera rig: a list of perspective views, each with a "name", "yaw" and optionally "pitch", "roll", "fov" (degrees), "width" and "height" (pixels) (default: not set). When set, each frame is reprojected to the views of the rig instead of cube faces, and written with the name of each view as suffix. Implies --reproject.',
+    )
     parser.add_option(
         "-m",
         "--mode",
@@ -177,6 +682,57 @@ def create_parser():
         help='Overlap in cube faces in ratio of face length without overlap. (default: 0.1). This setting ensures that each face shares part of its objective with its neighbouring faces. Only used in combination with --reproject.',
         default=0.1
     )
+    parser.add_option(
+        "--sampler",
+        dest="backend",
+        nargs=1,
+        type="choice",
+        choices=odmax.plan.BACKENDS,
+        help='Sampling backend for reprojection, can be "opencv" (fast, all colour channels at once) or "scipy" (reference implementation) (default: "opencv"). Only used in combination with --reproject.',
+        default="opencv"
+    )
+    parser.add_option(
+        "--map-cache",
+        dest="cache_dir",
+        nargs=1,
+        help='Directory to store reprojection maps in, so that they can be reused in later runs (default: not set, maps are only kept in memory). Only used in combination with --reproject.',
+    )
+    parser.add_option(
+        "--memory-budget",
+        dest="memory_budget",
+        nargs=1,
+        type="float",
+        help=f'Memory in MB for temporary arrays of each reprojection worker (default: {odmax.plan.MEMORY_BUDGET}). Reprojection maps are computed and cube faces are sampled in tiles that fit in this budget. Lower it to run more workers on large (e.g. 8K or 11K) videos. Only used in combination with --reproject.',
+    )
+
+
+def create_parser():
+    parser = OptionParser()
+    parser.add_option(
+        "-i",
+        "--infile",
+        dest="infile",
+        nargs=1,
+        help='Input video file, compatible with OpenCV2. Place path between " " to ensure spaces are interpreted correctly.'
+    )
+    add_options(parser)
+    parser.add_option(
+        "-w",
+        "--workers",
+        dest="workers",
+        nargs=1,
+        type="int",
+        help="Amount of parallel workers for reprojection and writing of stills (default: 1, all frames are processed one by one).",
+        default=1,
+    )
+    parser.add_option(
+        "--queue-depth",
+        dest="queue_depth",
+        nargs=1,
+        type="int",
+        help="Maximum amount of frames in flight when using more than one worker. Limits the memory use (default: twice the amount of workers).",
+    )
+    add_upload_options(parser)
     if len(sys.argv[1:]) == 0:
         print("No arguments supplied")
         parser.print_help()
@@ -184,6 +740,117 @@ def create_parser():
     return parser
 
 
+def add_upload_options(parser):
+    """
+    Add the options for uploading stills into a NodeODM or WebODM task
+
+    :param parser: optparse.OptionParser instance
+    :return: None
+    """
+    parser.add_option(
+        "--upload",
+        dest="upload",
+        nargs=1,
+        help='Url of a NodeODM node (e.g. "http://localhost:3000") or, with --project, a WebODM server (e.g. "http://localhost:8000"), to upload stills to instead of writing them to files (default: not set). Stills are encoded in memory and uploaded into a new task while the video is processed, and the task is committed at the end.',
+    )
+    parser.add_option(
+        "--project",
+        dest="project",
+        nargs=1,
+        type="int",
+        help="Id of the WebODM project in which the task is made (default: not set, --upload is a NodeODM node).",
+    )
+    parser.add_option(
+        "--token",
+        dest="token",
+        nargs=1,
+        help="Token of the NodeODM node, or JWT token of the WebODM server (default: taken from the environment variable ODM_TOKEN).",
+    )
+    parser.add_option(
+        "--username",
+        dest="username",
+        nargs=1,
+        help="WebODM username, used to get a token if no token is given (default: taken from the environment variable ODM_USER). The password is taken from the environment variable ODM_PASSWORD.",
+    )
+    parser.add_option(
+        "--task-name",
+        dest="task_name",
+        nargs=1,
+        help="Name of the task (default: name of the video file).",
+    )
+    parser.add_option(
+        "--task-options",
+        dest="task_options",
+        nargs=1,
+        help='Processing options of the task, as JSON object or JSON file, e.g. \'{"camera-lens": "spherical", "dsm": true}\' (default: {"camera-lens": "spherical"} without --reproject, otherwise no options).',
+    )
+    parser.add_option(
+        "--upload-connections",
+        dest="connections",
+        nargs=1,
+        type="int",
+        help=f"Amount of concurrent upload requests (default: {odmax.upload.CONNECTIONS}).",
+        default=odmax.upload.CONNECTIONS,
+    )
+    parser.add_option(
+        "--upload-chunk-size",
+        dest="chunk_size",
+        nargs=1,
+        type="int",
+        help=f"Amount of stills sent in one upload request (default: {odmax.upload.CHUNK_SIZE}).",
+        default=odmax.upload.CHUNK_SIZE,
+    )
+
+
+def create_batch_parser():
+    parser = OptionParser(
+        usage="%prog batch [options] <directory, glob pattern, list file or video> ...",
+        description='Process many videos at once. Videos are collected from directories, glob patterns (e.g. "/data/*/GS*.360", place between " "), text files with one video per line, or given as video files. Stills of each video are written to their own folder in the output path, and a summary is written to summary.csv.'
+    )
+    add_options(parser)
+    parser.add_option(
+        "-w",
+        "--workers",
+        dest="workers",
+        nargs=1,
+        type="int",
+        help="Amount of videos processed in parallel (default: 1, all videos are processed one by one). The largest videos are processed first.",
+        default=1,
+    )
+    if len(sys.argv[2:]) == 0:
+        print("No arguments supplied")
+        parser.print_help()
+        sys.exit()
+    return parser
+
+
+def create_stills_parser():
+    parser = OptionParser(
+        usage="%prog stills [options] <directory, glob pattern, list file or photo> ...",
+        description='Reproject 360 degree photos (equirectangular JPEG files, e.g. GoPro Max .JPG photos) to cube faces or the views of a rig. Photos are collected from directories, glob patterns (e.g. "/data/*/GS*.JPG", place between " "), text files with one photo per line, or given as photo files. The EXIF tag of each photo (e.g. camera, time and GPS location) is copied to all its faces. Files are named after the photos, e.g. GS__2098_F.jpg.'
+    )
+    add_output_options(
+        parser,
+        prefix="",
+        prefix_help='Prefix to use for written image files, placed before the name of each photo (default: not set, files are named after the photos).'
+    )
+    add_reprojection_options(parser)
+    parser.add_option(
+        "-w",
+        "--workers",
+        dest="workers",
+        nargs=1,
+        type="int",
+        help="Amount of photos processed in parallel (default: 1, all photos are processed one by one). The reprojection maps are computed once and shared with all workers.",
+        default=1,
+    )
+    if len(sys.argv[2:]) == 0:
+        print("No arguments supplied")
+        parser.print_help()
+        sys.exit()
+    return parser
+
+
 if __name__ == '__main__':
     main()
     parser = create_parser()
@@ -1 +1,4 @@
 CUBE_SUFFIX = ["F", "R", "B", "L", "U", "D"]
+
+# mean radius of the earth in metres, used for distances along GPS tracks
+EARTH_RADIUS = 6371008.8
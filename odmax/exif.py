@@ -1,6 +1,9 @@
 import os
+import struct
+import numpy as np
 import piexif
 from fractions import Fraction
+from datetime import datetime, timedelta, timezone
 # recipe derived from https://gist.github.com/c060604/8a51f8999be12fc2be498e9ca56adc72
 def to_deg(value, loc):
     """
@@ -60,10 +63,219 @@ def set_gps_location(lat, lon, elev):
     gps_ifd = {
         piexif.GPSIFD.GPSVersionID: (2, 0, 0, 0),
         piexif.GPSIFD.GPSAltitudeRef: 1 if elev < 0 else 0,
-        piexif.GPSIFD.GPSAltitude: change_to_rational(round(elev, 1)),
+        piexif.GPSIFD.GPSAltitude: change_to_rational(round(abs(elev), 1)),
         piexif.GPSIFD.GPSLatitudeRef: lat_deg[3],
         piexif.GPSIFD.GPSLatitude: exiv_lat,
         piexif.GPSIFD.GPSLongitudeRef: lon_deg[3],
         piexif.GPSIFD.GPSLongitude: exiv_lon,
     }
     return gps_ifd
+
+
+def dump(exif_dict):
+    """
+    Serialise an EXIF tag
+
+    :param exif_dict: dict, holding EXIF tag groups and tags within groups (e.g. "GPS")
+    :return: bytes, EXIF tag
+    """
+    try:
+        return piexif.dump(exif_dict)
+    except:
+        raise ValueError(f"EXIF dict is invalid {exif_dict}")
+
+
+class ExifTemplate:
+    def __init__(self, exif_dict={}):
+        """
+        Create a new ExifTemplate instance. An ExifTemplate serialises the static part of the EXIF tag (e.g. make and
+        model of the camera) once, together with a GPS block of fixed layout. EXIF tags for individual frames are then
+        made by only patching the GPS values into a copy of the serialised template, which can be done for all frames of
+        a video at once.
+
+        :param exif_dict: dict, holding static EXIF tag groups and tags within groups (e.g. "0th", "Exif"). A "GPS" group
+            is replaced by the GPS tags of each frame.
+        """
+        exif_dict = {k: v for k, v in exif_dict.items() if k != "GPS"}
+        # serialised tag without location, for frames without GPS information
+        self.static = dump(exif_dict)
+        # placeholder GPS tags, which fix the layout of the GPS block for all frames
+        exif_dict["GPS"] = {
+            piexif.GPSIFD.GPSVersionID: (2, 0, 0, 0),
+            piexif.GPSIFD.GPSAltitudeRef: 0,
+            piexif.GPSIFD.GPSAltitude: (0, 1),
+            piexif.GPSIFD.GPSLatitudeRef: "N",
+            piexif.GPSIFD.GPSLatitude: ((0, 1), (0, 1), (0, 1)),
+            piexif.GPSIFD.GPSLongitudeRef: "E",
+            piexif.GPSIFD.GPSLongitude: ((0, 1), (0, 1), (0, 1)),
+        }
+        self.template = dump(exif_dict)
+        self.exif_dict = exif_dict
+        # positions of GPS values in the serialised template
+        self.positions = _gps_value_positions(self.template)
+
+    def dump(self, lat, lon, elev):
+        """
+        Make the serialised EXIF tag for one location
+
+        :param lat: float, latitude
+        :param lon: float, longitude
+        :param elev: float, elevation, a missing (NaN) elevation is written as 0
+        :return: bytes, EXIF tag, that can be passed to odmax.io.write_frame as exif_bytes
+        """
+        return self.dump_batch([lat], [lon], [elev])[0]
+
+    def dump_batch(self, lat, lon, elev):
+        """
+        Make the serialised EXIF tags for many locations at once. All degrees, minutes and seconds are computed in one
+        vectorised pass and written into copies of the template.
+
+        :param lat: ND-array of floats, latitudes
+        :param lon: ND-array of floats, longitudes
+        :param elev: ND-array of floats, elevations, missing (NaN) elevations are written as 0
+        :return: list of bytes, EXIF tags, that can be passed to odmax.io.write_frame as exif_bytes
+        """
+        lat, lon, elev = [np.atleast_1d(np.asarray(x, dtype="float")) for x in [lat, lon, elev]]
+        invalid = ~(np.isfinite(lat) & np.isfinite(lon))
+        if invalid.any():
+            raise ValueError(f"{invalid.sum()} of {len(lat)} locations have no finite latitude or longitude, and cannot be written to EXIF")
+        # tracks without altitude give NaN elevations, which cannot be written as rationals
+        elev = np.where(np.isfinite(elev), elev, 0.)
+        tags = np.tile(np.frombuffer(self.template, dtype=np.uint8), (len(lat), 1))
+        for value, tag, tag_ref, refs in [
+            (lat, piexif.GPSIFD.GPSLatitude, piexif.GPSIFD.GPSLatitudeRef, b"SN"),
+            (lon, piexif.GPSIFD.GPSLongitude, piexif.GPSIFD.GPSLongitudeRef, b"WE"),
+        ]:
+            tags[:, self.positions[tag_ref]] = np.where(value < 0, refs[0], refs[1])
+            pos = self.positions[tag]
+            tags[:, pos:pos + 24] = to_deg_rationals(value).view(np.uint8).reshape(-1, 24)
+        tags[:, self.positions[piexif.GPSIFD.GPSAltitudeRef]] = elev < 0
+        # altitude in decimeters
+        altitude = np.stack([np.round(np.abs(elev) * 10), np.full(len(elev), 10)], axis=-1).astype(">u4")
+        pos = self.positions[piexif.GPSIFD.GPSAltitude]
+        tags[:, pos:pos + 8] = altitude.view(np.uint8).reshape(-1, 8)
+        return [tag.tobytes() for tag in tags]
+
+
+def to_deg_rationals(value):
+    """
+    Convert decimal coordinates into degrees, minutes and seconds as EXIF rationals, for many coordinates at once.
+    Seconds are rounded to 5 decimals, as in odmax.exif.to_deg
+
+    :param value: ND-array of floats, coordinates
+    :return: ND-array [N, 6] of big-endian uint32, numerators and denominators of degrees, minutes and seconds
+    """
+    abs_value = np.abs(value)
+    deg = np.floor(abs_value)
+    t1 = (abs_value - deg) * 60
+    min = np.floor(t1)
+    sec = np.round((t1 - min) * 60 * 1e5)
+    ones = np.ones(len(value))
+    return np.stack([deg, ones, min, ones, sec, ones * 1e5], axis=-1).astype(">u4")
+
+
+def from_deg(value, ref):
+    """
+    Convert degrees, minutes and seconds as EXIF rationals into decimal coordinates, the inverse of odmax.exif.to_deg
+
+    :param value: tuple of 3 (numerator, denominator) tuples, degrees, minutes and seconds
+    :param ref: str or bytes, direction, one of "N", "S", "E" or "W"
+    :return: float, coordinate, negative for "S" and "W"
+    """
+    deg, min, sec = [num / den if den != 0 else 0. for num, den in value]
+    ref = ref.decode() if isinstance(ref, bytes) else ref
+    sign = -1 if ref.strip("\x00").upper() in ["S", "W"] else 1
+    return sign * (deg + min / 60 + sec / 3600)
+
+
+def get_location(exif_dict):
+    """
+    Read the GPS location from an EXIF tag
+
+    :param exif_dict: dict, holding EXIF tag groups and tags within groups, e.g. returned by piexif.load
+    :return: tuple (lat, lon, elev) of floats, elevation is 0. if not available, or None if the tag holds no location
+    """
+    gps = exif_dict.get("GPS") or {}
+    try:
+        lat = from_deg(gps[piexif.GPSIFD.GPSLatitude], gps[piexif.GPSIFD.GPSLatitudeRef])
+        lon = from_deg(gps[piexif.GPSIFD.GPSLongitude], gps[piexif.GPSIFD.GPSLongitudeRef])
+    except (KeyError, TypeError, ValueError):
+        return None
+    elev = 0.
+    if piexif.GPSIFD.GPSAltitude in gps:
+        num, den = gps[piexif.GPSIFD.GPSAltitude]
+        elev = num / den if den != 0 else 0.
+        if gps.get(piexif.GPSIFD.GPSAltitudeRef, 0) == 1:
+            elev = -elev
+    return lat, lon, elev
+
+
+def get_datetime(exif_dict):
+    """
+    Read the time of recording from an EXIF tag. The GPS date and time (UTC) are used if available, otherwise the
+    original date and time of the camera clock, which has no time zone.
+
+    :param exif_dict: dict, holding EXIF tag groups and tags within groups, e.g. returned by piexif.load
+    :return: datetime.datetime, or None if the tag holds no time
+    """
+    gps = exif_dict.get("GPS") or {}
+    try:
+        date = datetime.strptime(gps[piexif.GPSIFD.GPSDateStamp].decode().strip("\x00"), "%Y:%m:%d")
+        h, m, s = [num / den for num, den in gps[piexif.GPSIFD.GPSTimeStamp]]
+        return date.replace(tzinfo=timezone.utc) + timedelta(hours=h, minutes=m, seconds=s)
+    except (KeyError, TypeError, ValueError, ZeroDivisionError, UnicodeDecodeError):
+        pass
+    tags = exif_dict.get("Exif") or {}
+    try:
+        t = datetime.strptime(tags[piexif.ExifIFD.DateTimeOriginal].decode().strip("\x00"), "%Y:%m:%d %H:%M:%S")
+    except (KeyError, ValueError, UnicodeDecodeError):
+        return None
+    subsec = tags.get(piexif.ExifIFD.SubSecTimeOriginal, b"").decode(errors="ignore").strip("\x00 ")
+    if subsec.isdigit():
+        t += timedelta(seconds=float(f"0.{subsec}"))
+    return t
+
+
+def face_tags(exif_dict):
+    """
+    Select the tags of a 360 degree photo that remain valid for its reprojected cube faces or rig views, e.g. camera,
+    time and GPS location. The thumbnail, image size and maker notes describe the equirectangular image and are left out,
+    and the orientation is reset, as faces are written as sampled.
+
+    :param exif_dict: dict, holding EXIF tag groups and tags within groups, e.g. returned by piexif.load
+    :return: dict, EXIF tag groups and tags within groups
+    """
+    skip = {
+        "0th": [piexif.ImageIFD.ImageWidth, piexif.ImageIFD.ImageLength, piexif.ImageIFD.Orientation],
+        "Exif": [piexif.ExifIFD.PixelXDimension, piexif.ExifIFD.PixelYDimension, piexif.ExifIFD.MakerNote],
+    }
+    tags = {}
+    for group in ["0th", "Exif", "GPS", "Interop"]:
+        if exif_dict.get(group):
+            tags[group] = {k: v for k, v in exif_dict[group].items() if k not in skip.get(group, [])}
+    return tags
+
+
+def _gps_value_positions(tag):
+    # find the positions of the GPS values in a serialised (big-endian) EXIF tag, starting with "Exif\x00\x00"
+    tiff = 6
+    read = lambda pos, fmt: struct.unpack(fmt, tag[pos:pos + struct.calcsize(fmt)])[0]
+    assert (tag[tiff:tiff + 2] == b"MM"), "Only big-endian EXIF tags are supported"
+    ifd = tiff + read(tiff + 4, ">I")
+    gps_ifd = None
+    for i in range(read(ifd, ">H")):
+        entry = ifd + 2 + i * 12
+        if read(entry, ">H") == piexif.ImageIFD.GPSTag:
+            gps_ifd = tiff + read(entry + 8, ">I")
+    assert (gps_ifd is not None), "No GPS block found in EXIF tag"
+    positions = {}
+    for i in range(read(gps_ifd, ">H")):
+        entry = gps_ifd + 2 + i * 12
+        tag_id, tag_type, count = read(entry, ">H"), read(entry + 2, ">H"), read(entry + 4, ">I")
+        if tag_type == 5:
+            # rationals (8 bytes each) are stored outside of the entry
+            positions[tag_id] = tiff + read(entry + 8, ">I")
+        else:
+            # short values are stored inside the entry
+            positions[tag_id] = entry + 8
+    return positions
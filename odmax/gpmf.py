@@ -0,0 +1,334 @@
+# reader for GoPro GPMF telemetry in MP4 files, see https://github.com/gopro/gpmf-parser for the format specification
+import os
+import struct
+from datetime import datetime, timezone
+import numpy as np
+
+# MP4 boxes that contain other boxes, on the path to the telemetry sample tables
+CONTAINER_BOXES = [b"mdia", b"minf", b"stbl"]
+# MP4 boxes with the sample description and sample tables of a track
+TABLE_BOXES = [b"mdhd", b"stsd", b"stts", b"stsc", b"stsz", b"stco", b"co64"]
+
+# GPMF value types and their big-endian numpy dtypes
+GPMF_TYPES = {
+    b"b": ">i1",
+    b"B": ">u1",
+    b"c": "S1",
+    b"d": ">f8",
+    b"f": ">f4",
+    b"F": "S4",
+    b"j": ">i8",
+    b"J": ">u8",
+    b"l": ">i4",
+    b"L": ">u4",
+    b"q": ">i4",
+    b"Q": ">i8",
+    b"s": ">i2",
+    b"S": ">u2",
+    b"U": "S16",
+}
+# errors raised while reading a damaged or truncated GPMF payload
+PAYLOAD_ERRORS = (struct.error, ValueError, KeyError, IndexError, TypeError)
+
+
+def iter_boxes(f, start, end):
+    """
+    Iterate over MP4 boxes in a byte range of a file, without reading their content
+
+    :param f: file object, opened in binary mode
+    :param start: int, offset of first box
+    :param end: int, offset where the range ends
+    :return: generator of (box type, offset of box content, size of box content)
+    """
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        size, box_type = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            raise IOError(f"Invalid MP4 box {box_type} at offset {pos}")
+        yield box_type, pos + header, size - header
+        pos += size
+
+
+def read_box(f, offset, size):
+    """
+    Read a byte range of a file
+
+    :param f: file object, opened in binary mode
+    :param offset: int, start of range
+    :param size: int, amount of bytes to read
+    :return: bytes
+    """
+    f.seek(offset)
+    return f.read(size)
+
+
+def _read_tables(f, start, end, tables=None):
+    # descend into the container boxes of a track and read the boxes needed to locate its samples
+    if tables is None:
+        tables = {}
+    for box_type, offset, size in iter_boxes(f, start, end):
+        if box_type in CONTAINER_BOXES:
+            _read_tables(f, offset, offset + size, tables=tables)
+        elif box_type in TABLE_BOXES:
+            tables[box_type] = read_box(f, offset, size)
+    return tables
+
+
+def _is_gpmd(track):
+    if b"stsd" not in track:
+        return False
+    stsd = track[b"stsd"]
+    # version/flags (4), entry count (4), then first sample entry: size (4), format (4)
+    return len(stsd) >= 16 and stsd[12:16] == b"gpmd"
+
+
+def get_samples(f):
+    """
+    Locate the GPMF telemetry samples in an opened MP4 file
+
+    :param f: file object, opened in binary mode
+    :return: list of (offset, size, duration in seconds) for each telemetry sample, or None if the file has no
+        GPMF telemetry track
+    """
+    f.seek(0, os.SEEK_END)
+    file_size = f.tell()
+    moov = [(offset, size) for box_type, offset, size in iter_boxes(f, 0, file_size) if box_type == b"moov"]
+    if len(moov) == 0:
+        return None
+    tracks = [
+        _read_tables(f, offset, offset + size)
+        for box_type, offset, size in iter_boxes(f, moov[0][0], moov[0][0] + moov[0][1]) if box_type == b"trak"
+    ]
+    tracks = [t for t in tracks if _is_gpmd(t)]
+    if len(tracks) == 0:
+        return None
+    track = tracks[0]
+    # time scale of the track
+    mdhd = track[b"mdhd"]
+    if mdhd[0] == 1:
+        timescale = struct.unpack(">I", mdhd[20:24])[0]
+    else:
+        timescale = struct.unpack(">I", mdhd[12:16])[0]
+    # sample sizes
+    sample_size, n_samples = struct.unpack(">II", track[b"stsz"][4:12])
+    if sample_size == 0:
+        sizes = np.frombuffer(track[b"stsz"], dtype=">u4", count=n_samples, offset=12).astype("int64")
+    else:
+        sizes = np.full(n_samples, sample_size, dtype="int64")
+    # chunk offsets
+    if b"co64" in track:
+        n_chunks = struct.unpack(">I", track[b"co64"][4:8])[0]
+        chunk_offsets = np.frombuffer(track[b"co64"], dtype=">u8", count=n_chunks, offset=8).astype("int64")
+    else:
+        n_chunks = struct.unpack(">I", track[b"stco"][4:8])[0]
+        chunk_offsets = np.frombuffer(track[b"stco"], dtype=">u4", count=n_chunks, offset=8).astype("int64")
+    # samples per chunk, stored as runs of (first chunk, samples per chunk, sample description index)
+    n_runs = struct.unpack(">I", track[b"stsc"][4:8])[0]
+    runs = np.frombuffer(track[b"stsc"], dtype=">u4", count=n_runs * 3, offset=8).reshape(-1, 3).astype("int64")
+    first_chunks = np.append(runs[:, 0], n_chunks + 1)
+    samples_per_chunk = np.repeat(runs[:, 1], np.diff(first_chunks))
+    # sample durations, stored as runs of (sample count, sample delta)
+    n_durations = struct.unpack(">I", track[b"stts"][4:8])[0]
+    durations = np.frombuffer(track[b"stts"], dtype=">u4", count=n_durations * 2, offset=8).reshape(-1, 2)
+    durations = np.repeat(durations[:, 1], durations[:, 0]).astype("float") / timescale
+    # offset of each sample: offset of its chunk, plus the sizes of the preceding samples in the same chunk
+    chunk_idx = np.repeat(np.arange(len(samples_per_chunk)), samples_per_chunk)[:n_samples]
+    chunk_start = np.cumsum(samples_per_chunk) - samples_per_chunk
+    cum_sizes = np.cumsum(sizes) - sizes
+    offsets = chunk_offsets[chunk_idx] + cum_sizes - cum_sizes[chunk_start[chunk_idx]]
+    return list(zip(offsets.tolist(), sizes.tolist(), durations[:n_samples].tolist()))
+
+
+def iter_klv(buf, offset=0, end=None):
+    """
+    Iterate over GPMF key-length-value items in a buffer
+
+    :param buf: bytes, GPMF payload
+    :param offset: int, start of items in buffer (default: 0)
+    :param end: int, end of items in buffer (default: end of buffer)
+    :return: generator of (key, type, structure size, repeat, offset of data)
+    """
+    if end is None:
+        end = len(buf)
+    while offset + 8 <= end:
+        key, value_type, struct_size, repeat = struct.unpack(">4scBH", buf[offset:offset + 8])
+        if key == b"\x00\x00\x00\x00":
+            # padding
+            break
+        yield key, value_type, struct_size, repeat, offset + 8
+        # data is padded to a multiple of 4 bytes
+        offset += 8 + (struct_size * repeat + 3) // 4 * 4
+
+
+def read_values(buf, value_type, struct_size, repeat, offset, type_def=None):
+    """
+    Read the values of a GPMF item into an array of shape [repeat, values per structure]
+
+    :param buf: bytes, GPMF payload
+    :param value_type: bytes, GPMF type character
+    :param struct_size: int, size of one structure in bytes
+    :param repeat: int, amount of structures
+    :param offset: int, start of data in buffer
+    :param type_def: bytes, types of the structure elements for complex ("?") items, as given by a TYPE item
+    :return: ND-array [repeat, values per structure]
+    """
+    if value_type == b"?":
+        dtype = np.dtype([(f"f{i}", GPMF_TYPES[bytes([c])]) for i, c in enumerate(type_def)])
+        values = np.frombuffer(buf, dtype=dtype, count=repeat, offset=offset)
+        return np.stack([values[name].astype("float") for name in dtype.names], axis=-1)
+    dtype = np.dtype(GPMF_TYPES[value_type])
+    n = struct_size * repeat // dtype.itemsize
+    values = np.frombuffer(buf, dtype=dtype, count=n, offset=offset)
+    if dtype.kind == "S":
+        return values
+    values = values.astype("float").reshape(repeat, -1)
+    if value_type == b"q":
+        # Q15.16 fixed point
+        values /= 2 ** 16
+    elif value_type == b"Q":
+        # Q31.32 fixed point
+        values /= 2 ** 32
+    return values
+
+
+def parse_gpsu(value):
+    """
+    Convert GPMF GPSU time (UTC, formatted as yymmddhhmmss.sss) to time epoch
+
+    :param value: bytes, GPSU value
+    :return: float, seconds since 1970-01-01 00:00:00
+    """
+    t = datetime.strptime(value.decode()[:16], "%y%m%d%H%M%S.%f").replace(tzinfo=timezone.utc)
+    return t.timestamp()
+
+
+def parse_payload(buf):
+    """
+    Read the GPS samples from one GPMF payload. Both GPS5 (HERO5 - HERO10, MAX) and GPS9 (HERO11 and later) streams
+    are read.
+
+    :param buf: bytes, GPMF payload of one telemetry sample
+    :return: dict with "gps" ND-array [N, 3] (lat, lon, elev), "gpsu" time epoch of the payload (GPS5) and "t" time
+        epochs of the samples (GPS9, else None), or None if the payload holds no GPS samples
+    """
+    for key, value_type, struct_size, repeat, offset in iter_klv(buf):
+        if key != b"DEVC" or value_type != b"\x00":
+            continue
+        for s_key, s_type, s_size, s_repeat, s_offset in iter_klv(buf, offset, offset + struct_size * repeat):
+            if s_key != b"STRM" or s_type != b"\x00":
+                continue
+            gps = _parse_stream(buf, s_offset, s_offset + s_size * s_repeat)
+            if gps is not None:
+                return gps
+    return None
+
+
+def _parse_stream(buf, start, end):
+    # read the GPS samples of one stream, sticky values such as SCAL and TYPE precede the samples
+    scal = None
+    type_def = None
+    gpsu = None
+    key_gps = None
+    values = None
+    for key, value_type, struct_size, repeat, offset in iter_klv(buf, start, end):
+        if key == b"SCAL":
+            scal = read_values(buf, value_type, struct_size, repeat, offset).ravel()
+        elif key == b"TYPE":
+            type_def = buf[offset:offset + struct_size * repeat].rstrip(b"\x00")
+        elif key == b"GPSU":
+            gpsu = parse_gpsu(buf[offset:offset + 16])
+        elif key in [b"GPS5", b"GPS9"]:
+            key_gps = key
+            values = read_values(buf, value_type, struct_size, repeat, offset, type_def=type_def)
+    if values is None or len(values) == 0:
+        return None
+    if scal is not None:
+        values = values / scal
+    t = None
+    if key_gps == b"GPS9":
+        # days since 2000-01-01 and seconds since midnight
+        t = datetime(2000, 1, 1, tzinfo=timezone.utc).timestamp() + values[:, 5] * 86400 + values[:, 6]
+    return {"gps": values[:, :3], "gpsu": gpsu, "t": t}
+
+
+def get_gps_track(fn):
+    """
+    Reads the GPS track from the GPMF telemetry of a GoPro MP4 file. Only the telemetry samples are read from the file.
+    GPS5 streams hold one time stamp per payload (of about one second), samples in between are spread evenly until the
+    time stamp of the next payload. Damaged telemetry samples are skipped.
+
+    :param fn: video filename
+    :return: lats, lons, elevs, timestamps, np.ndarray vectors, or None if the file holds no GPMF telemetry
+    """
+    with open(fn, "rb") as f:
+        try:
+            samples = get_samples(f)
+        except (IOError, struct.error, ValueError):
+            # not an MP4 file, or a file that we cannot read
+            return None
+        if samples is None:
+            return None
+        payloads = []
+        for offset, size, duration in samples:
+            try:
+                gps = parse_payload(read_box(f, offset, size))
+            except PAYLOAD_ERRORS:
+                # damaged telemetry sample, skip it as exiftool does
+                continue
+            if gps is not None:
+                payloads.append((gps, duration))
+    coords = []
+    timestamps = []
+    for i, (gps, duration) in enumerate(payloads):
+        n = len(gps["gps"])
+        if gps["t"] is not None:
+            t = gps["t"]
+        elif gps["gpsu"] is not None:
+            t_end = payloads[i + 1][0]["gpsu"] if i + 1 < len(payloads) else None
+            if t_end is None or t_end <= gps["gpsu"]:
+                t_end = gps["gpsu"] + duration
+            t = gps["gpsu"] + np.arange(n) / n * (t_end - gps["gpsu"])
+        else:
+            t = np.full(n, np.nan)
+        coords.append(gps["gps"])
+        timestamps.append(t)
+    if len(coords) == 0:
+        return np.array([]), np.array([]), np.array([]), np.array([])
+    coords = np.concatenate(coords, axis=0)
+    return coords[:, 0], coords[:, 1], coords[:, 2], np.concatenate(timestamps)
+
+
+def get_device_name(fn):
+    """
+    Reads the name of the camera (e.g. "GoPro Max") from the GPMF telemetry of a GoPro MP4 file. Only the first
+    telemetry sample is read from the file.
+
+    :param fn: video filename
+    :return: str, device name, or None if the file holds no GPMF telemetry or no device name
+    """
+    with open(fn, "rb") as f:
+        try:
+            samples = get_samples(f)
+        except (IOError, struct.error, ValueError):
+            return None
+        if not(samples):
+            return None
+        offset, size, _ = samples[0]
+        buf = read_box(f, offset, size)
+    try:
+        for key, value_type, struct_size, repeat, offset in iter_klv(buf):
+            if key != b"DEVC" or value_type != b"\x00":
+                continue
+            for s_key, s_type, s_size, s_repeat, s_offset in iter_klv(buf, offset, offset + struct_size * repeat):
+                if s_key == b"DVNM":
+                    return buf[s_offset:s_offset + s_size * s_repeat].rstrip(b"\x00").decode(errors="ignore")
+    except PAYLOAD_ERRORS:
+        return None
+    return None
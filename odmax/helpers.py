@@ -1,6 +1,10 @@
+import atexit
+import os
 import shutil
+import threading
 from subprocess import Popen, PIPE, call, run
 import numpy as np
+from odmax.consts import EARTH_RADIUS
 
 def assert_cli_exe(cmd):
     """
@@ -11,9 +15,132 @@ def assert_cli_exe(cmd):
     """
     return shutil.which(cmd) is not None
 
+class ExifTool:
+    def __init__(self, executable="exiftool"):
+        """
+        Create a new ExifTool instance. An ExifTool instance manages one exiftool process that is kept open with
+        `-stay_open True`, so that the startup costs of exiftool are only paid once, instead of for every call. The
+        process is started on first use, and can be used from multiple threads. If the instance is used in a forked
+        child process, the child starts its own exiftool process.
+
+        :param executable: str, exiftool executable (default: "exiftool")
+        """
+        self.executable = executable
+        self._process = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        """
+        True if the exiftool process of this instance (and this process) is running
+        """
+        return self._process is not None and self._pid == os.getpid() and self._process.poll() is None
+
+    def start(self):
+        """
+        Start the exiftool process, reading arguments from stdin
+
+        :return: None
+        """
+        self._process = Popen(
+            [self.executable, "-stay_open", "True", "-@", "-"],
+            stdin=PIPE,
+            stdout=PIPE,
+            stderr=PIPE,
+        )
+        self._pid = os.getpid()
+
+    def execute(self, *args):
+        """
+        Execute exiftool with given arguments in the running exiftool process
+
+        :param args: str, command-line arguments for exiftool, e.g. '-ee', '-p', 'gpx.fmt', 'video.mp4'
+        :return: stdout, stderr of exiftool as bytes
+        """
+        with self._lock:
+            if not(self.running):
+                self.start()
+            # exiftool reads one argument per line, "-echo4" marks the end of stderr, "-execute" the end of stdout
+            cmd = "\n".join(list(args) + ["-echo4", "{ready}", "-execute"]) + "\n"
+            self._process.stdin.write(cmd.encode())
+            self._process.stdin.flush()
+            # stderr is read in a thread while stdout is read, as exiftool blocks when either pipe is full
+            stderr = {}
+            reader = threading.Thread(target=self._read_stderr, args=(stderr,), daemon=True)
+            reader.start()
+            try:
+                stdout = self._read_until_ready(self._process.stdout)
+                reader.join()
+                if "error" in stderr:
+                    raise stderr["error"]
+            except IOError:
+                # the process stopped, it is started again on the next call
+                self._process.kill()
+                reader.join()
+                self._process.wait()
+                self._process = None
+                raise
+        return stdout, stderr["output"]
+
+    def terminate(self):
+        """
+        Stop the exiftool process
+
+        :return: None
+        """
+        with self._lock:
+            if not(self.running):
+                self._process = None
+                return
+            try:
+                self._process.stdin.write(b"-stay_open\nFalse\n")
+                self._process.stdin.flush()
+                self._process.communicate(timeout=5)
+            except Exception:
+                self._process.kill()
+                self._process.wait()
+            self._process = None
+
+    def _read_stderr(self, result):
+        try:
+            result["output"] = self._read_until_ready(self._process.stderr)
+        except Exception as e:
+            result["error"] = e
+
+    def _read_until_ready(self, pipe):
+        output = b""
+        fd = pipe.fileno()
+        while not(output.rstrip().endswith(b"{ready}")):
+            chunk = os.read(fd, 65536)
+            if not(chunk):
+                raise IOError(f"{self.executable} stopped unexpectedly")
+            output += chunk
+        return output.rstrip()[:-len(b"{ready}")]
+
+
+_exiftool = ExifTool()
+atexit.register(_exiftool.terminate)
+
+
+def get_exiftool():
+    """
+    Get the shared ExifTool instance, used for all exiftool calls in ODMax
+
+    :return: odmax.helpers.ExifTool instance
+    """
+    return _exiftool
+
+
 def exiftool(*args, warning=False):
-    process = Popen(['exiftool'] + list(args), stdout=PIPE, stderr=PIPE)
-    stdout, stderr = process.communicate()
+    """
+    Call exiftool with given arguments, using the shared, long-running exiftool process
+
+    :param args: str, command-line arguments for exiftool
+    :param warning: bool, print warnings that exiftool reports (default: False)
+    :return: str, output of exiftool
+    """
+    stdout, stderr = get_exiftool().execute(*args)
     if warning:
         if stderr:
             print(f"WARNING: exceptions found during processing: {stderr.decode()}")
@@ -49,3 +176,29 @@ def parse_coords_from_gpx(gpx, remove_missing=True):
         timestamps = timestamps[np.isfinite(timestamps)]
     return lats, lons, elevs, timestamps
 
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance between points, computed for arrays of points at once
+
+    :param lat1, lon1: ND-arrays of floats, latitudes and longitudes of first points in degrees
+    :param lat2, lon2: ND-arrays of floats, latitudes and longitudes of second points in degrees
+    :return: ND-array of floats, distances in metres
+    """
+    lat1, lon1, lat2, lon2 = [np.radians(np.asarray(x, dtype="float")) for x in [lat1, lon1, lat2, lon2]]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0., 1.)))
+
+
+def track_distance(lat, lon):
+    """
+    Cumulative distance along a track
+
+    :param lat: ND-array of floats, latitudes of track points in degrees
+    :param lon: ND-array of floats, longitudes of track points in degrees
+    :return: ND-array of floats, distance from the first point in metres, for each point
+    """
+    lat, lon = np.asarray(lat, dtype="float"), np.asarray(lon, dtype="float")
+    if len(lat) == 0:
+        return np.array([])
+    return np.concatenate([[0.], np.cumsum(haversine(lat[:-1], lon[:-1], lat[1:], lon[1:]))])
@@ -1,10 +1,16 @@
 # I/O functionality for ODMax
+import io
 import os
+import queue
+import struct
+import threading
 import cv2
+import numpy as np
 from odmax import helpers
+from odmax import cache as gps_cache
+from odmax import gpmf
+from odmax import exif as exif_tags
 from datetime import datetime
-import gpxpy
-import piexif
 from PIL import Image
 
 # high level variables
@@ -15,10 +21,56 @@ if os.name == "posix":
 else:
     null_output = "nul"
 
+# frame gap above which seeking is cheaper than decoding all frames in between, in the order of a group of pictures
+MAX_GRAB_GAP = 30
+# width in pixels of the downscaled greyscale copy of a frame, on which its sharpness is scored
+SHARPNESS_WIDTH = 640
+# width in pixels of the downscaled greyscale copy of a frame, on which motion between frames is estimated
+MOTION_WIDTH = 160
+
 # pil uses specific encoder names such as "jpeg", translate if necessary using the below dict
 pil_encoders = {
     "jpg": "jpeg"
 }
+# writing backends: "opencv" encodes directly from the BGR frame with cv2.imencode, "pil" converts to a PIL image first
+WRITERS = ["opencv", "pil"]
+# encoders that the "opencv" backend writes with EXIF tag, other encoders are always written with PIL
+cv2_encoders = ["jpg", "jpeg", "webp"]
+# encoder profiles, with parameters per encoder as used by PIL. Without profile, the defaults of PIL are used
+PROFILES = {
+    "fast": {
+        "jpg": {"quality": 80, "optimize": False, "progressive": False},
+        "png": {"compress_level": 1},
+        "webp": {"quality": 75, "method": 0},
+    },
+    "balanced": {
+        "jpg": {"quality": 85, "optimize": True, "progressive": False},
+        "png": {"compress_level": 3},
+        "webp": {"quality": 85, "method": 4},
+    },
+    "archive": {
+        "jpg": {"quality": 95, "optimize": True, "progressive": True, "subsampling": 0},
+        "png": {"compress_level": 9},
+        "webp": {"quality": 95, "method": 6},
+    },
+}
+# encoder parameters of the "opencv" backend, equal to the defaults of PIL
+cv2_params = {
+    "jpg": {"quality": 75},
+    "webp": {"quality": 80},
+}
+# PIL parameters of the JPEG encoder and their cv2.imencode equivalents
+cv2_jpeg_params = {
+    "quality": cv2.IMWRITE_JPEG_QUALITY,
+    "optimize": cv2.IMWRITE_JPEG_OPTIMIZE,
+    "progressive": cv2.IMWRITE_JPEG_PROGRESSIVE,
+}
+# PIL chroma subsampling (0: 4:4:4, 1: 4:2:2, 2: 4:2:0) and their cv2.imencode equivalents
+cv2_subsampling = {
+    0: cv2.IMWRITE_JPEG_SAMPLING_FACTOR_444,
+    1: cv2.IMWRITE_JPEG_SAMPLING_FACTOR_422,
+    2: cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420,
+}
 
 
 def to_pil(array):
@@ -44,7 +96,7 @@ def open_file(fn):
         # try to open file with openCV
         f = cv2.VideoCapture(fn)
         if not(f.isOpened()):
-            raise(f"Could not recognise file {fn} as a proper video file")
+            raise IOError(f"Could not recognise file {fn} as a proper video file")
         return f
     else:
         raise TypeError(f"{fn} should be a string pointing to a path")
@@ -83,8 +135,209 @@ def read_frame(f, n):
     else:
         raise IOError(f"The requested frame {n} could not be extracted. Perhaps the videofile is damaged.")
 
+def iter_frames(f, frames, max_gap=MAX_GRAB_GAP):
+    """
+    Reads a sequence of frames from opened video file f. The video is only wound to the first frame; after that, frames
+    are decoded sequentially, and only the requested frames are retrieved as image. Seeking is only used when the gap to
+    the next requested frame is larger than max_gap, or when an earlier frame is requested.
+
+    :param f: pointer to opened video file
+    :param frames: iterable of frame numbers, preferably in increasing order
+    :param max_gap: int, gap in frames above which seeking is used instead of sequential decoding (default: 30). Set
+        this to the length of the group of pictures (keyframe interval) of the video for optimal performance.
+    :return: generator of (n, img), frame number and blob containing frame
+    """
+    assert isinstance(f, cv2.VideoCapture)
+    frame_count = f.get(cv2.CAP_PROP_FRAME_COUNT)
+    pos = None
+    for n in frames:
+        assert isinstance(n, int), f"{n} is not an integer"
+        if n > frame_count:
+            raise ValueError(f"The requested frame number {n} is larger than the available frames {frame_count}")
+        if pos is None or n < pos or n - pos > max_gap:
+            # wind to the right frame number
+            f.set(cv2.CAP_PROP_POS_FRAMES, n)
+            pos = n
+        # decode frames without retrieving them until the requested frame is reached
+        while pos < n:
+            if not(f.grab()):
+                raise IOError(f"Frame {pos} could not be decoded. Perhaps the videofile is damaged.")
+            pos += 1
+        success, img = f.read()
+        if not(success):
+            raise IOError(f"The requested frame {n} could not be extracted. Perhaps the videofile is damaged.")
+        pos += 1
+        yield n, img
+
+
+def sharpness(img, width=SHARPNESS_WIDTH):
+    """
+    Scores the sharpness of a frame as the variance of the Laplacian of a downscaled greyscale copy. Blurred frames
+    (e.g. from motion blur) have a lower score than sharp frames of the same scene.
+
+    :param img: ND-array [H, W, 3] with colors in BGR order
+    :param width: int, width of the downscaled copy in pixels (default: 640)
+    :return: float, sharpness score
+    """
+    h, w = img.shape[:2]
+    if w > width:
+        # linear interpolation only samples the frame, which is much faster than averaging with cv2.INTER_AREA
+        img = cv2.resize(img, (width, max(int(round(h * width / w)), 1)), interpolation=cv2.INTER_LINEAR)
+    grey = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    return float(cv2.Laplacian(grey, cv2.CV_32F).var())
+
+
+def sharpness_windows(frames, window):
+    """
+    Candidate frames for each requested frame, within window frames of the requested frame. Windows of neighbouring
+    requested frames do not overlap, and do not extend before the first or after the last requested frame.
+
+    :param frames: list of ints, requested frame numbers in increasing order
+    :param window: int, amount of frames before and after each requested frame that are candidates
+    :return: list of lists of ints, candidate frame numbers for each requested frame
+    """
+    frames = [int(n) for n in frames]
+    windows = []
+    for i, n in enumerate(frames):
+        # windows of neighbouring frames are split halfway
+        lo = (frames[i - 1] + n) // 2 + 1 if i > 0 else n
+        hi = (n + frames[i + 1]) // 2 if i < len(frames) - 1 else n
+        windows.append(list(range(max(lo, n - window), min(hi, n + window) + 1)))
+    return windows
+
+
+def frame_slots(frames, window=0):
+    """
+    Requested frame for each frame that may be returned in its place, e.g. the sharpest frame within its window
+
+    :param frames: list of ints, requested frame numbers in increasing order
+    :param window: int, amount of frames before and after each requested frame that may be returned instead (default: 0)
+    :return: dict, requested frame number for each candidate frame number
+    """
+    return {n: slot for slot, w in zip(frames, sharpness_windows(frames, window)) for n in w}
+
+
+def iter_sharpest_frames(f, frames, window, max_gap=MAX_GRAB_GAP, width=SHARPNESS_WIDTH):
+    """
+    Reads the sharpest frame within a window around each requested frame from opened video file f. All candidate frames
+    are decoded once, sequentially, and scored on a downscaled greyscale copy (see odmax.io.sharpness). Only the
+    sharpest candidate of each window is kept in memory.
+
+    :param f: pointer to opened video file
+    :param frames: list of ints, requested frame numbers in increasing order
+    :param window: int, amount of frames before and after each requested frame that are candidates
+    :param max_gap: int, gap in frames above which seeking is used instead of sequential decoding (default: 30)
+    :param width: int, width of the downscaled copy used for scoring in pixels (default: 640)
+    :return: generator of (n, img), frame number of the sharpest frame and blob containing frame, for each requested
+        frame
+    """
+    windows = sharpness_windows(frames, window)
+    candidates = iter_frames(f, [n for w in windows for n in w], max_gap=max_gap)
+    for w in windows:
+        best = None
+        for _ in w:
+            n, img = next(candidates)
+            score = sharpness(img, width=width)
+            if best is None or score > best[2]:
+                best = (n, img, score)
+        yield best[0], best[1]
+
+
+def thumbnail(img, width=MOTION_WIDTH):
+    """
+    Makes a small greyscale copy of a frame, in which each pixel is the average of a block of the frame, so that noise
+    and compression artefacts are mostly removed.
+
+    :param img: ND-array [H, W, 3] with colors in BGR order
+    :param width: int, width of the copy in pixels (default: 160)
+    :return: ND-array [h, width] of uint8, greyscale copy
+    """
+    h, w = img.shape[:2]
+    size = (width, max(int(round(h * width / w)), 1))
+    if w > 4 * width:
+        # sample to an intermediate size first, averaging the full frame with cv2.INTER_AREA is slow
+        img = cv2.resize(img, (4 * size[0], 4 * size[1]), interpolation=cv2.INTER_LINEAR)
+    img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+
+class MotionGate:
+    def __init__(self, threshold, width=MOTION_WIDTH):
+        """
+        Create a new MotionGate instance. A MotionGate selects frames from a sequence of frames, by comparing each frame
+        with the last selected frame. Frames that hardly differ from the last selected frame (e.g. while the camera
+        stands still) are skipped. Motion is estimated as the mean absolute difference between small greyscale copies
+        of the frames, see odmax.io.thumbnail. This does not require GPS information.
+
+        :param threshold: float, minimum mean absolute difference in grey values (0-255) with the last selected frame,
+            for a frame to be selected
+        :param width: int, width of the greyscale copies in pixels (default: 160)
+        """
+        assert (threshold >= 0), f"motion threshold {threshold} must be zero or larger"
+        self.threshold = threshold
+        self.width = width
+        # amount of selected and skipped frames, and frame numbers of frames skipped by filter
+        self.kept = 0
+        self.skipped = 0
+        self.skipped_frames = []
+        self._last = None
+
+    def keep(self, img):
+        """
+        Decides if a frame is selected, and counts the selected and skipped frames
+
+        :param img: ND-array [H, W, 3] with colors in BGR order
+        :return: bool, True if the frame is selected
+        """
+        thumb = thumbnail(img, width=self.width)
+        if self._last is not None and cv2.absdiff(thumb, self._last).mean() < self.threshold:
+            self.skipped += 1
+            return False
+        self._last = thumb
+        self.kept += 1
+        return True
+
+    def filter(self, frames):
+        """
+        Selects frames from a sequence of frames
+
+        :param frames: iterable of (n, img), frame number and blob containing frame, e.g. from odmax.io.iter_frames
+        :return: generator of (n, img) of the selected frames
+        """
+        for n, img in frames:
+            if self.keep(img):
+                yield n, img
+            else:
+                self.skipped_frames.append(n)
+
 
-def write_frame(img, fn, encoder="jpg", exif_dict={}):
+def get_encoder_params(encoder="jpg", profile=None, encoder_params={}):
+    """
+    Collects the parameters of an encoder from a profile and explicitly provided parameters
+
+    :param encoder: str, encoder (e.g. "jpg", "png" or "webp")
+    :param profile: str, encoder profile, can be "fast", "balanced" or "archive" (default: None, use PIL defaults)
+    :param encoder_params: dict, parameters as used by PIL, e.g. {"quality": 90}, that overrule the profile
+    :return: dict, encoder parameters
+    """
+    if profile is not None and profile not in PROFILES:
+        raise NotImplementedError(f"unknown encoder profile {profile}, choose from {list(PROFILES)}")
+    encoder = "jpg" if encoder.lower() == "jpeg" else encoder.lower()
+    params = dict(PROFILES[profile].get(encoder, {})) if profile is not None else {}
+    params.update(encoder_params)
+    return params
+
+
+def write_frame(
+        img,
+        fn,
+        encoder="jpg",
+        exif_dict={},
+        exif_bytes=None,
+        backend="opencv",
+        profile=None,
+        encoder_params={}
+):
     """
     Writes a frame to a file or bytestream. If a 6-face cube list is provided, 6 files will be written using
     "F", "R", "B", "L", "U", "D" as suffixes for "front", "right", "back", "left", "up" and "down".
@@ -93,21 +346,211 @@ def write_frame(img, fn, encoder="jpg", exif_dict={}):
     :param fn: path or io.BytesIO object to write frame to
     :param encoder: PIL compatible encoder to use for writing
     :param exif_dict: dictionary with EXIF tag groups and tags within groups (e.g. "GPS")
+    :param exif_bytes: bytes, serialised EXIF tag, e.g. made with odmax.exif.ExifTemplate. If provided, exif_dict is
+        ignored and the tag is not serialised again
+    :param backend: str, writing backend, can be "opencv" (encodes directly from the BGR array, only for "jpg" and
+        "webp", other encoders or parameters that cv2.imencode does not support fall back to "pil") or "pil" (default:
+        "opencv")
+    :param profile: str, encoder profile, can be "fast", "balanced" or "archive", see odmax.io.PROFILES (default: None,
+        use PIL defaults)
+    :param encoder_params: dict, parameters as used by PIL (e.g. "quality", "optimize", "progressive", "subsampling"
+        for jpg, "compress_level" for png, "quality", "method", "lossless" for webp), that overrule the profile
     :return:
     """
-
+    if backend not in WRITERS:
+        raise NotImplementedError(f"unknown writing backend {backend}, choose from {WRITERS}")
+    params = get_encoder_params(encoder, profile=profile, encoder_params=encoder_params)
     # determine PIL encoder
     if encoder in pil_encoders:
         # translate
         p_encoder = pil_encoders[encoder]
     else:
         p_encoder = encoder
+    exif = exif_bytes if exif_bytes is not None else exif_tags.dump(exif_dict)
+    # files are written to a temporary file first, so that an interrupted write never leaves a truncated file
+    fn_out = f"{fn}.tmp" if isinstance(fn, str) else fn
+    imencode_params = None
+    if backend == "opencv" and encoder.lower() in cv2_encoders:
+        cv2_encoder = "jpg" if encoder.lower() == "jpeg" else encoder.lower()
+        imencode_params = get_cv2_params(cv2_encoder, params)
     try:
-        exif = piexif.dump(exif_dict)
-    except:
-        raise ValueError(f"EXIF dict is invalid {exif_dict}")
-    # now save with the intended metadata and filename
-    to_pil(img).save(fn, p_encoder.lower(), exif=exif)
+        if imencode_params is not None:
+            data = encode_cv2(img, encoder=cv2_encoder, exif=exif, params=imencode_params)
+            if isinstance(fn, str):
+                with open(fn_out, "wb") as f:
+                    f.write(data)
+            else:
+                fn.write(data)
+        else:
+            # now save with the intended metadata and filename
+            to_pil(img).save(fn_out, p_encoder.lower(), exif=exif, **params)
+        if isinstance(fn, str):
+            os.replace(fn_out, fn)
+    except Exception:
+        # a failed write (e.g. invalid parameters or a full disk) leaves no temporary file behind
+        if isinstance(fn, str) and os.path.isfile(fn_out):
+            os.remove(fn_out)
+        raise
+
+
+def encode_frame(img, encoder="jpg", exif_bytes=b"", backend="opencv", profile=None, encoder_params={}):
+    """
+    Encodes a frame to bytes in memory, as written by odmax.io.write_frame. With the "opencv" backend, the frame is
+    encoded directly with cv2.imencode, without intermediate buffer.
+
+    :param img: ND-array [H, W, 3] with colors in BGR order
+    :param encoder: str, encoder, see odmax.io.write_frame (default: "jpg")
+    :param exif_bytes: bytes, serialised EXIF tag, e.g. made with odmax.exif.ExifTemplate (default: no EXIF tag)
+    :param backend: str, writing backend, can be "opencv" or "pil", see odmax.io.write_frame (default: "opencv")
+    :param profile: str, encoder profile, can be "fast", "balanced" or "archive", see odmax.io.PROFILES (default: None,
+        use PIL defaults)
+    :param encoder_params: dict, encoder parameters as used by PIL (e.g. {"quality": 90}), that overrule the profile
+    :return: bytes, encoded frame
+    """
+    if backend == "opencv" and encoder.lower() in cv2_encoders:
+        cv2_encoder = "jpg" if encoder.lower() == "jpeg" else encoder.lower()
+        imencode_params = get_cv2_params(cv2_encoder, get_encoder_params(encoder, profile=profile, encoder_params=encoder_params))
+        if imencode_params is not None:
+            return encode_cv2(img, encoder=cv2_encoder, exif=exif_bytes, params=imencode_params)
+    buffer = io.BytesIO()
+    write_frame(
+        img,
+        buffer,
+        encoder=encoder,
+        exif_bytes=exif_bytes,
+        backend=backend,
+        profile=profile,
+        encoder_params=encoder_params
+    )
+    return buffer.getvalue()
+
+
+def read_ahead(iterable, depth=1):
+    """
+    Iterates over an iterable (e.g. a generator of decoded frames) in a background thread, ahead of the consumer. At
+    most depth items are kept in a bounded queue, so that the background thread waits when the consumer is slower
+    (backpressure). Errors of the iterable are raised in the consumer. Decoding, reprojection and encoding with OpenCV
+    release the GIL, so that they run concurrently with the consumer.
+
+    :param iterable: iterable, only iterated by the background thread
+    :param depth: int, maximum amount of items that are read ahead (default: 1)
+    :return: generator of the items of iterable
+    """
+    assert (depth >= 1), f"depth {depth} must be at least 1"
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        # wait for room in the queue, unless the consumer stopped
+        while not(stop.is_set()):
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not(put((item, None))):
+                    return
+            put((end, None))
+        except Exception as e:
+            put((end, e))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+        if hasattr(iterable, "close"):
+            iterable.close()
+
+
+def get_cv2_params(encoder, params):
+    """
+    Translates encoder parameters as used by PIL into parameters for cv2.imencode. Parameters that are not given get the
+    defaults of PIL, so that both backends write the same images.
+
+    :param encoder: str, "jpg" or "webp"
+    :param params: dict, encoder parameters as used by PIL
+    :return: list, parameters for cv2.imencode, or None if a parameter is not supported by cv2.imencode
+    """
+    params = {**cv2_params[encoder], **params}
+    imencode_params = []
+    for key, value in params.items():
+        if encoder == "jpg" and key in cv2_jpeg_params:
+            imencode_params += [cv2_jpeg_params[key], int(value)]
+        elif encoder == "jpg" and key == "subsampling" and value in cv2_subsampling:
+            imencode_params += [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, cv2_subsampling[value]]
+        elif encoder == "webp" and key == "quality":
+            if not(params.get("lossless", False)):
+                imencode_params += [cv2.IMWRITE_WEBP_QUALITY, int(value)]
+        elif encoder == "webp" and key == "lossless":
+            if value:
+                # quality above 100 selects lossless compression
+                imencode_params += [cv2.IMWRITE_WEBP_QUALITY, 101]
+        else:
+            return None
+    return imencode_params
+
+
+def encode_cv2(img, encoder="jpg", exif=b"", params=None):
+    """
+    Encodes a frame with cv2.imencode and injects the EXIF tag into the encoded stream, in the same way as PIL does. In
+    JPEG files, the EXIF tag is written as APP1 segment after the JFIF segment. In WebP files, the EXIF tag is written as
+    EXIF chunk in an extended (VP8X) file.
+
+    :param img: ND-array [H, W, 3] with colors in BGR order
+    :param encoder: str, "jpg" or "webp" (default: "jpg")
+    :param exif: bytes, serialised EXIF tag, starting with "Exif\\x00\\x00" (default: no EXIF tag)
+    :param params: list, encoder parameters for cv2.imencode (default: defaults of PIL, see odmax.io.get_cv2_params)
+    :return: bytes, encoded image
+    """
+    if params is None:
+        params = get_cv2_params(encoder, {})
+    ok, buf = cv2.imencode(f".{encoder}", img, params)
+    if not(ok):
+        raise IOError(f"Frame could not be encoded with {encoder}")
+    data = buf.tobytes()
+    if not(exif):
+        return data
+    if encoder == "webp":
+        return _webp_add_exif(data, exif, img.shape[1], img.shape[0])
+    return _jpeg_add_exif(data, exif)
+
+
+def _jpeg_add_exif(data, exif):
+    # insert APP1 segment after the start of image marker and the JFIF (APP0) segment
+    assert (len(exif) + 2 <= 0xFFFF), f"EXIF tag of {len(exif)} bytes is too large for a JPEG APP1 segment"
+    pos = 2
+    if data[2:4] == b"\xff\xe0":
+        pos += 2 + struct.unpack(">H", data[4:6])[0]
+    return data[:pos] + b"\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif + data[pos:]
+
+
+def _webp_add_exif(data, exif, width, height):
+    # turn a simple (VP8 or VP8L) file into an extended file with an EXIF chunk
+    assert (data[12:16] in [b"VP8 ", b"VP8L"]), "Only simple WebP files can be extended with an EXIF tag"
+    if exif.startswith(b"Exif\x00\x00"):
+        exif = exif[6:]
+    # flag for presence of EXIF tag, and canvas width and height minus one as 24-bit integers
+    vp8x = b"VP8X" + struct.pack("<I", 10) + struct.pack("<I", 0x08) + \
+        (width - 1).to_bytes(3, "little") + (height - 1).to_bytes(3, "little")
+    exif_chunk = b"EXIF" + struct.pack("<I", len(exif)) + exif + b"\x00" * (len(exif) % 2)
+    body = b"WEBP" + vp8x + data[12:] + exif_chunk
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
 
 def get_exif(fn, fn_out):
     """
@@ -132,8 +575,59 @@ def get_gpx(fn):
     :param fn: video filename
     :return: parsed gpx data
     """
+    import gpxpy
     if not(os.path.isfile(fn)):
         raise IOError(f"File {fn} does not exist")
     return gpxpy.parse(helpers.exiftool('-ee', '-p', f"{gpx_fmt_fn}", fn))
 
 
+def get_gps_track(fn, cache=True, cache_dir=None, native=True):
+    """
+    Reads the GPS track from a video as vectors. GoPro MP4 files are read directly from their GPMF telemetry track. Other
+    files are read with `exiftool`, if available. Parsed tracks are stored in a persistent cache, keyed on the path, size
+    and modification time of the video, so that reopening a video does not require reading it again.
+
+    :param fn: video filename
+    :param cache: bool, use the persistent cache of parsed tracks (default: True)
+    :param cache_dir: str, cache directory (default: odmax.cache.CACHE_DIR)
+    :param native: bool, read GoPro GPMF telemetry without `exiftool` (default: True)
+    :return: lats, lons, elevs, timestamps, np.ndarray vectors, timestamps are NaN for points without time. None if
+        the track cannot be read, because the file holds no GPMF telemetry and `exiftool` is not available.
+    """
+    if cache:
+        track = gps_cache.load_track(fn, cache_dir=cache_dir)
+        if track is not None:
+            return track
+    track = gpmf.get_gps_track(fn) if native else None
+    if track is None:
+        if not(helpers.assert_cli_exe("exiftool")):
+            return None
+        import gpxpy
+        try:
+            gpx = get_gpx(fn)
+        except gpxpy.gpx.GPXException:
+            # no (readable) GPS track in video, store an empty track so that the video is not scanned again
+            gpx = gpxpy.gpx.GPX()
+        track = helpers.parse_coords_from_gpx(gpx, remove_missing=False)
+    if cache:
+        device_name = gpmf.get_device_name(fn) if native else None
+        gps_cache.save_track(fn, *track, cache_dir=cache_dir, device_name=device_name)
+    return track
+
+
+def get_device_name(fn, cache=True, cache_dir=None, native=True):
+    """
+    Reads the name of the camera (e.g. "GoPro Max") from the GPMF telemetry of a GoPro MP4 file. The device name is
+    stored in the persistent cache together with the GPS track, see get_gps_track.
+
+    :param fn: video filename
+    :param cache: bool, use the persistent cache of parsed tracks (default: True)
+    :param cache_dir: str, cache directory (default: odmax.cache.CACHE_DIR)
+    :param native: bool, read GoPro GPMF telemetry (default: True)
+    :return: str, device name, or None if the file holds no GPMF telemetry or no device name
+    """
+    if cache:
+        device_name = gps_cache.load_device_name(fn, cache_dir=cache_dir)
+        if device_name is not None:
+            return device_name or None
+    return gpmf.get_device_name(fn) if native else None
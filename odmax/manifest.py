@@ -0,0 +1,159 @@
+# on-disk record of written frames, so that an interrupted run can be resumed without redoing finished frames
+import hashlib
+import json
+import os
+
+# name of the manifest file in the output path, one manifest is kept per file prefix
+MANIFEST_FN = "{:s}_manifest.jsonl"
+
+
+def checksum(fn):
+    """
+    SHA-1 checksum of a file
+
+    :param fn: str, filename
+    :return: str, hexadecimal checksum
+    """
+    h = hashlib.sha1()
+    with open(fn, "rb") as f:
+        for block in iter(lambda: f.read(1024 ** 2), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Manifest:
+    def __init__(self, path, prefix="still", signature={}, overwrite=False):
+        """
+        Create a new Manifest instance. A Manifest is an append-only JSON lines file in the output path, that records each
+        completed frame with its output files, their sizes and checksums, and its coordinate. The first line holds the
+        signature of the options that the files were written with. A run with the same options skips the recorded frames,
+        frames that are not recorded (e.g. with only part of their cube faces written) are written again.
+
+        :param path: str, output path in which the manifest is kept
+        :param prefix: str, prefix of the written files (default: "still")
+        :param signature: dict, options that determine the content of the written files, e.g. encoder and face width
+        :param overwrite: bool, discard an existing manifest, so that all frames are written again (default: False)
+        """
+        self.fn = os.path.join(path, MANIFEST_FN.format(prefix))
+        self.path = path
+        # compare signatures in their JSON form, e.g. with lists instead of tuples
+        self.signature = json.loads(json.dumps(signature))
+        self.frames = {}
+        if os.path.isfile(self.fn) and not(overwrite):
+            self._read()
+        else:
+            self._rewrite()
+
+    def _read(self):
+        complete = True
+        with open(self.fn, "r") as f:
+            lines = f.read().splitlines()
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, json.JSONDecodeError):
+            # manifest was interrupted before its header was written
+            self._rewrite()
+            return
+        signature = header.get("signature") or {}
+        if signature != self.signature:
+            changed = sorted(k for k in set(signature) | set(self.signature) if signature.get(k) != self.signature.get(k))
+            raise ValueError(
+                f"Output path {self.path} was written with different options ({', '.join(changed)}), use another "
+                f"output path, or write all frames again with --overwrite"
+            )
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # line that was cut off when the run was killed
+                complete = False
+                continue
+            self.frames[entry.get("slot", entry["frame"])] = entry
+        if not(complete):
+            self._rewrite()
+
+    def _rewrite(self):
+        # write the header and all complete entries to a temporary file first, so that the manifest is never lost
+        fn_tmp = f"{self.fn}.tmp"
+        with open(fn_tmp, "w") as f:
+            f.write(json.dumps({"signature": self.signature}) + "\n")
+            for entry in self.frames.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(fn_tmp, self.fn)
+
+    def done(self, n):
+        """
+        Check if a frame was completely written. The output files of the frame must still exist with their recorded size.
+
+        :param n: int, requested frame number
+        :return: bool
+        """
+        entry = self.frames.get(n)
+        if entry is None:
+            return False
+        for fn, size in zip(entry["files"], entry["bytes"]):
+            fn = os.path.join(self.path, fn)
+            if not(os.path.isfile(fn)) or os.path.getsize(fn) != size:
+                return False
+        return True
+
+    def todo(self, frames):
+        """
+        Select the frames that still need to be written
+
+        :param frames: list of ints, frame numbers
+        :return: list of ints, frame numbers that are not completely written
+        """
+        return [n for n in frames if not(self.done(n))]
+
+    def add(self, n, fns, coord=None, slot=None):
+        """
+        Record a completely written frame
+
+        :param n: int, frame number
+        :param fns: str or list of str, output filenames of the frame, an empty list records a frame that was
+            deliberately not written, e.g. as the camera did not move
+        :param coord: pandas DataFrame row holding latitude, longitude and elevation of the frame (default: None)
+        :param slot: int, requested frame number, if another frame was written in its place, e.g. a sharper frame
+            nearby (default: None, the frame itself was requested)
+        :return: None
+        """
+        fns = fns if isinstance(fns, list) else [fns]
+        entry = {
+            "frame": int(n),
+            "slot": int(slot if slot is not None else n),
+            "files": [os.path.relpath(fn, self.path) for fn in fns],
+            "bytes": [os.path.getsize(fn) for fn in fns],
+            "sha1": [checksum(fn) for fn in fns],
+            "coord": [float(coord.lat), float(coord.lon), float(coord.elev)] if coord is not None else None,
+        }
+        self.frames[entry["slot"]] = entry
+        with open(self.fn, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def verify(self, n):
+        """
+        Check the checksums of the output files of a recorded frame
+
+        :param n: int, requested frame number
+        :return: bool, True if all files exist and match their checksum
+        """
+        if not(self.done(n)):
+            return False
+        entry = self.frames[n]
+        return all(checksum(os.path.join(self.path, fn)) == sha1 for fn, sha1 in zip(entry["files"], entry["sha1"]))
+
+
+def get_signature(fn, **kwargs):
+    """
+    Signature of a run, consisting of the video and the options that determine the content of the written files
+
+    :param fn: str, video file
+    :param kwargs: options for writing and reprojection, e.g. encoder, profile and face_w. Options that are None are left
+        out
+    :return: dict
+    """
+    stat = os.stat(fn)
+    signature = {"video": os.path.basename(fn), "size": stat.st_size}
+    signature.update({k: v for k, v in sorted(kwargs.items()) if v is not None})
+    return signature
@@ -0,0 +1,125 @@
+# staged processing of frames: decoding, reprojection and writing run concurrently
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from odmax import plan, process
+
+
+# virtual camera rig of a worker process, received once when the worker starts
+_rig = None
+
+
+def _init_worker(reproject_plan, rig=None):
+    # register the plan (or rig with its maps) of the parent process, so that workers do not recompute it
+    global _rig
+    if reproject_plan is not None:
+        plan.add_plan(reproject_plan)
+    _rig = rig
+
+
+def _reproject(img, reproject_kwargs):
+    if _rig is not None:
+        return _rig.sample(img)
+    return process.reproject_cube(img, **reproject_kwargs)
+
+
+def _write(frame, img, path, prefix, write_kwargs, upload=None):
+    if img is not None:
+        # wait for the reprojected cube faces
+        frame.img = img.result()
+    if upload is not None:
+        return upload.add_frame(frame, prefix=prefix, **write_kwargs)
+    return frame.to_file(path=path, prefix=prefix, **write_kwargs)
+
+
+def run(
+        frames,
+        path=".",
+        prefix="still",
+        encoder="jpg",
+        writer="opencv",
+        profile=None,
+        encoder_params={},
+        reproject=False,
+        rig=None,
+        workers=1,
+        queue_depth=None,
+        upload=None,
+        **kwargs
+):
+    """
+    Process and write frames in a staged pipeline. Frames are decoded by the caller (e.g. through Video.iter_frames
+    without reprojection), reprojected to cube faces in a pool of processes and encoded and written to files in a pool of
+    threads. The reprojection plan is computed once in the calling process and handed to each worker process. The
+    amount of frames in flight is limited to queue_depth, so that memory use does not depend on the length of the video.
+    Results are returned in the order of the frames, and file names are the same as with odmax.Frame.to_file.
+
+    :param frames: iterable of odmax.Frame instances, not yet reprojected
+    :param path: str, Path to write frames to
+    :param prefix: str, Prefix for files
+    :param encoder: str, default is "jpg"
+    :param writer: str, writing backend, can be "opencv" or "pil", see odmax.io.write_frame (default: "opencv")
+    :param profile: str, encoder profile, can be "fast", "balanced" or "archive", see odmax.io.PROFILES (default: None,
+        use PIL defaults)
+    :param encoder_params: dict, encoder parameters as used by PIL (e.g. {"quality": 90}), that overrule the profile
+    :param reproject: bool, set to True if you want to reproject to 6 cube-faces
+    :param rig: odmax.rig.Rig, virtual camera rig, if provided, frames are reprojected to the perspective views of the
+        rig instead of cube faces (default: None)
+    :param workers: int, amount of worker processes for reprojection and threads for writing (default: 1, process all
+        stages serially in the calling process)
+    :param queue_depth: int, maximum amount of frames in flight (default: twice the amount of workers)
+    :param upload: odmax.upload.Task, if provided, frames are encoded in memory and uploaded into the task instead of
+        written to files, see odmax.upload.Task.add_frame (default: None)
+    :param kwargs: keyword arguments for cube reprojection, see odmax.process.reproject_cube, e.g. faces="FRBL" to
+        reproject and write only a selection of cube faces
+    :return: generator of (frame number, output filename(s)) for each frame, without path if frames are uploaded
+    """
+    write_kwargs = {"encoder": encoder, "backend": writer, "profile": profile, "encoder_params": encoder_params}
+    faces = rig.names if rig is not None else process.get_face_suffixes(kwargs.get("faces"))
+    if workers <= 1:
+        for frame in frames:
+            if reproject:
+                frame.img = rig.sample(frame.img) if rig is not None else process.reproject_cube(frame.img, **kwargs)
+                frame.faces = faces
+            yield frame.frame_number, _write(frame, None, path, prefix, write_kwargs, upload=upload)
+        return
+    if queue_depth is None:
+        queue_depth = 2 * workers
+    assert (queue_depth >= 1), f"queue depth {queue_depth} must be at least 1"
+    # workers retrieve the plan from their own cache, instead of receiving it with every frame
+    worker_kwargs = {k: v for k, v in kwargs.items() if k != "plan"}
+    reproject_pool = None
+    writer_pool = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for frame in frames:
+            img = None
+            if reproject:
+                if reproject_pool is None:
+                    # compute the plan (or maps of the rig) once, with the shape of the first frame
+                    if rig is not None:
+                        rig.get_maps(frame.img.shape)
+                        reproject_plan = None
+                    else:
+                        reproject_plan = process.get_cube_plan(frame.img.shape, **kwargs)
+                    reproject_pool = ProcessPoolExecutor(
+                        max_workers=workers,
+                        initializer=_init_worker,
+                        initargs=(reproject_plan, rig)
+                    )
+                img = reproject_pool.submit(_reproject, frame.img, worker_kwargs)
+                # the raw frame is no longer needed in this process
+                frame.img = None
+                frame.faces = faces
+            pending.append((frame.frame_number, writer_pool.submit(_write, frame, img, path, prefix, write_kwargs, upload)))
+            while len(pending) >= queue_depth:
+                n, fns = pending.popleft()
+                yield n, fns.result()
+        while pending:
+            n, fns = pending.popleft()
+            yield n, fns.result()
+    finally:
+        for _, fns in pending:
+            fns.cancel()
+        writer_pool.shutdown(wait=True)
+        if reproject_pool is not None:
+            reproject_pool.shutdown(wait=True)
@@ -0,0 +1,456 @@
+# reprojection plans: sampling maps that are computed once and reused for every frame of a video
+import os
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+from odmax import utils
+from odmax.consts import CUBE_SUFFIX
+
+# maximum number of reprojection plans kept in memory
+MAX_PLANS = 8
+# default memory in megabytes for temporary arrays while computing and sampling plans, plans are processed in tiles of
+# rows that fit in this budget
+MEMORY_BUDGET = 256
+# approximate bytes of temporary arrays per cube face pixel while computing sampling coordinates
+TILE_BYTES_PER_PIXEL = 64
+# sampling backends: "opencv" samples all channels in one pass with cv2.remap, "scipy" is the reference implementation
+BACKENDS = ["opencv", "scipy"]
+_plans = OrderedDict()
+_lock = threading.RLock()
+
+
+class ReprojectionPlan:
+    def __init__(
+            self,
+            h,
+            w,
+            face_w=256,
+            overlap=0.,
+            mode="bilinear",
+            cube_format="dice",
+            backend="opencv",
+            faces=None,
+            coor_xy=None,
+            maps=None,
+            memory_budget=None
+    ):
+        """
+        Create a new ReprojectionPlan instance. A ReprojectionPlan holds the coordinates in the equirectangular image
+        that are sampled for each pixel of the cube faces. These only depend on the size of the equirectangular image
+        and the cube settings, and can therefore be reused for all frames of a video.
+
+        :param h: int, height of the equirectangular image
+        :param w: int, width of the equirectangular image
+        :param face_w: int, amount of pixels per face (default: 256)
+        :param overlap: float, fractional overlap between each face (default: 0.)
+        :param mode: str, interpolation method, can be "bilinear" or "nearest" (default: "bilinear")
+        :param cube_format: str, way the cubemap is organised (default: "dice")
+        :param backend: str, sampling backend, can be "opencv" or "scipy" (default: "opencv")
+        :param faces: list of ints, indices of the cube faces that are sampled, in [F R B L U D] order (default: None,
+            all faces). A selection of faces can only be organised as "horizon", "list" or "dict"
+        :param coor_xy: ND-array [face_w, face_w * len(faces), 2], precomputed coordinates, computed when not provided
+        :param maps: tuple of precomputed cv2.remap maps, only used with the "opencv" backend
+        :param memory_budget: float, memory in megabytes for temporary arrays, coordinates are computed and sampled in
+            tiles of rows that fit in this budget (default: None, odmax.plan.MEMORY_BUDGET)
+        """
+        if mode not in ["bilinear", "nearest"]:
+            raise NotImplementedError('unknown mode')
+        if cube_format not in ["horizon", "list", "dict", "dice"]:
+            raise NotImplementedError('unknown cube_format')
+        if backend not in BACKENDS:
+            raise NotImplementedError(f'unknown backend {backend}, choose from {BACKENDS}')
+        faces = tuple(range(6)) if faces is None else tuple(sorted(set(int(i) for i in faces)))
+        assert (len(faces) > 0 and all(0 <= i < 6 for i in faces)), f"faces {faces} must be indices between 0 and 5"
+        assert (cube_format != "dice" or len(faces) == 6), "a selection of faces cannot be organised as dice"
+        self.faces = faces
+        self.h = int(h)
+        self.w = int(w)
+        self.face_w = int(face_w)
+        self.overlap = float(overlap)
+        self.mode = mode
+        self.cube_format = cube_format
+        self.backend = backend
+        self.memory_budget = float(memory_budget if memory_budget is not None else MEMORY_BUDGET)
+        self.coor_xy = None
+        self.maps = None
+        if backend == "opencv" and maps is not None:
+            self.maps = maps
+            return
+        shape = (self.face_w, self.face_w * len(self.faces))
+        if coor_xy is not None:
+            assert (coor_xy.shape == (*shape, 2)), f"coordinates of shape {coor_xy.shape} do not fit face width {self.face_w}"
+            if backend == "opencv":
+                self.maps = utils.remap_maps(coor_xy, self.h, self.order)
+            else:
+                self.coor_xy = coor_xy
+            return
+        # compute the coordinates in tiles of rows, written in preallocated arrays, so that the float temporaries
+        # stay within the memory budget
+        if backend == "opencv":
+            # only the fixed-point maps are needed for sampling, the float coordinates are not kept
+            self.maps = (
+                np.empty((*shape, 2), dtype=np.int16),
+                np.empty(shape, dtype=np.uint16) if self.order == 1 else None
+            )
+        else:
+            self.coor_xy = np.empty((*shape, 2), dtype=np.float32)
+        for rows in self.tiles(TILE_BYTES_PER_PIXEL * shape[1]):
+            xyz = utils.xyzcube(self.face_w, overlap=self.overlap, faces=self.faces, rows=rows)
+            uv = utils.xyz2uv(xyz)
+            coor_xy = utils.uv2coor(uv, self.h, self.w)
+            if backend == "opencv":
+                map1, map2 = utils.remap_maps(coor_xy, self.h, self.order)
+                self.maps[0][rows] = map1
+                if map2 is not None:
+                    self.maps[1][rows] = map2
+            else:
+                self.coor_xy[rows] = coor_xy
+
+    def tiles(self, row_bytes):
+        """
+        Tiles of rows of the cube faces, each fitting in the memory budget
+
+        :param row_bytes: int, bytes of temporary arrays needed per row
+        :return: list of slices
+        """
+        n = max(int(self.memory_budget * 1024 ** 2 // row_bytes), 1)
+        return [slice(i, min(i + n, self.face_w)) for i in range(0, self.face_w, n)]
+
+    @property
+    def key(self):
+        """
+        Key under which the plan is cached, consisting of (h, w, face_w, overlap, mode, cube_format, backend, faces)
+        """
+        return plan_key(self.h, self.w, self.face_w, self.overlap, self.mode, self.cube_format, self.backend, self.faces)
+
+    @property
+    def order(self):
+        """
+        Spline order used for sampling, 1 for bilinear, 0 for nearest
+        """
+        return 1 if self.mode == "bilinear" else 0
+
+    def sample(self, e_img):
+        """
+        Sample an equirectangular image into a horizontal cube strip with the plan's coordinates
+
+        :param e_img: ND-array [H, W, C], equirectangular image of the same size as the plan
+        :return: ND-array [face_w, face_w * len(faces), C] with the selected cube faces in [F R B L U D] order
+        """
+        assert (e_img.shape[:2] == (self.h, self.w)), f"image of shape {e_img.shape[:2]} does not fit plan for {(self.h, self.w)}"
+        if self.backend == "opencv":
+            return utils.sample_equirec_remap(e_img, *self.maps, order=self.order)
+        return np.stack([
+            utils.sample_equirec(e_img[..., i], self.coor_xy, order=self.order)
+            for i in range(e_img.shape[2])
+        ], axis=-1)
+
+    def sample_faces(self, e_img, out=None):
+        """
+        Sample an equirectangular image into separate cube faces with the plan's coordinates. Each face is sampled
+        directly in its own buffer, in tiles of rows that fit in the memory budget, so that no full cube strip or other
+        temporaries of the size of the output are made.
+
+        :param e_img: ND-array [H, W, C], equirectangular image of the same size as the plan
+        :param out: list of ND-arrays [face_w, face_w, C], preallocated buffers for the faces, e.g. the faces of a
+            previous frame, in the dtype of e_img (default: None, new buffers are allocated)
+        :return: list of ND-arrays [face_w, face_w, C] with the selected cube faces in [F R B L U D] order
+        """
+        assert (e_img.shape[:2] == (self.h, self.w)), f"image of shape {e_img.shape[:2]} does not fit plan for {(self.h, self.w)}"
+        shape = (self.face_w, self.face_w, *e_img.shape[2:])
+        if out is None:
+            out = [np.empty(shape, dtype=e_img.dtype) for _ in self.faces]
+        assert (len(out) == len(self.faces)), f"{len(self.faces)} face buffers are expected, but {len(out)} were provided"
+        for face in out:
+            assert (face.shape == shape and face.dtype == e_img.dtype and face.flags.c_contiguous), f"face buffer of shape {face.shape} and dtype {face.dtype} does not fit faces of shape {shape} and dtype {e_img.dtype}"
+        if self.backend == "opencv":
+            interpolation = cv2.INTER_LINEAR if self.order == 1 else cv2.INTER_NEAREST
+            for j, face in enumerate(out):
+                cols = slice(j * self.face_w, (j + 1) * self.face_w)
+                # cv2.remap writes directly in the face buffer, and needs no temporaries
+                cv2.remap(
+                    e_img,
+                    self.maps[0][:, cols],
+                    None if self.maps[1] is None else self.maps[1][:, cols],
+                    interpolation,
+                    dst=face if face.shape[2] > 1 else face[..., 0],
+                    borderMode=cv2.BORDER_WRAP
+                )
+            return out
+        # map_coordinates needs float64 coordinates and output of each tile
+        tiles = self.tiles(32 * self.face_w)
+        for c in range(e_img.shape[2]):
+            padded = utils.pad_equirec(e_img[..., c])
+            for j, face in enumerate(out):
+                cols = slice(j * self.face_w, (j + 1) * self.face_w)
+                for rows in tiles:
+                    face[rows, :, c] = utils.sample_equirec(
+                        padded,
+                        self.coor_xy[rows, cols],
+                        order=self.order,
+                        padded=True
+                    )
+        return out
+
+    def to_file(self, fn):
+        """
+        Write plan to a .npz file on disk, so that it can be reused in later sessions. The plan is written to a
+        temporary file first, so that other processes never read a partially written plan.
+
+        :param fn: str, filename
+        :return: None
+        """
+        if self.backend == "opencv":
+            arrays = {"map1": self.maps[0]}
+            if self.maps[1] is not None:
+                arrays["map2"] = self.maps[1]
+        else:
+            arrays = {"coor_xy": self.coor_xy}
+        fn_tmp = f"{fn}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(fn_tmp, "wb") as f:
+                np.savez(
+                    f,
+                    shape=np.array([self.h, self.w, self.face_w]),
+                    overlap=self.overlap,
+                    mode=self.mode,
+                    cube_format=self.cube_format,
+                    backend=self.backend,
+                    faces=np.array(self.faces),
+                    **arrays
+                )
+            os.replace(fn_tmp, fn)
+        except Exception:
+            if os.path.isfile(fn_tmp):
+                os.remove(fn_tmp)
+            raise
+
+    @classmethod
+    def from_file(cls, fn):
+        """
+        Read plan from a .npz file written with ReprojectionPlan.to_file
+
+        :param fn: str, filename
+        :return: odmax.plan.ReprojectionPlan instance
+        """
+        with np.load(fn) as data:
+            h, w, face_w = data["shape"]
+            backend = str(data["backend"])
+            if backend == "opencv":
+                maps = (data["map1"], data["map2"] if "map2" in data else None)
+                coor_xy = None
+            else:
+                maps = None
+                coor_xy = data["coor_xy"]
+            return cls(
+                h,
+                w,
+                face_w=face_w,
+                overlap=float(data["overlap"]),
+                mode=str(data["mode"]),
+                cube_format=str(data["cube_format"]),
+                backend=backend,
+                # plans written before faces could be selected hold all faces
+                faces=data["faces"].tolist() if "faces" in data else None,
+                coor_xy=coor_xy,
+                maps=maps
+            )
+
+
+class EquirectPlan:
+    def __init__(self, h, w, face_w, mode="bilinear", backend="opencv"):
+        """
+        Create a new EquirectPlan instance. An EquirectPlan holds, for each pixel of an equirectangular image, the
+        cube face and the coordinates within that face that are sampled to stitch cube faces back to an
+        equirectangular image (see odmax.py360.c2e). The faces are sampled from one atlas of stacked faces (see
+        odmax.utils.cube_atlas), so that all faces and colour channels are sampled at once in the dtype of the faces.
+
+        :param h: int, height of the equirectangular image
+        :param w: int, width of the equirectangular image
+        :param face_w: int, amount of pixels per face
+        :param mode: str, interpolation method, can be "bilinear" or "nearest" (default: "bilinear")
+        :param backend: str, sampling backend, can be "opencv" or "scipy" (default: "opencv")
+        """
+        if mode not in ["bilinear", "nearest"]:
+            raise NotImplementedError('unknown mode')
+        if backend not in BACKENDS:
+            raise NotImplementedError(f'unknown backend {backend}, choose from {BACKENDS}')
+        assert (w % 8 == 0), f"width {w} of equirectangular image must be a multiple of 8"
+        self.h = int(h)
+        self.w = int(w)
+        self.face_w = int(face_w)
+        self.mode = mode
+        self.backend = backend
+        self.maps = None
+        self.coor_xy = None
+        tp, coor_x, coor_y = utils.equirect_facecoor(self.h, self.w, self.face_w)
+        # coordinates in the atlas, in which faces are stacked vertically with a border of one pixel
+        coor_x += 1
+        coor_y += tp * (self.face_w + 2) + 1
+        del tp
+        if backend == "opencv":
+            assert (6 * (self.face_w + 2) < 32767), f"face width {face_w} is too large for the opencv backend"
+            self.maps = cv2.convertMaps(coor_x, coor_y, cv2.CV_16SC2, nninterpolation=(self.order == 0))
+        else:
+            self.coor_xy = np.stack([coor_x, coor_y], axis=-1)
+
+    @property
+    def key(self):
+        """
+        Key under which the plan is cached, consisting of ("c2e", h, w, face_w, mode, backend)
+        """
+        return ("c2e", self.h, self.w, self.face_w, self.mode, self.backend)
+
+    @property
+    def order(self):
+        """
+        Spline order used for sampling, 1 for bilinear, 0 for nearest
+        """
+        return 1 if self.mode == "bilinear" else 0
+
+    def sample(self, cube_faces):
+        """
+        Sample cube faces into an equirectangular image with the plan's coordinates
+
+        :param cube_faces: ND-array [6, face_w, face_w, C] or list of 6 faces in [F R B L U D] order, as in the
+            "horizon" cube format
+        :return: ND-array [h, w, C] with equirectangular image, in the dtype of the faces
+        """
+        assert (len(cube_faces) == 6), f"6 cube faces are expected, but {len(cube_faces)} were found"
+        assert (cube_faces[0].shape[:2] == (self.face_w, self.face_w)), f"faces of shape {cube_faces[0].shape[:2]} do not fit plan for face width {self.face_w}"
+        atlas = utils.cube_atlas(cube_faces)
+        if self.backend == "opencv":
+            interpolation = cv2.INTER_LINEAR if self.order == 1 else cv2.INTER_NEAREST
+            return cv2.remap(
+                atlas,
+                *self.maps,
+                interpolation,
+                borderMode=cv2.BORDER_REPLICATE
+            ).reshape(self.h, self.w, *atlas.shape[2:])
+        # scipy is only needed for the reference sampling backend, import on first use
+        from scipy.ndimage import map_coordinates
+        return np.stack([
+            map_coordinates(atlas[..., i], [self.coor_xy[..., 1], self.coor_xy[..., 0]], order=self.order, mode="nearest")
+            for i in range(atlas.shape[2])
+        ], axis=-1)
+
+
+def get_equirect_plan(h, w, face_w, mode="bilinear", backend="opencv"):
+    """
+    Get a plan to stitch cube faces of a given width to an equirectangular image of a given size. Plans are held in
+    the same in-memory cache as the reprojection plans of cube faces.
+
+    :param h: int, height of the equirectangular image
+    :param w: int, width of the equirectangular image
+    :param face_w: int, amount of pixels per face
+    :param mode: str, interpolation method, can be "bilinear" or "nearest" (default: "bilinear")
+    :param backend: str, sampling backend, can be "opencv" or "scipy" (default: "opencv")
+    :return: odmax.plan.EquirectPlan instance
+    """
+    key = ("c2e", int(h), int(w), int(face_w), mode, backend)
+    with _lock:
+        if key in _plans:
+            _plans.move_to_end(key)
+            return _plans[key]
+        plan = EquirectPlan(h, w, face_w, mode=mode, backend=backend)
+        add_plan(plan)
+        return plan
+
+
+def plan_key(h, w, face_w, overlap, mode, cube_format, backend, faces=None):
+    """
+    Key of a reprojection plan, used to look up plans in the cache
+    """
+    faces = tuple(range(6)) if faces is None else tuple(sorted(set(int(i) for i in faces)))
+    return (int(h), int(w), int(face_w), float(overlap), mode, cube_format, backend, faces)
+
+
+def plan_fn(key, cache_dir):
+    """
+    Filename of a plan with given key in a cache directory
+
+    :param key: tuple, key of the plan
+    :param cache_dir: str, directory where plans are stored
+    :return: str, filename
+    """
+    h, w, face_w, overlap, mode, cube_format, backend, faces = key
+    # plans of all faces keep the filename they had before faces could be selected
+    suffix = "" if len(faces) == 6 else "_" + "".join(CUBE_SUFFIX[i] for i in faces)
+    return os.path.join(cache_dir, f"plan_{h}x{w}_{face_w}_{overlap:g}_{mode}_{cube_format}_{backend}{suffix}.npz")
+
+
+def get_plan(
+        shape,
+        face_w=256,
+        overlap=0.,
+        mode="bilinear",
+        cube_format="dice",
+        backend="opencv",
+        faces=None,
+        cache_dir=None,
+        memory_budget=None
+):
+    """
+    Get a reprojection plan for an equirectangular image of a given shape. Plans are held in an in-memory cache of at
+    most MAX_PLANS plans, dropping the least recently used plan first. If cache_dir is provided, plans are also read
+    from and written to this directory.
+
+    :param shape: tuple, shape of the equirectangular image (at least height and width)
+    :param face_w: int, amount of pixels per face (default: 256)
+    :param overlap: float, fractional overlap between each face (default: 0.)
+    :param mode: str, interpolation method, can be "bilinear" or "nearest" (default: "bilinear")
+    :param cube_format: str, way the cubemap is organised (default: "dice")
+    :param backend: str, sampling backend, can be "opencv" or "scipy" (default: "opencv")
+    :param faces: list of ints, indices of the cube faces that are sampled, in [F R B L U D] order (default: None, all
+        faces)
+    :param cache_dir: str, directory to persist plans in (default: None, plans are only held in memory)
+    :param memory_budget: float, memory in megabytes for temporary arrays while computing and sampling the plan
+        (default: None, odmax.plan.MEMORY_BUDGET). This does not change the plan, a cached plan keeps its own budget
+    :return: odmax.plan.ReprojectionPlan instance
+    """
+    key = plan_key(shape[0], shape[1], face_w, overlap, mode, cube_format, backend, faces)
+    with _lock:
+        if key in _plans:
+            _plans.move_to_end(key)
+            return _plans[key]
+        fn = plan_fn(key, cache_dir) if cache_dir is not None else None
+        plan = None
+        if fn is not None and os.path.isfile(fn):
+            try:
+                plan = ReprojectionPlan.from_file(fn)
+                plan.memory_budget = float(memory_budget if memory_budget is not None else MEMORY_BUDGET)
+            except Exception:
+                # unreadable plan file, e.g. from an older version or a damaged disk, compute the plan again
+                plan = None
+        if plan is None:
+            plan = ReprojectionPlan(*key, memory_budget=memory_budget)
+            if fn is not None:
+                os.makedirs(cache_dir, exist_ok=True)
+                plan.to_file(fn)
+        add_plan(plan)
+        return plan
+
+
+def add_plan(plan):
+    """
+    Add a plan to the in-memory cache
+
+    :param plan: odmax.plan.ReprojectionPlan instance
+    :return: None
+    """
+    with _lock:
+        _plans[plan.key] = plan
+        _plans.move_to_end(plan.key)
+        while len(_plans) > MAX_PLANS:
+            _plans.popitem(last=False)
+
+
+def clear_plans():
+    """
+    Remove all plans from the in-memory cache
+
+    :return: None
+    """
+    with _lock:
+        _plans.clear()
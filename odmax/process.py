@@ -1,5 +1,7 @@
 import numpy as np
 from odmax import py360
+from odmax import plan
+from odmax.consts import CUBE_SUFFIX
 
 # processing functions for ODMax
 def reproject_cube(img, **kwargs):
@@ -10,23 +12,103 @@ def reproject_cube(img, **kwargs):
     :param face_w: int defining the length of each face of the cube (default: 256)
     :param mode: str defining the reprojection mode, can be 'bilinear' or 'nearest'
     :param overlap: float, defining the amount of overlap on face edges defined as ratio of face_w (e.g. 0.1). If not set, this will default to 0.1
-    :return: list of ndarrays in shape of [H, W, 3] containing images of cube faces
+    :param backend: str, sampling backend, can be "opencv" (default, fast) or "scipy" (reference implementation)
+    :param faces: str or list of str, suffixes of the cube faces to reproject, e.g. "FRBL" (default: None, all 6
+        faces), see odmax.process.get_faces
+    :param plan: odmax.plan.ReprojectionPlan, precomputed sampling coordinates (default: retrieved from the plan cache)
+    :param cache_dir: str, directory to persist reprojection plans in (default: None, only kept in memory)
+    :param memory_budget: float, memory in megabytes for temporary arrays while computing and sampling the
+        reprojection plan (default: None, odmax.plan.MEMORY_BUDGET). Faces are sampled directly in their own buffers
+    :param out: list of ndarrays [face_w, face_w, 3], preallocated buffers for the faces (default: None, allocated)
+    :return: list of ndarrays in shape of [H, W, 3] containing images of the cube faces, in [F R B L U D] order
     """
     assert (isinstance(img, np.ndarray)), "provided img is not a numpy array"
+    kwargs = cube_kwargs(img.shape, **kwargs)
+    faces = py360.e2c(img, cube_format="list", **kwargs)
+    # a provided plan determines which faces are sampled
+    selected = kwargs["plan"].faces if kwargs.get("plan") is not None else kwargs["faces"]
+    # rearrange coordinates of faces to ensure we look from the inside to the faces
+    for j, i in enumerate(selected):
+        if i in [1, 2]:
+            faces[j] = np.fliplr(faces[j])  # right and back faces are mirrored left-right
+        elif i == 4:
+            faces[j] = np.flipud(faces[j])  # up face is mirrored up-down
+    return faces
+
+
+def get_faces(faces=None):
+    """
+    Indices of a selection of cube faces
+
+    :param faces: str or list of str, suffixes of the cube faces as in odmax.consts.CUBE_SUFFIX, e.g. "FRBL" for all
+        faces except up and down (default: None, all faces)
+    :return: tuple of ints, indices of the selected faces in [F R B L U D] order
+    """
+    if faces is None:
+        return tuple(range(6))
+    faces = [c.upper() for c in faces]
+    for c in faces:
+        if c not in CUBE_SUFFIX:
+            raise ValueError(f"Unknown cube face {c}, choose from {', '.join(CUBE_SUFFIX)}")
+    if len(faces) == 0:
+        raise ValueError("No cube faces selected")
+    return tuple(i for i, c in enumerate(CUBE_SUFFIX) if c in faces)
+
+
+def get_face_suffixes(faces=None):
+    """
+    Suffixes of a selection of cube faces, in the order in which reproject_cube returns them
+
+    :param faces: str or list of str, suffixes of the cube faces, e.g. "FRBL" (default: None, all faces)
+    :return: list of str
+    """
+    return [CUBE_SUFFIX[i] for i in get_faces(faces)]
+
+
+def cube_kwargs(shape, **kwargs):
+    """
+    Complete keyword arguments for cube reprojection with defaults, as used by reproject_cube
+
+    :param shape: tuple, shape of the image to reproject
+    :param kwargs: keyword arguments for cube reprojection, see odmax.process.reproject_cube
+    :return: dict, keyword arguments with overlap, face_w and faces set
+    """
     if not "overlap" in kwargs:
         kwargs["overlap"] = 0.1  # always default to 0.1
     if not "face_w" in kwargs:
         kwargs["face_w"] = None
     if kwargs["face_w"] is None:
         # if kwargs["face_w"] is None:
-        face_w_no_overlap = int(img.shape[1]/4)  # a quarter of the width of the still
+        face_w_no_overlap = int(shape[1]/4)  # a quarter of the width of the still
         face_w = int(face_w_no_overlap * (1 + 2 * kwargs["overlap"]))  # add twice the overlap to the face width
         kwargs["face_w"] = face_w
-    faces = py360.e2c(img, cube_format="list", **kwargs)
-    # rearrange coordinates of faces to ensure we look from the inside to the faces
-    faces[1] = np.fliplr(faces[1])  # right face is mirrored left-right
-    faces[2] = np.fliplr(faces[2])  # back face is mirrored left-right
-    faces[4] = np.flipud(faces[4])  # up face is mirrored up-down
-    return faces
+    # faces may already be converted to indices, e.g. when passed on by reproject_cube
+    faces = kwargs.get("faces")
+    if faces is None or not(all(isinstance(i, (int, np.integer)) for i in faces)):
+        kwargs["faces"] = get_faces(faces)
+    return kwargs
 
 
+def get_cube_plan(shape, **kwargs):
+    """
+    Get the reprojection plan that reproject_cube uses for images of a given shape. This can be used to compute the
+    plan once, and share it with other processes.
+
+    :param shape: tuple, shape of the image to reproject
+    :param kwargs: keyword arguments for cube reprojection, see odmax.process.reproject_cube
+    :return: odmax.plan.ReprojectionPlan instance
+    """
+    kwargs = cube_kwargs(shape, **kwargs)
+    if kwargs.get("plan") is not None:
+        return kwargs["plan"]
+    return plan.get_plan(
+        shape,
+        face_w=kwargs["face_w"],
+        overlap=kwargs["overlap"],
+        mode=kwargs.get("mode", "bilinear"),
+        cube_format="list",
+        backend=kwargs.get("backend", "opencv"),
+        faces=kwargs["faces"],
+        cache_dir=kwargs.get("cache_dir"),
+        memory_budget=kwargs.get("memory_budget"),
+    )
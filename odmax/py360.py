@@ -3,8 +3,10 @@
 
 import numpy as np
 from . import utils
+from .plan import get_plan, get_equirect_plan
+from .consts import CUBE_SUFFIX
 
-def c2e(cubemap, h, w, mode='bilinear', cube_format='dice'):
+def c2e(cubemap, h, w, mode='bilinear', cube_format='dice', backend='opencv', plan=None):
     """
     Convert cubemap to equirectangular spherical array
 
@@ -13,68 +15,42 @@ def c2e(cubemap, h, w, mode='bilinear', cube_format='dice'):
     :param w: width
     :param mode: str, interpolation method (default: "bilinear")
     :param cube_format: str, way the cubemap is organised (default: "dice")
-    :return: ND-array [M, N, 3] with equirectangular image
+    :param backend: str, sampling backend, "opencv" samples all channels in one pass, "scipy" is the reference
+        implementation (default: "opencv")
+    :param plan: odmax.plan.EquirectPlan, precomputed sampling coordinates. If not provided, a plan is retrieved
+        from the plan cache (and computed only if not yet available)
+    :return: ND-array [M, N, 3] with equirectangular image, in the dtype of the cubemap
     """
-    if mode == 'bilinear':
-        order = 1
-    elif mode == 'nearest':
-        order = 0
-    else:
-        raise NotImplementedError('unknown mode')
-
     if cube_format == 'horizon':
-        pass
+        cube_faces = np.split(cubemap, 6, 1)
     elif cube_format == 'list':
-        cubemap = utils.cube_list2h(cubemap)
+        cube_faces = cubemap
     elif cube_format == 'dict':
-        cubemap = utils.cube_dict2h(cubemap)
+        cube_faces = [cubemap[k] for k in CUBE_SUFFIX]
     elif cube_format == 'dice':
-        cubemap = utils.cube_dice2h(cubemap)
+        cube_faces = np.split(utils.cube_dice2h(cubemap), 6, 1)
     else:
         raise NotImplementedError('unknown cube_format')
-    assert len(cubemap.shape) == 3
-    assert cubemap.shape[0] * 6 == cubemap.shape[1]
+    assert len(cube_faces) == 6
+    assert len(cube_faces[0].shape) == 3
     assert w % 8 == 0
-    face_w = cubemap.shape[0]
-
-    uv = utils.equirect_uvgrid(h, w)
-    u, v = np.split(uv, 2, axis=-1)
-    u = u[..., 0]
-    v = v[..., 0]
-    cube_faces = np.stack(np.split(cubemap, 6, 1), 0)
-
-    # Get face id to each pixel: 0F 1R 2B 3L 4U 5D
-    tp = utils.equirect_facetype(h, w)
-    coor_x = np.zeros((h, w))
-    coor_y = np.zeros((h, w))
-
-    for i in range(4):
-        mask = (tp == i)
-        coor_x[mask] = 0.5 * np.tan(u[mask] - np.pi * i / 2)
-        coor_y[mask] = -0.5 * np.tan(v[mask]) / np.cos(u[mask] - np.pi * i / 2)
-
-    mask = (tp == 4)
-    c = 0.5 * np.tan(np.pi / 2 - v[mask])
-    coor_x[mask] = c * np.sin(u[mask])
-    coor_y[mask] = c * np.cos(u[mask])
-
-    mask = (tp == 5)
-    c = 0.5 * np.tan(np.pi / 2 - np.abs(v[mask]))
-    coor_x[mask] = c * np.sin(u[mask])
-    coor_y[mask] = -c * np.cos(u[mask])
-
-    # Final renormalize
-    coor_x = (np.clip(coor_x, -0.5, 0.5) + 0.5) * face_w
-    coor_y = (np.clip(coor_y, -0.5, 0.5) + 0.5) * face_w
-
-    equirec = np.stack([
-        utils.sample_cubefaces(cube_faces[..., i], tp, coor_y, coor_x, order=order)
-        for i in range(cube_faces.shape[3])
-    ], axis=-1)
-
-    return equirec
-
-def e2c(e_img, face_w=256, mode='bilinear', cube_format='dice', overlap=0.):
+    if plan is None:
+        plan = get_equirect_plan(h, w, cube_faces[0].shape[0], mode=mode, backend=backend)
+    return plan.sample(cube_faces)
+
+def e2c(
+        e_img,
+        face_w=256,
+        mode='bilinear',
+        cube_format='dice',
+        overlap=0.,
+        backend='opencv',
+        faces=None,
+        plan=None,
+        cache_dir=None,
+        memory_budget=None,
+        out=None
+):
     """
     Convert equirectangular spherical array to cubemap
 
@@ -83,42 +59,52 @@ def e2c(e_img, face_w=256, mode='bilinear', cube_format='dice', overlap=0.):
     :param mode: str, interpolation method (default: "bilinear")
     :param cube_format: str, way the cubemap is organised (default: "dice")
     :param overlap: fractional overlap allowed between each face. Useful to generate overlap in photogrammetry applications
+    :param backend: str, sampling backend, "opencv" samples all channels in one pass, "scipy" is the reference
+        implementation (default: "opencv")
+    :param faces: list of ints, indices of the faces that are sampled in [F R B L U D] order (default: None, all faces).
+        Only the selected faces are sampled and returned, cube_format must be "horizon", "list" or "dict"
+    :param plan: odmax.plan.ReprojectionPlan, precomputed sampling coordinates. If not provided, a plan is retrieved
+        from the plan cache (and computed only if not yet available)
+    :param cache_dir: str, directory to persist reprojection plans in (default: None, only kept in memory)
+    :param memory_budget: float, memory in megabytes for temporary arrays while computing and sampling the plan. With
+        cube_format "list" or "dict", each face is sampled directly into its own buffer in tiles of rows (default:
+        None, odmax.plan.MEMORY_BUDGET)
+    :param out: list of ND-arrays [face_w, face_w, 3], preallocated buffers for the faces, e.g. the faces of a previous
+        frame, only used with cube_format "list" or "dict" (default: None, new buffers are allocated)
     :return: ND-array [M, N, 3] with equirectangular image
     """
     assert len(e_img.shape) == 3
-    h, w = e_img.shape[:2]
-    if mode == 'bilinear':
-        order = 1
-    elif mode == 'nearest':
-        order = 0
-    else:
-        raise NotImplementedError('unknown mode')
-
-    xyz = utils.xyzcube(face_w, overlap=overlap)
-    uv = utils.xyz2uv(xyz)
-    coor_xy = utils.uv2coor(uv, h, w)
-
-    cubemap = np.stack([
-        utils.sample_equirec(e_img[..., i], coor_xy, order=order)
-        for i in range(e_img.shape[2])
-    ], axis=-1)
+    if plan is None:
+        plan = get_plan(
+            e_img.shape,
+            face_w=face_w,
+            overlap=overlap,
+            mode=mode,
+            cube_format=cube_format,
+            backend=backend,
+            faces=faces,
+            cache_dir=cache_dir,
+            memory_budget=memory_budget
+        )
+    cube_format = plan.cube_format
 
     if cube_format == 'horizon':
-        pass
+        cubemap = plan.sample(e_img)
     elif cube_format == 'list':
-        cubemap = utils.cube_h2list(cubemap)
+        cubemap = plan.sample_faces(e_img, out=out)
     elif cube_format == 'dict':
-        cubemap = utils.cube_h2dict(cubemap)
+        cubemap = dict(zip([CUBE_SUFFIX[i] for i in plan.faces], plan.sample_faces(e_img, out=out)))
     elif cube_format == 'dice':
-        cubemap = utils.cube_h2dice(cubemap)
+        cubemap = utils.cube_h2dice(plan.sample(e_img))
     else:
         raise NotImplementedError()
 
     return cubemap
 
-def e2p(e_img, fov_deg, u_deg, v_deg, out_hw, in_rot_deg=0, mode='bilinear'):
+def e2p(e_img, fov_deg, u_deg, v_deg, out_hw, in_rot_deg=0, mode='bilinear', backend='opencv'):
     """
-    retrieve perspective image from provided equirectangular image
+    retrieve perspective image from provided equirectangular image. To retrieve many views from many images, use
+    odmax.rig.Rig, which computes the sampling maps only once.
 
     :param e_img: ND-array [H, W, 3], equirectangular image
     :param fov_deg: float or (float, float) field of view in degree
@@ -127,17 +113,12 @@ def e2p(e_img, fov_deg, u_deg, v_deg, out_hw, in_rot_deg=0, mode='bilinear'):
     :param out_hw: tuple of ints (height, width) in pixels
     :param in_rot_deg: in plane rotation
     :param mode: str, interpolation method (default: "bilinear")
+    :param backend: str, sampling backend, can be "opencv" or "scipy" (default: "opencv")
     :return:
     """
     assert len(e_img.shape) == 3
     h, w = e_img.shape[:2]
 
-    try:
-        h_fov, v_fov = fov_deg[0] * np.pi / 180, fov_deg[1] * np.pi / 180
-    except:
-        h_fov, v_fov = fov, fov
-    in_rot = in_rot_deg * np.pi / 180
-
     if mode == 'bilinear':
         order = 1
     elif mode == 'nearest':
@@ -145,17 +126,41 @@ def e2p(e_img, fov_deg, u_deg, v_deg, out_hw, in_rot_deg=0, mode='bilinear'):
     else:
         raise NotImplementedError('unknown mode')
 
-    u = -u_deg * np.pi / 180
-    v = v_deg * np.pi / 180
-    xyz = utils.xyzpers(h_fov, v_fov, u, v, out_hw, in_rot)
-    uv = utils.xyz2uv(xyz)
-    coor_xy = utils.uv2coor(uv, h, w)
+    coor_xy = e2p_coor(h, w, fov_deg, u_deg, v_deg, out_hw, in_rot_deg=in_rot_deg)
 
-    pers_img = np.stack([
-        utils.sample_equirec(e_img[..., i], coor_xy, order=order)
-        for i in range(e_img.shape[2])
-    ], axis=-1)
+    if backend == 'opencv':
+        pers_img = utils.sample_equirec_remap(e_img, *utils.remap_maps(coor_xy, h, order), order=order)
+    elif backend == 'scipy':
+        pers_img = np.stack([
+            utils.sample_equirec(e_img[..., i], coor_xy, order=order)
+            for i in range(e_img.shape[2])
+        ], axis=-1)
+    else:
+        raise NotImplementedError('unknown backend')
 
     return pers_img
 
 
+def e2p_coor(h, w, fov_deg, u_deg, v_deg, out_hw, in_rot_deg=0):
+    """
+    Coordinates in an equirectangular image that are sampled for each pixel of a perspective image, as used by e2p
+
+    :param h: int, height of the equirectangular image
+    :param w: int, width of the equirectangular image
+    :param fov_deg: float or (float, float) field of view in degree
+    :param u_deg: float, horizon viewing angle in range [-180, 180]
+    :param v_deg: float, vertical viewing angle in range [-90, 90]
+    :param out_hw: tuple of ints (height, width) in pixels
+    :param in_rot_deg: in plane rotation
+    :return: ND-array [height, width, 2] with x and y coordinates
+    """
+    if np.ndim(fov_deg) == 0:
+        h_fov = v_fov = fov_deg * np.pi / 180
+    else:
+        h_fov, v_fov = fov_deg[0] * np.pi / 180, fov_deg[1] * np.pi / 180
+    in_rot = in_rot_deg * np.pi / 180
+    u = -u_deg * np.pi / 180
+    v = v_deg * np.pi / 180
+    xyz = utils.xyzpers(h_fov, v_fov, u, v, out_hw, in_rot)
+    uv = utils.xyz2uv(xyz)
+    return utils.uv2coor(uv, h, w)
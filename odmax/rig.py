@@ -0,0 +1,226 @@
+# virtual camera rigs: sets of perspective views that are sampled from each equirectangular frame
+import json
+import os
+import threading
+import numpy as np
+from odmax import py360
+from odmax import utils
+
+# keys of a view in a rig definition, "name" and "yaw" are required, see odmax.rig.View for the defaults of others
+VIEW_KEYS = ["name", "yaw", "pitch", "roll", "fov", "width", "height"]
+# maximum relative difference between the width and height of a pixel of a view
+PIXEL_ASPECT_TOLERANCE = 0.01
+
+
+class View:
+    def __init__(self, name, yaw, pitch=0., roll=0., fov=90., width=1024, height=None):
+        """
+        Create a new View instance. A View is one perspective (pinhole) camera of a rig, looking in a given direction
+        from the centre of the 360 degree frame.
+
+        :param name: str, name of the view, used as suffix of written files (e.g. "F" or "Y045")
+        :param yaw: float, horizontal viewing angle in degrees in range [-180, 180], 0 is the front of the frame and
+            positive angles look to the right
+        :param pitch: float, vertical viewing angle in degrees in range [-90, 90], positive angles look up (default: 0.)
+        :param roll: float, in-plane rotation in degrees (default: 0.)
+        :param fov: float or (float, float), horizontal and vertical field of view in degrees (default: 90.)
+        :param width: int, width of the perspective image in pixels (default: 1024)
+        :param height: int, height of the perspective image in pixels (default: None, width scaled with the ratio of
+            the vertical and horizontal field of view). An explicit height must fit this ratio, so that pixels are
+            square
+        """
+        fov = (float(fov), float(fov)) if np.ndim(fov) == 0 else tuple(float(f) for f in fov)
+        assert (len(fov) == 2 and all(0 < f < 180 for f in fov)), f"field of view {fov} of view {name} must be between 0 and 180 degrees"
+        assert (-90 <= pitch <= 90), f"pitch {pitch} of view {name} must be between -90 and 90 degrees"
+        # height at which pixels are square, as expected by photogrammetry software
+        square_height = width * np.tan(np.radians(fov[1]) / 2) / np.tan(np.radians(fov[0]) / 2)
+        if height is None:
+            height = square_height
+        assert (width >= 1 and height >= 1), f"size {width} x {height} of view {name} must be at least one pixel"
+        # an explicit height may differ by rounding to whole pixels
+        assert (abs(height - square_height) <= max(0.5, PIXEL_ASPECT_TOLERANCE * square_height)), f"height {height} of view {name} does not fit its field of view {fov[0]} x {fov[1]} degrees and width {width}, pixels would not be square. Provide the horizontal and vertical field of view, or leave out height (height {square_height:.0f} fits)"
+        self.name = str(name)
+        self.yaw = float(yaw)
+        self.pitch = float(pitch)
+        self.roll = float(roll)
+        self.fov = fov
+        self.width = int(width)
+        self.height = int(round(height))
+
+    def to_dict(self):
+        """
+        Definition of the view, as used in rig files
+
+        :return: dict
+        """
+        return {
+            "name": self.name,
+            "yaw": self.yaw,
+            "pitch": self.pitch,
+            "roll": self.roll,
+            "fov": list(self.fov),
+            "width": self.width,
+            "height": self.height
+        }
+
+    def coor(self, h, w):
+        """
+        Coordinates in an equirectangular image that are sampled for each pixel of the view
+
+        :param h: int, height of the equirectangular image
+        :param w: int, width of the equirectangular image
+        :return: ND-array [height, width, 2] with x and y coordinates
+        """
+        return py360.e2p_coor(h, w, self.fov, self.yaw, self.pitch, (self.height, self.width), in_rot_deg=self.roll)
+
+
+class Rig:
+    def __init__(self, views, mode="bilinear", backend="opencv"):
+        """
+        Create a new Rig instance. A Rig is a set of perspective views, that are all sampled from the same decoded
+        equirectangular frame. The sampling maps of all views are computed once per frame size and reused for every
+        frame, as with the reprojection plans of cube faces. Rigs can be read from JSON or YAML files with
+        odmax.rig.Rig.from_file.
+
+        :param views: list of odmax.rig.View instances, or dicts with the arguments of odmax.rig.View
+        :param mode: str, interpolation method, can be "bilinear" or "nearest" (default: "bilinear")
+        :param backend: str, sampling backend, can be "opencv" or "scipy" (default: "opencv")
+        """
+        if mode not in ["bilinear", "nearest"]:
+            raise NotImplementedError('unknown mode')
+        if backend not in ["opencv", "scipy"]:
+            raise NotImplementedError(f'unknown backend {backend}')
+        views = [view if isinstance(view, View) else get_view(view) for view in views]
+        assert (len(views) > 0), "a rig must have at least one view"
+        names = [view.name for view in views]
+        assert (len(set(names)) == len(names)), f"names of views {names} must be unique"
+        self.views = views
+        self.mode = mode
+        self.backend = backend
+        # sampling maps per equirectangular frame size (h, w)
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    @property
+    def names(self):
+        """
+        Names of the views, in the order in which they are sampled
+        """
+        return [view.name for view in self.views]
+
+    @property
+    def order(self):
+        """
+        Spline order used for sampling, 1 for bilinear, 0 for nearest
+        """
+        return 1 if self.mode == "bilinear" else 0
+
+    def to_dict(self):
+        """
+        Definition of the rig, as used in rig files
+
+        :return: dict
+        """
+        return {"mode": self.mode, "views": [view.to_dict() for view in self.views]}
+
+    def to_file(self, fn):
+        """
+        Write the rig definition to a JSON file
+
+        :param fn: str, filename
+        :return: None
+        """
+        with open(fn, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+    @classmethod
+    def from_file(cls, fn, mode="bilinear", backend="opencv"):
+        """
+        Read a rig definition from a JSON or YAML file (YAML requires PyYAML). The file holds a list of views, or a
+        mapping with "views" and optionally "mode". Each view has a "name", "yaw", and optionally "pitch", "roll",
+        "fov", "width" and "height", see odmax.rig.View.
+
+        :param fn: str, filename, files with extension .yml or .yaml are read as YAML, other files as JSON
+        :param mode: str, interpolation method, used if the file does not hold a "mode" (default: "bilinear")
+        :param backend: str, sampling backend, can be "opencv" or "scipy" (default: "opencv")
+        :return: odmax.rig.Rig instance
+        """
+        with open(fn, "r") as f:
+            if os.path.splitext(fn)[-1].lower() in [".yml", ".yaml"]:
+                try:
+                    import yaml
+                except ImportError:
+                    raise ModuleNotFoundError('Reading YAML rig files requires PyYAML. Please install it with "pip install pyyaml", or use a JSON rig file')
+                definition = yaml.safe_load(f)
+            else:
+                definition = json.load(f)
+        if isinstance(definition, list):
+            definition = {"views": definition}
+        if not(isinstance(definition, dict)) or not(isinstance(definition.get("views"), list)):
+            raise ValueError(f"Rig file {fn} must hold a list of views, or a mapping with a list of views under \"views\"")
+        return cls(definition["views"], mode=definition.get("mode", mode), backend=backend)
+
+    def get_maps(self, shape):
+        """
+        Get the sampling maps of all views for equirectangular frames of a given shape, computed on first use
+
+        :param shape: tuple, shape of the equirectangular frame (at least height and width)
+        :return: list with per view a tuple of cv2.remap maps ("opencv" backend) or an ND-array of coordinates ("scipy"
+            backend)
+        """
+        h, w = int(shape[0]), int(shape[1])
+        with self._lock:
+            if (h, w) not in self._maps:
+                maps = []
+                for view in self.views:
+                    coor_xy = view.coor(h, w)
+                    maps.append(utils.remap_maps(coor_xy, h, self.order) if self.backend == "opencv" else coor_xy)
+                self._maps[(h, w)] = maps
+            return self._maps[(h, w)]
+
+    def sample(self, e_img):
+        """
+        Sample all views of the rig from an equirectangular frame
+
+        :param e_img: ND-array [H, W, C], equirectangular frame
+        :return: list of ND-arrays [height, width, C], one perspective image per view
+        """
+        assert (isinstance(e_img, np.ndarray) and e_img.ndim == 3), "provided img is not a 3 dimensional numpy array"
+        imgs = []
+        for maps in self.get_maps(e_img.shape):
+            if self.backend == "opencv":
+                imgs.append(utils.sample_equirec_remap(e_img, *maps, order=self.order))
+            else:
+                imgs.append(np.stack([
+                    utils.sample_equirec(e_img[..., i], maps, order=self.order)
+                    for i in range(e_img.shape[2])
+                ], axis=-1))
+        return imgs
+
+    def __getstate__(self):
+        # locks cannot be pickled, maps are kept so that worker processes do not compute them again
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def get_view(definition):
+    """
+    Make a view from its definition in a rig file
+
+    :param definition: dict, with keys as in odmax.rig.VIEW_KEYS
+    :return: odmax.rig.View instance
+    """
+    if not(isinstance(definition, dict)):
+        raise ValueError(f"View {definition} must be a mapping of {', '.join(VIEW_KEYS)}")
+    unknown = [k for k in definition if k not in VIEW_KEYS]
+    if len(unknown) > 0:
+        raise ValueError(f"Unknown keys {', '.join(unknown)} in view {definition}, choose from {', '.join(VIEW_KEYS)}")
+    missing = [k for k in ["name", "yaw"] if k not in definition]
+    if len(missing) > 0:
+        raise ValueError(f"View {definition} is missing {', '.join(missing)}")
+    return View(**definition)
@@ -0,0 +1,160 @@
+# processing of 360 degree photos, scheduled over a pool of worker processes that share the reprojection plan
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image
+import odmax
+from odmax import batch, plan, process
+
+# extensions of photo files that are collected from directories
+STILL_EXTENSIONS = [".jpg", ".jpeg"]
+# virtual camera rig of a worker process, received once when the worker starts
+_rig = None
+
+
+def _init_worker(reproject_plan, rig=None):
+    # register the plan (or rig with its maps) of the parent process, so that workers do not recompute it
+    global _rig
+    if reproject_plan is not None:
+        plan.add_plan(reproject_plan)
+    _rig = rig
+
+
+def _process(fn, path, name, kwargs):
+    return process_still(fn, path=path, name=name, rig=_rig, **kwargs)
+
+
+def find_stills(inputs):
+    """
+    Collect photo files from directories, glob patterns and list files
+
+    :param inputs: list of str, each a directory (all .jpg files in it are used), a glob pattern (e.g.
+        "/data/*/GS*.JPG"), a text file with one photo per line, or a photo file
+    :return: list of str, photo files, each file occurs once
+    """
+    return batch.find_files(inputs, extensions=STILL_EXTENSIONS)
+
+
+def output_names(fns):
+    """
+    Name of the written files per photo, the name of the photo file without extension. Photos with the same name (e.g.
+    from different cameras) get a numbered suffix.
+
+    :param fns: list of str, photo files
+    :return: list of str, name per photo
+    """
+    names = []
+    for fn in fns:
+        name = os.path.splitext(os.path.basename(fn))[0]
+        unique = name
+        i = 1
+        while unique in names:
+            unique = f"{name}_{i}"
+            i += 1
+        names.append(unique)
+    return names
+
+
+def get_shape(fn):
+    """
+    Shape of a photo, read from its header without decoding the image
+
+    :param fn: str, photo file
+    :return: tuple (height, width, 3)
+    """
+    with Image.open(fn) as img:
+        return img.size[1], img.size[0], 3
+
+
+def process_still(
+        fn,
+        path=".",
+        name=None,
+        prefix="",
+        encoder="jpg",
+        writer="opencv",
+        profile=None,
+        encoder_params={},
+        reproject=False,
+        rig=None,
+        **kwargs
+):
+    """
+    Reproject and write one photo. The EXIF tag of the photo (e.g. camera, time and GPS location) is read once and
+    written to every cube face or rig view, see odmax.Still. Used by the workers of odmax.stills.run, but can also be
+    called directly.
+
+    :param fn: str, photo file
+    :param path: str, Path to write files to
+    :param name: str, name of the written files (default: None, the name of the photo file without extension)
+    :param prefix: str, Prefix for files, placed before the name (default: "", files are named after the photo)
+    :param encoder: str, default is "jpg"
+    :param writer: str, writing backend, can be "opencv" or "pil", see odmax.io.write_frame (default: "opencv")
+    :param profile: str, encoder profile, can be "fast", "balanced" or "archive", see odmax.io.PROFILES (default: None,
+        use PIL defaults)
+    :param encoder_params: dict, encoder parameters as used by PIL (e.g. {"quality": 90}), that overrule the profile
+    :param reproject: bool, set to True if you want to reproject to 6 cube-faces
+    :param rig: odmax.rig.Rig, virtual camera rig, if provided, the photo is reprojected to the perspective views of the
+        rig instead of cube faces (default: None)
+    :param kwargs: keyword arguments for cube reprojection, see odmax.process.reproject_cube
+    :return: dict with the photo file, output filenames, amount of bytes written, wall time in seconds and error
+        message (None if the photo was processed successfully)
+    """
+    t0 = time.perf_counter()
+    summary = {"file": fn, "files": [], "bytes": 0, "seconds": 0., "error": None}
+    try:
+        still = odmax.Still(fn)
+        if name is not None:
+            still.name = name
+        frame = still.get_frame(reproject=reproject or rig is not None, rig=rig, **kwargs)
+        fns = frame.to_file(
+            path=path,
+            prefix=prefix,
+            encoder=encoder,
+            backend=writer,
+            profile=profile,
+            encoder_params=encoder_params
+        )
+        summary["files"] = fns if isinstance(fns, list) else [fns]
+        summary["bytes"] = sum(os.path.getsize(f) for f in summary["files"])
+    except Exception as e:
+        # a broken photo should not stop the other photos
+        summary["error"] = f"{type(e).__name__}: {e}"
+    summary["seconds"] = time.perf_counter() - t0
+    return summary
+
+
+def run(fns, path=".", workers=1, reproject=False, rig=None, **kwargs):
+    """
+    Reproject and write many photos, scheduled over a pool of worker processes. Each worker reads, reprojects and
+    writes whole photos. The reprojection plan (or the maps of the rig) is computed once in the calling process, for the
+    size of the first photo, and handed to each worker when it starts. Photos of another size get their own plan in
+    the worker. Files are written to path, named after each photo, see odmax.stills.output_names.
+
+    :param fns: list of str, photo files
+    :param path: str, Path to write files to (default: ".")
+    :param workers: int, amount of photos processed in parallel (default: 1, photos are processed one by one in the
+        calling process)
+    :param reproject: bool, set to True if you want to reproject to 6 cube-faces
+    :param rig: odmax.rig.Rig, virtual camera rig, if provided, photos are reprojected to the perspective views of the
+        rig instead of cube faces (default: None)
+    :param kwargs: keyword arguments for writing and reprojection of each photo, see odmax.stills.process_still
+    :return: generator of dicts with the summary of each photo (see odmax.stills.process_still), in order of completion
+    """
+    jobs = list(zip(fns, output_names(fns)))
+    if workers <= 1 or len(jobs) == 0:
+        for fn, name in jobs:
+            yield process_still(fn, path=path, name=name, reproject=reproject, rig=rig, **kwargs)
+        return
+    reproject_plan = None
+    if rig is not None:
+        rig.get_maps(get_shape(fns[0]))
+    elif reproject:
+        reproject_plan = process.get_cube_plan(get_shape(fns[0]), **kwargs)
+    # workers retrieve the plan from their own cache, instead of receiving it with every photo
+    worker_kwargs = {k: v for k, v in kwargs.items() if k != "plan"}
+    worker_kwargs["reproject"] = reproject
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(reproject_plan, rig)) as pool:
+        futures = [pool.submit(_process, fn, path, name, worker_kwargs) for fn, name in jobs]
+        for future in as_completed(futures):
+            yield future.result()
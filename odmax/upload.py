@@ -0,0 +1,381 @@
+# streaming upload of encoded stills to a NodeODM node or WebODM server, concurrently with extraction
+import http.client
+import json
+import mimetypes
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+# amount of images sent in one upload request
+CHUNK_SIZE = 8
+# amount of concurrent connections
+CONNECTIONS = 4
+# HTTP status codes after which a request is tried again
+RETRY_STATUS = [408, 429, 500, 502, 503, 504]
+
+
+def encode_multipart(fields={}, files=[]):
+    """
+    Encode form fields and files as multipart/form-data request body
+
+    :param fields: dict, form fields, values are converted to str
+    :param files: list of (field name, filename, bytes) tuples
+    :return: (bytes, str), request body and its content type
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, filename, data in files:
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode()
+        )
+        parts.append(data)
+        parts.append(b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def task_options(options):
+    """
+    Convert processing options to the list of name and value pairs used by NodeODM and WebODM
+
+    :param options: dict, e.g. {"camera-lens": "spherical", "dsm": True}, or list of {"name": ..., "value": ...} dicts
+    :return: list of dicts
+    """
+    if isinstance(options, dict):
+        return [{"name": k, "value": v} for k, v in options.items()]
+    return list(options)
+
+
+class Client:
+    def __init__(self, url, headers={}, retries=3, backoff=1., timeout=60.):
+        """
+        Create a new Client instance. A Client sends HTTP requests to one server, with one persistent (keep-alive)
+        connection per thread, so that many threads can send requests at once without reconnecting for each request.
+        Failed connections and responses with a status in odmax.upload.RETRY_STATUS are tried again.
+
+        :param url: str, base url of the server, e.g. "http://localhost:3000"
+        :param headers: dict, headers sent with every request, e.g. for authorization
+        :param retries: int, amount of times a failed request is tried again (default: 3)
+        :param backoff: float, waiting time in seconds before the first retry, doubled for every next retry
+            (default: 1.)
+        :param timeout: float, timeout of connections in seconds (default: 60.)
+        """
+        parts = urlsplit(url if "://" in url else f"http://{url}")
+        if parts.scheme not in ["http", "https"]:
+            raise ValueError(f"Url {url} must start with http:// or https://")
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.root = parts.path.rstrip("/")
+        self.headers = headers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            connection = cls(self.netloc, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def _close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def request(self, method, path, fields=None, files=None, query={}):
+        """
+        Send a request and decode the JSON response
+
+        :param method: str, e.g. "GET" or "POST"
+        :param path: str, path relative to the base url, e.g. "/task/new/init"
+        :param fields: dict, form fields (default: None)
+        :param files: list of (field name, filename, bytes) tuples, sent as multipart/form-data together with fields
+            (default: None)
+        :param query: dict, query parameters
+        :return: decoded JSON response
+        """
+        headers = dict(self.headers)
+        body = None
+        if files:
+            body, headers["Content-Type"] = encode_multipart(fields or {}, files)
+        elif fields is not None:
+            body = urlencode(fields).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        url = self.root + path + (f"?{urlencode(query)}" if query else "")
+        for attempt in range(self.retries + 1):
+            retry = attempt < self.retries
+            try:
+                connection = self._connection()
+                connection.request(method, url, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                # dropped or refused connection, reconnect on the next attempt
+                self._close()
+                if not(retry):
+                    raise IOError(f"{method} {url} on {self.netloc} failed after {attempt + 1} attempts: {e}")
+            else:
+                if response.status in RETRY_STATUS and retry:
+                    pass
+                elif response.status >= 400:
+                    raise IOError(f"{method} {url} on {self.netloc} failed with status {response.status}: {data[:200]}")
+                else:
+                    result = json.loads(data) if data else {}
+                    if isinstance(result, dict) and result.get("error"):
+                        raise IOError(f"{method} {url} on {self.netloc} failed: {result['error']}")
+                    return result
+            time.sleep(self.backoff * 2 ** attempt)
+
+    def close(self):
+        """
+        Close the connection of the calling thread
+
+        :return: None
+        """
+        self._close()
+
+
+class Task:
+    def __init__(
+            self,
+            url,
+            project=None,
+            token=None,
+            username=None,
+            password=None,
+            name="odmax",
+            options={},
+            connections=CONNECTIONS,
+            chunk_size=CHUNK_SIZE,
+            max_in_flight=None,
+            retries=3,
+            timeout=60.
+    ):
+        """
+        Create a new Task instance. A Task uploads images into a new processing task on a NodeODM node, or a WebODM
+        server if a project is given, while they are being extracted. Images are collected in chunks of chunk_size
+        images, and each chunk is sent in one request by a pool of connections. The amount of chunks in flight is
+        limited, so that adding images waits for the network if it is slower than extraction, and memory use stays
+        bounded. The task is created on the server with the first image (or with create), and processed when it is
+        committed.
+
+        :param url: str, base url of the NodeODM node (e.g. "http://localhost:3000") or WebODM server (e.g.
+            "http://localhost:8000")
+        :param project: int, id of the WebODM project in which the task is made (default: None, url is a NodeODM node)
+        :param token: str, token of the NodeODM node, or JWT token of the WebODM server (default: None)
+        :param username: str, WebODM username, used with password to get a token if no token is given (default: None)
+        :param password: str, WebODM password (default: None)
+        :param name: str, name of the task (default: "odmax")
+        :param options: dict, processing options, e.g. {"camera-lens": "spherical"} for 360 degree stills
+        :param connections: int, amount of concurrent upload requests (default: odmax.upload.CONNECTIONS)
+        :param chunk_size: int, amount of images per upload request (default: odmax.upload.CHUNK_SIZE)
+        :param max_in_flight: int, maximum amount of chunks that are queued or being sent (default: twice the amount of
+            connections)
+        :param retries: int, amount of times a failed request is tried again (default: 3)
+        :param timeout: float, timeout of connections in seconds (default: 60.)
+        """
+        assert (connections >= 1), f"amount of connections {connections} must be at least 1"
+        assert (chunk_size >= 1), f"chunk size {chunk_size} must be at least 1"
+        self.project = project
+        self.name = name
+        self.options = task_options(options)
+        self.chunk_size = chunk_size
+        self.client = Client(url, retries=retries, timeout=timeout)
+        self.query = {}
+        if project is None:
+            if token is not None:
+                self.query["token"] = token
+        else:
+            if token is None and username is not None:
+                token = self.client.request("POST", "/api/token-auth/", fields={"username": username, "password": password})["token"]
+            if token is not None:
+                self.client.headers = {"Authorization": f"JWT {token}"}
+        self.id = None
+        self.uploaded = 0
+        self.bytes = 0
+        self._chunk = []
+        self._lock = threading.Lock()
+        self._create_lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(max_in_flight if max_in_flight is not None else 2 * connections)
+        self._futures = []
+        self._error = None
+        self._pool = ThreadPoolExecutor(max_workers=connections)
+
+    def _path(self, action):
+        if self.project is None:
+            return f"/task/new/{action}" + (f"/{self.id}" if action != "init" else "")
+        if action == "init":
+            return f"/api/projects/{self.project}/tasks/"
+        return f"/api/projects/{self.project}/tasks/{self.id}/{action}/"
+
+    def create(self):
+        """
+        Create the task on the server, if not done yet. WebODM tasks are made as partial tasks, so that images can be
+        added in several requests.
+
+        :return: str, id of the task
+        """
+        with self._create_lock:
+            if self.id is None:
+                fields = {"name": self.name, "options": json.dumps(self.options)}
+                if self.project is not None:
+                    fields["partial"] = "true"
+                result = self.client.request("POST", self._path("init"), fields=fields, query=self.query)
+                self.id = result["uuid"] if self.project is None else result["id"]
+        return self.id
+
+    def _send(self, chunk):
+        try:
+            self.client.request(
+                "POST",
+                self._path("upload"),
+                files=[("images", fn, data) for fn, data in chunk],
+                query=self.query
+            )
+            with self._lock:
+                self.uploaded += len(chunk)
+                self.bytes += sum(len(data) for _, data in chunk)
+        except Exception as e:
+            self._error = e
+            raise
+        finally:
+            self._in_flight.release()
+
+    def _submit(self, chunk):
+        # wait until a chunk is sent if too many chunks are in flight
+        self._in_flight.acquire()
+        if self._error is not None:
+            self._in_flight.release()
+            raise IOError(f"Upload to task {self.id} failed: {self._error}")
+        future = self._pool.submit(self._send, chunk)
+        with self._lock:
+            self._futures = [f for f in self._futures if not(f.done()) or f.exception() is not None] + [future]
+
+    def add(self, fn, data):
+        """
+        Add one encoded image to the task. The image is sent when its chunk is full. Can be called from several threads.
+
+        :param fn: str, filename of the image on the server, e.g. "still_0010_F.jpg"
+        :param data: bytes, encoded image
+        :return: None
+        """
+        self.create()
+        with self._lock:
+            self._chunk.append((fn, data))
+            chunk = None
+            if len(self._chunk) >= self.chunk_size:
+                chunk, self._chunk = self._chunk, []
+        if chunk is not None:
+            self._submit(chunk)
+
+    def add_frame(self, frame, prefix="still", encoder="jpg", backend="opencv", profile=None, encoder_params={}):
+        """
+        Encode a frame (or its cube faces or rig views) with odmax.Frame.to_bytes and add the images to the task, named
+        as with odmax.Frame.to_file
+
+        :param frame: odmax.Frame instance
+        :param prefix: str, Prefix for files
+        :param encoder: str, default is "jpg"
+        :param backend: str, writing backend, can be "opencv" or "pil", see odmax.io.write_frame (default: "opencv")
+        :param profile: str, encoder profile, see odmax.io.PROFILES (default: None, use PIL defaults)
+        :param encoder_params: dict, encoder parameters as used by PIL (e.g. {"quality": 90}), that overrule the profile
+        :return: str, filename; or list of str filenames of the added images
+        """
+        data = frame.to_bytes(encoder=encoder, backend=backend, profile=profile, encoder_params=encoder_params)
+        fns = frame.file_names(prefix=prefix, encoder=encoder)
+        if isinstance(fns, list):
+            for fn, d in zip(fns, data):
+                self.add(fn, d)
+        else:
+            self.add(fns, data)
+        return fns
+
+    def flush(self):
+        """
+        Send the remaining images and wait until all chunks are sent
+
+        :return: None
+        """
+        with self._lock:
+            chunk, self._chunk = self._chunk, []
+        if len(chunk) > 0:
+            self._submit(chunk)
+        with self._lock:
+            futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def commit(self):
+        """
+        Send the remaining images and start processing of the task
+
+        :return: dict, response of the server
+        """
+        self.create()
+        self.flush()
+        return self.client.request("POST", self._path("commit"), query=self.query)
+
+    def close(self):
+        """
+        Stop the connections of the task, without committing. Images that are not sent yet are discarded, requests
+        that are being sent are finished.
+
+        :return: None
+        """
+        with self._lock:
+            self._chunk = []
+            futures, self._futures = self._futures, []
+        # cancel_futures of ThreadPoolExecutor.shutdown requires python 3.9
+        for future in futures:
+            future.cancel()
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.commit()
+        finally:
+            self.close()
+
+
+def upload(frames, url, prefix="still", encoder="jpg", writer="opencv", profile=None, encoder_params={}, **kwargs):
+    """
+    Upload frames into a new NodeODM or WebODM task and commit the task. Frames are encoded in the calling thread,
+    while earlier frames are sent. Use odmax.pipeline.run with upload= to reproject and encode frames in parallel.
+
+    :param frames: iterable of odmax.Frame instances, e.g. from odmax.Video.iter_frames
+    :param url: str, base url of the NodeODM node or WebODM server
+    :param prefix: str, Prefix for files
+    :param encoder: str, default is "jpg"
+    :param writer: str, writing backend, can be "opencv" or "pil", see odmax.io.write_frame (default: "opencv")
+    :param profile: str, encoder profile, see odmax.io.PROFILES (default: None, use PIL defaults)
+    :param encoder_params: dict, encoder parameters as used by PIL (e.g. {"quality": 90}), that overrule the profile
+    :param kwargs: keyword arguments for the task, see odmax.upload.Task, e.g. project, token and options
+    :return: odmax.upload.Task instance, committed
+    """
+    with Task(url, **kwargs) as task:
+        for frame in frames:
+            task.add_frame(
+                frame,
+                prefix=prefix,
+                encoder=encoder,
+                backend=writer,
+                profile=profile,
+                encoder_params=encoder_params
+            )
+    return task
@@ -1,13 +1,15 @@
 import numpy as np
-from scipy.ndimage import map_coordinates
+import cv2
 
-def xyzcube(face_w, overlap=0.):
+def xyzcube(face_w, overlap=0., faces=None, rows=None):
     '''
     Return the xyz cordinates of the unit cube in [F R B L U D] format.
+    faces: list of ints, indices of the faces to return in [F R B L U D] order (default: None, all faces)
+    rows: slice, rows of the faces to return, so that coordinates can be computed in tiles (default: None, all rows)
     '''
-    out = np.zeros((face_w, face_w * 6, 3), np.float32)
     rng = np.linspace(-0.5 - overlap, 0.5 + overlap, num=face_w, dtype=np.float32)
-    grid = np.stack(np.meshgrid(rng, -rng), -1)
+    grid = np.stack(np.meshgrid(rng, -rng[rows if rows is not None else slice(None)]), -1)
+    out = np.zeros((grid.shape[0], face_w * 6, 3), np.float32)
 
     # Front face (z = 0.5)
     out[:, 0*face_w:1*face_w, [0, 1]] = grid
@@ -33,6 +35,8 @@ def xyzcube(face_w, overlap=0.):
     out[:, 5*face_w:6*face_w, [0, 2]] = grid
     out[:, 5*face_w:6*face_w, 1] = -0.5
 
+    if faces is not None:
+        out = np.concatenate([out[:, i*face_w:(i+1)*face_w] for i in faces], axis=1)
     return out
 
 
@@ -50,11 +54,9 @@ def equirect_facetype(h, w):
     tp = np.roll(np.arange(4).repeat(w // 4)[None, :].repeat(h, 0), 3 * w // 8, 1)
 
     # Prepare ceil mask
-    mask = np.zeros((h, w // 4), np.bool)
     idx = np.linspace(-np.pi, np.pi, w // 4) / 4
     idx = h // 2 - np.round(np.arctan(np.cos(idx)) * h / np.pi).astype(int)
-    for i, j in enumerate(idx):
-        mask[:j, i] = 1
+    mask = np.arange(h)[:, None] < idx[None, :]
     mask = np.roll(np.concatenate([mask] * 4, 1), 3 * w // 8, 1)
 
     tp[mask] = 4
@@ -63,6 +65,41 @@ def equirect_facetype(h, w):
     return tp.astype(np.int32)
 
 
+def equirect_facecoor(h, w, face_w, tp=None, block=256):
+    '''
+    Return the face type and the pixel coordinates within that face for each pixel of an equirectangular image,
+    as float32. Coordinates are the inverse of xyzcube without overlap, i.e. 0 and face_w - 1 lie on the cube edges.
+    Rows are computed in blocks, so that no full size float64 temporaries are needed.
+    h: int, height of the equirectangular image
+    w: int, width of the equirectangular image
+    face_w: int, amount of pixels per face
+    tp: ndarray [h, w], face type per pixel as returned by equirect_facetype (default: None, computed)
+    block: int, amount of rows computed at once (default: 256)
+    '''
+    if tp is None:
+        tp = equirect_facetype(h, w)
+    u = np.linspace(-np.pi, np.pi, num=w, dtype=np.float32)
+    v = np.linspace(np.pi, -np.pi, num=h, dtype=np.float32) / 2
+    coor_x = np.empty((h, w), np.float32)
+    coor_y = np.empty((h, w), np.float32)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i in range(0, h, block):
+            t = tp[i:i + block]
+            vb = v[i:i + block, None]
+            # side faces, rotated to the front face
+            a = u[None, :] - np.float32(np.pi / 2) * np.minimum(t, 3)
+            x = np.float32(0.5) * np.tan(a)
+            y = np.float32(-0.5) * np.tan(vb) / np.cos(a)
+            # up and down faces
+            c = np.float32(0.5) * np.tan(np.float32(np.pi / 2) - np.abs(vb))
+            x = np.where(t >= 4, c * np.sin(u[None, :]), x)
+            y = np.where(t == 4, c * np.cos(u[None, :]), y)
+            y = np.where(t == 5, -c * np.cos(u[None, :]), y)
+            coor_x[i:i + block] = (np.clip(x, -0.5, 0.5) + 0.5) * (face_w - 1)
+            coor_y[i:i + block] = (np.clip(y, -0.5, 0.5) + 0.5) * (face_w - 1)
+    return tp, coor_x, coor_y
+
+
 def xyzpers(h_fov, v_fov, u, v, out_hw, in_rot):
     out = np.ones((*out_hw, 3), np.float32)
 
@@ -121,55 +158,91 @@ def coor2uv(coorxy, h, w):
     return np.concatenate([u, v], axis=-1)
 
 
-def sample_equirec(e_img, coor_xy, order):
-    w = e_img.shape[1]
+def sample_equirec(e_img, coor_xy, order, padded=False):
+    # scipy is only needed for the reference sampling backend, import on first use
+    from scipy.ndimage import map_coordinates
     coor_x, coor_y = np.split(coor_xy, 2, axis=-1)
+    if not(padded):
+        e_img = pad_equirec(e_img)
+    # "grid-wrap" interpolates between the last and first column at the seam, "wrap" does not
+    return map_coordinates(e_img, [coor_y, coor_x],
+                           order=order, mode='grid-wrap')[..., 0]
+
+
+def pad_equirec(e_img):
+    '''
+    Pad an equirectangular image with the rows beyond the poles, as needed by sample_equirec. Pad once and pass
+    padded=True to sample_equirec, when many tiles are sampled from the same image.
+    '''
+    w = e_img.shape[1]
     pad_u = np.roll(e_img[[0]], w // 2, 1)
     pad_d = np.roll(e_img[[-1]], w // 2, 1)
-    e_img = np.concatenate([e_img, pad_d, pad_u], 0)
-    return map_coordinates(e_img, [coor_y, coor_x],
-                           order=order, mode='wrap')[..., 0]
-
-
-def sample_cubefaces(cube_faces, tp, coor_y, coor_x, order):
-    cube_faces = cube_faces.copy()
-    cube_faces[1] = np.flip(cube_faces[1], 1)
-    cube_faces[2] = np.flip(cube_faces[2], 1)
-    cube_faces[4] = np.flip(cube_faces[4], 0)
-
-    # Pad up down
-    pad_ud = np.zeros((6, 2, cube_faces.shape[2]))
-    pad_ud[0, 0] = cube_faces[5, 0, :]
-    pad_ud[0, 1] = cube_faces[4, -1, :]
-    pad_ud[1, 0] = cube_faces[5, :, -1]
-    pad_ud[1, 1] = cube_faces[4, ::-1, -1]
-    pad_ud[2, 0] = cube_faces[5, -1, ::-1]
-    pad_ud[2, 1] = cube_faces[4, 0, ::-1]
-    pad_ud[3, 0] = cube_faces[5, ::-1, 0]
-    pad_ud[3, 1] = cube_faces[4, :, 0]
-    pad_ud[4, 0] = cube_faces[0, 0, :]
-    pad_ud[4, 1] = cube_faces[2, 0, ::-1]
-    pad_ud[5, 0] = cube_faces[2, -1, ::-1]
-    pad_ud[5, 1] = cube_faces[0, -1, :]
-    cube_faces = np.concatenate([cube_faces, pad_ud], 1)
-
-    # Pad left right
-    pad_lr = np.zeros((6, cube_faces.shape[1], 2))
-    pad_lr[0, :, 0] = cube_faces[1, :, 0]
-    pad_lr[0, :, 1] = cube_faces[3, :, -1]
-    pad_lr[1, :, 0] = cube_faces[2, :, 0]
-    pad_lr[1, :, 1] = cube_faces[0, :, -1]
-    pad_lr[2, :, 0] = cube_faces[3, :, 0]
-    pad_lr[2, :, 1] = cube_faces[1, :, -1]
-    pad_lr[3, :, 0] = cube_faces[0, :, 0]
-    pad_lr[3, :, 1] = cube_faces[2, :, -1]
-    pad_lr[4, 1:-1, 0] = cube_faces[1, 0, ::-1]
-    pad_lr[4, 1:-1, 1] = cube_faces[3, 0, :]
-    pad_lr[5, 1:-1, 0] = cube_faces[1, -2, :]
-    pad_lr[5, 1:-1, 1] = cube_faces[3, -2, ::-1]
-    cube_faces = np.concatenate([cube_faces, pad_lr], 2)
-
-    return map_coordinates(cube_faces, [tp, coor_y, coor_x], order=order, mode='wrap')
+    return np.concatenate([e_img, pad_d, pad_u], 0)
+
+
+def remap_maps(coor_xy, h, order):
+    '''
+    Convert equirectangular sampling coordinates into fixed-point maps for cv2.remap. Coordinates beyond the poles
+    are clamped to the first and last row, where all pixels represent (nearly) the same location.
+    coor_xy: ndarray in shape of [..., 2]
+    h: int, height of the equirectangular image
+    order: int, 1 for bilinear, 0 for nearest interpolation
+    '''
+    coor_x = np.ascontiguousarray(coor_xy[..., 0], dtype=np.float32)
+    coor_y = np.clip(coor_xy[..., 1], 0, h - 1).astype(np.float32)
+    map1, map2 = cv2.convertMaps(coor_x, coor_y, cv2.CV_16SC2, nninterpolation=(order == 0))
+    return map1, map2
+
+
+def sample_equirec_remap(e_img, map1, map2, order):
+    '''
+    Sample all channels of an equirectangular image at once with cv2.remap. The input dtype is preserved and the
+    seam is wrapped without padding the image.
+    e_img: ndarray in shape of [H, W, C]
+    map1, map2: fixed-point maps, returned by remap_maps
+    order: int, 1 for bilinear, 0 for nearest interpolation
+    '''
+    interpolation = cv2.INTER_LINEAR if order == 1 else cv2.INTER_NEAREST
+    shape = (*map1.shape[:2], *e_img.shape[2:])
+    # cv2.remap cannot handle maps wider than SHRT_MAX, sample these in blocks of columns
+    step = 32766
+    if map1.shape[1] <= step:
+        return cv2.remap(e_img, map1, map2, interpolation, borderMode=cv2.BORDER_WRAP).reshape(shape)
+    out = np.empty(shape, dtype=e_img.dtype)
+    for i in range(0, map1.shape[1], step):
+        out[:, i:i + step] = cv2.remap(
+            e_img,
+            map1[:, i:i + step],
+            None if map2 is None else map2[:, i:i + step],
+            interpolation,
+            borderMode=cv2.BORDER_WRAP
+        ).reshape(out[:, i:i + step].shape)
+    return out
+
+
+def cube_atlas(cube_faces):
+    '''
+    Stack the faces of a cube vertically in one image, each face with a border of one pixel, so that all faces can
+    be sampled at once. Faces are oriented as in equirect_facecoor.
+    cube_faces: ndarray in shape of [6, face_w, face_w, C] or list of 6 faces, in [F R B L U D] order as returned by
+        cube_h2list
+    '''
+    face_w = cube_faces[0].shape[0]
+    atlas = np.empty((6 * (face_w + 2), face_w + 2, *cube_faces[0].shape[2:]), dtype=cube_faces[0].dtype)
+    for i, face in enumerate(cube_faces):
+        if i in [1, 2]:
+            face = np.flip(face, 1)
+        if i == 4:
+            face = np.flip(face, 0)
+        top = i * (face_w + 2)
+        padded = atlas[top:top + face_w + 2]
+        padded[1:-1, 1:-1] = face
+        # border of one pixel, repeating the edges of the face
+        padded[1:-1, 0] = padded[1:-1, 1]
+        padded[1:-1, -1] = padded[1:-1, -2]
+        padded[0] = padded[1]
+        padded[-1] = padded[-2]
+    return atlas
 
 
 def cube_h2list(cube_h):
@@ -0,0 +1,36 @@
+# tests of EXIF tags made from the EXIF template
+import numpy as np
+import piexif
+import pytest
+from odmax import exif
+
+
+@pytest.fixture
+def template():
+    return exif.ExifTemplate({"0th": {piexif.ImageIFD.Make: "GoPro", piexif.ImageIFD.Model: "GoPro Max"}})
+
+
+def test_dump_batch(template):
+    lat, lon, elev = [52.1, -33.5], [4.2, -70.1], [10.5, -12.3]
+    tags = template.dump_batch(lat, lon, elev)
+    for tag, location in zip(tags, zip(lat, lon, elev)):
+        exif_dict = piexif.load(tag)
+        assert (exif_dict["0th"][piexif.ImageIFD.Model] == b"GoPro Max")
+        # the same location as written by piexif
+        reference = piexif.load(exif.dump({"GPS": exif.set_gps_location(*location)}))
+        assert (exif.get_location(exif_dict) == pytest.approx(exif.get_location(reference)))
+        assert (exif.get_location(exif_dict) == pytest.approx(location))
+
+
+def test_dump_batch_missing_elevation(template):
+    tag, = template.dump_batch([52.1], [4.2], [np.nan])
+    gps = piexif.load(tag)["GPS"]
+    assert (gps[piexif.GPSIFD.GPSAltitude] == (0, 10))
+    assert (gps[piexif.GPSIFD.GPSAltitudeRef] == 0)
+    assert (exif.get_location({"GPS": gps}) == pytest.approx((52.1, 4.2, 0.)))
+
+
+@pytest.mark.parametrize("lat, lon", [(np.nan, 4.2), (52.1, np.inf)])
+def test_dump_batch_invalid_location(template, lat, lon):
+    with pytest.raises(ValueError, match="no finite latitude or longitude"):
+        template.dump_batch([52.1, lat], [4.2, lon], [10., 10.])
@@ -0,0 +1,154 @@
+# tests of the GPMF telemetry reader on synthetic payloads and MP4 files
+import struct
+import numpy as np
+import pytest
+from odmax import cache, gpmf, io
+
+SCAL = [10000000, 10000000, 1000, 1000, 100]
+T0 = 1672628645.  # 2023-01-02 03:04:05 UTC
+
+
+def klv(key, value_type, struct_size, repeat, data):
+    # one GPMF item, with data padded to a multiple of 4 bytes
+    return struct.pack(">4scBH", key, value_type, struct_size, repeat) + data + b"\x00" * (-len(data) % 4)
+
+
+def nested(key, items):
+    data = b"".join(items)
+    return klv(key, b"\x00", 1, len(data), data)
+
+
+def payload(lats, lons, elevs, gpsu="230102030405.000"):
+    gps = np.stack([lats, lons, elevs, np.zeros(len(lats)), np.zeros(len(lats))], axis=-1)
+    gps = np.round(gps * SCAL).astype(">i4")
+    return nested(b"DEVC", [
+        klv(b"DVNM", b"c", 1, 9, b"GoPro Max"),
+        nested(b"STRM", [
+            klv(b"SCAL", b"l", 4, 5, np.array(SCAL, dtype=">i4").tobytes()),
+            klv(b"GPSU", b"U", 16, 1, gpsu.encode()),
+            klv(b"GPS5", b"l", 20, len(gps), gps.tobytes()),
+        ]),
+    ])
+
+
+def box(box_type, *content):
+    data = b"".join(content)
+    return struct.pack(">I4s", 8 + len(data), box_type) + data
+
+
+def table(*values):
+    # version and flags, followed by big-endian 32-bit values
+    return struct.pack(f">I{len(values)}I", 0, *values)
+
+
+def mp4(payloads, timescale=1000, duration=1000):
+    # mdat with the telemetry samples, followed by a moov with one GPMF track of one sample per chunk
+    offsets = 8 + np.cumsum([0] + [len(p) for p in payloads[:-1]])
+    n = len(payloads)
+    stbl = box(
+        b"stbl",
+        box(b"stsd", table(1, 16) + b"gpmd" + bytes(8)),
+        box(b"stts", table(1, n, duration)),
+        box(b"stsc", table(1, 1, 1, 1)),
+        box(b"stsz", table(0, n, *[len(p) for p in payloads])),
+        box(b"stco", table(n, *offsets.tolist())),
+    )
+    mdia = box(b"mdia", box(b"mdhd", table(0, 0, timescale, n * duration, 0)), box(b"minf", stbl))
+    return box(b"mdat", *payloads) + box(b"moov", box(b"trak", mdia))
+
+
+@pytest.fixture
+def gps():
+    lats = np.array([52.1, 52.100001, 52.100002])
+    lons = np.array([4.2, 4.200001, 4.200002])
+    elevs = np.array([10.5, 10.6, 10.7])
+    return lats, lons, elevs
+
+
+def test_parse_payload(gps):
+    result = gpmf.parse_payload(payload(*gps))
+    assert (result["gps"] == pytest.approx(np.stack(gps, axis=-1)))
+    assert (result["gpsu"] == T0)
+    assert (result["t"] is None)
+
+
+@pytest.mark.parametrize("size", [4, 40, 100, 130])
+def test_parse_payload_truncated(gps, size):
+    buf = payload(*gps)[:size]
+    try:
+        gpmf.parse_payload(buf)
+    except gpmf.PAYLOAD_ERRORS:
+        pass
+
+
+def test_parse_payload_corrupt(gps):
+    # damaged payloads are either read, or raise one of the errors that get_gps_track skips
+    buf = payload(*gps)
+    rng = np.random.default_rng(0)
+    for _ in range(2000):
+        damaged = bytearray(buf)
+        for i in rng.integers(0, len(buf), 3):
+            damaged[i] = rng.integers(0, 256)
+        try:
+            gpmf.parse_payload(bytes(damaged))
+        except gpmf.PAYLOAD_ERRORS:
+            pass
+
+
+def test_get_gps_track(tmp_path, gps):
+    fn = tmp_path / "telemetry.mp4"
+    fn.write_bytes(mp4([payload(*gps), payload(*gps, gpsu="230102030406.000")]))
+    lats, lons, elevs, timestamps = gpmf.get_gps_track(str(fn))
+    assert (lats == pytest.approx(np.tile(gps[0], 2)))
+    assert (lons == pytest.approx(np.tile(gps[1], 2)))
+    assert (elevs == pytest.approx(np.tile(gps[2], 2)))
+    # samples are spread evenly between the GPSU time stamps of the payloads, and over the sample duration at the end
+    assert (timestamps == pytest.approx(T0 + np.arange(6) / 3))
+    assert (gpmf.get_device_name(str(fn)) == "GoPro Max")
+
+
+def test_get_gps_track_damaged_sample(tmp_path, gps):
+    # a telemetry sample with more GPS5 samples announced than it holds is skipped, the other samples are read
+    damaged = bytearray(payload(*gps))
+    i = damaged.index(b"GPS5")
+    damaged[i + 6:i + 8] = struct.pack(">H", 100)
+    damaged = bytes(damaged)
+    fn = tmp_path / "telemetry.mp4"
+    fn.write_bytes(mp4([damaged, payload(*gps, gpsu="230102030406.000")]))
+    with pytest.raises(gpmf.PAYLOAD_ERRORS):
+        gpmf.parse_payload(damaged)
+    lats, lons, elevs, timestamps = gpmf.get_gps_track(str(fn))
+    assert (lats == pytest.approx(gps[0]))
+    assert (timestamps == pytest.approx(T0 + 1 + np.arange(3) / 3))
+
+
+def test_get_gps_track_no_mp4(tmp_path):
+    fn = tmp_path / "video.mp4"
+    fn.write_bytes(b"not an mp4 file")
+    assert (gpmf.get_gps_track(str(fn)) is None)
+    assert (gpmf.get_device_name(str(fn)) is None)
+
+
+def test_device_name_cached(tmp_path, gps, monkeypatch):
+    # the device name is stored with the GPS track, reopening a cached video does not read its telemetry
+    fn = tmp_path / "telemetry.mp4"
+    fn.write_bytes(mp4([payload(*gps)]))
+    cache_dir = str(tmp_path / "cache")
+    track = io.get_gps_track(str(fn), cache_dir=cache_dir)
+
+    def get_samples(f):
+        raise AssertionError("telemetry of a cached video is read")
+    monkeypatch.setattr(gpmf, "get_samples", get_samples)
+    assert (io.get_device_name(str(fn), cache_dir=cache_dir) == "GoPro Max")
+    for a, b in zip(io.get_gps_track(str(fn), cache_dir=cache_dir), track):
+        assert (np.array_equal(a, b))
+
+
+def test_device_name_cached_none(tmp_path):
+    # videos without device name are cached as such
+    fn = tmp_path / "video.mp4"
+    fn.write_bytes(b"not an mp4 file")
+    cache_dir = str(tmp_path / "cache")
+    cache.save_track(str(fn), *[np.array([])] * 4, cache_dir=cache_dir)
+    assert (cache.load_device_name(str(fn), cache_dir=cache_dir) == "")
+    assert (io.get_device_name(str(fn), cache_dir=cache_dir) is None)
@@ -0,0 +1,119 @@
+# tests of the long-running exiftool process of odmax.helpers, with a stand-in script for the exiftool -stay_open protocol
+import os
+import stat
+import sys
+import threading
+import pytest
+from odmax import helpers
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the stand-in exiftool is a script with a shebang")
+
+# stand-in for exiftool -stay_open True -@ -. Arguments are read line by line until -execute, and echoed on stdout,
+# followed by {ready}. The argument --stderr=<n> writes n bytes of warnings to stderr first, as exiftool does for many
+# warnings, --crash stops the process. -echo4 writes its argument to stderr at the end of the command.
+STAND_IN = r'''#!{python}
+import os
+import sys
+
+args = []
+for line in sys.stdin:
+    line = line.rstrip("\n")
+    if line == "-execute":
+        for arg in args:
+            if arg.startswith("--stderr="):
+                n = int(arg.split("=")[1])
+                line = b"Warning: [minor] Unrecognized data\n"
+                sys.stderr.buffer.write((line * (n // len(line) + 1))[:n])
+            if arg == "--crash":
+                sys.exit(1)
+        files = [a for i, a in enumerate(args) if not(a.startswith("-")) and args[i - 1:i] != ["-echo4"]]
+        sys.stdout.write(f"pid {{os.getpid()}}: {{' '.join(files)}}\n")
+        sys.stdout.write("{{ready}}\n")
+        sys.stdout.flush()
+        if "-echo4" in args:
+            sys.stderr.write(args[args.index("-echo4") + 1] + "\n")
+        sys.stderr.flush()
+        args = []
+    elif args[-1:] == ["-stay_open"] and line == "False":
+        break
+    else:
+        args.append(line)
+'''
+
+
+@pytest.fixture
+def exiftool(tmp_path):
+    fn = tmp_path / "exiftool"
+    fn.write_text(STAND_IN.format(python=sys.executable))
+    fn.chmod(fn.stat().st_mode | stat.S_IEXEC)
+    tool = helpers.ExifTool(executable=str(fn))
+    yield tool
+    tool.terminate()
+
+
+def execute(tool, *args, timeout=20.):
+    # run in a thread, so that a hanging exiftool process fails the test instead of blocking the test run
+    result = {}
+
+    def run():
+        try:
+            result["output"] = tool.execute(*args)
+        except Exception as e:
+            result["error"] = e
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        tool._process.kill()
+        pytest.fail(f"exiftool did not respond within {timeout} seconds")
+    if "error" in result:
+        raise result["error"]
+    return result["output"]
+
+
+def test_execute(exiftool):
+    stdout, stderr = execute(exiftool, "-ee", "video.mp4")
+    assert (stdout.strip().endswith(b"video.mp4"))
+    assert (stderr == b"")
+    # the same process is used for the next call
+    pid = stdout.split(b":")[0]
+    stdout, _ = execute(exiftool, "other.mp4")
+    assert (stdout.strip() == pid + b": other.mp4")
+
+
+def test_execute_large_stderr(exiftool):
+    # more warnings than fit in a pipe buffer
+    n = 4 * 1024 ** 2
+    stdout, stderr = execute(exiftool, "--stderr={:d}".format(n), "video.mp4")
+    assert (stdout.strip().endswith(b"video.mp4"))
+    assert (len(stderr) == n)
+    assert (stderr.startswith(b"Warning:"))
+    stdout, stderr = execute(exiftool, "video.mp4")
+    assert (stdout.strip().endswith(b"video.mp4"))
+    assert (stderr == b"")
+
+
+def test_execute_stopped(exiftool):
+    with pytest.raises(IOError, match="stopped unexpectedly"):
+        execute(exiftool, "--crash", "video.mp4")
+    # a new process is started on the next call
+    stdout, _ = execute(exiftool, "video.mp4")
+    assert (stdout.strip().endswith(b"video.mp4"))
+
+
+def test_terminate(exiftool):
+    execute(exiftool, "video.mp4")
+    process = exiftool._process
+    exiftool.terminate()
+    assert (process.poll() == 0)
+    assert not(exiftool.running)
+    stdout, _ = execute(exiftool, "video.mp4")
+    assert (stdout.strip().endswith(b"video.mp4"))
+    assert (exiftool.running)
+
+
+def test_forked_child(exiftool):
+    execute(exiftool, "video.mp4")
+    # a child process does not share the exiftool process of its parent
+    exiftool._pid = os.getpid() + 1
+    assert not(exiftool.running)
@@ -0,0 +1,52 @@
+# tests of writing frames to files
+import errno
+import os
+import numpy as np
+import pytest
+from PIL import Image
+from odmax import io
+
+
+@pytest.fixture
+def img():
+    return np.random.default_rng(0).integers(0, 255, (64, 128, 3), dtype=np.uint8)
+
+
+class FullDisk:
+    # file that is opened, but cannot be written to
+    def __init__(self, fn, mode):
+        self.f = open(fn, mode)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.f.close()
+
+    def write(self, data):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+
+@pytest.mark.parametrize("backend, encoder", [("opencv", "jpg"), ("pil", "jpg"), ("pil", "png")])
+def test_write_frame(tmp_path, img, backend, encoder):
+    fn = str(tmp_path / f"still.{encoder}")
+    io.write_frame(img, fn, encoder=encoder, backend=backend)
+    assert (os.listdir(tmp_path) == [f"still.{encoder}"])
+    assert (os.path.getsize(fn) > 0)
+
+
+def test_write_frame_disk_full(tmp_path, img, monkeypatch):
+    monkeypatch.setattr(io, "open", FullDisk, raising=False)
+    with pytest.raises(OSError):
+        io.write_frame(img, str(tmp_path / "still.jpg"), backend="opencv")
+    assert (os.listdir(tmp_path) == [])
+
+
+def test_write_frame_pil_failed(tmp_path, img, monkeypatch):
+    def save(im, fp, filename):
+        fp.write(b"\x89PNG")
+        raise OSError("encoder error")
+    monkeypatch.setitem(Image.SAVE, "PNG", save)
+    with pytest.raises(OSError):
+        io.write_frame(img, str(tmp_path / "still.png"), encoder="png", backend="pil")
+    assert (os.listdir(tmp_path) == [])
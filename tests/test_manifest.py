@@ -0,0 +1,24 @@
+# tests of the manifest of written frames
+import pytest
+from odmax import manifest
+
+SIGNATURE = {"file": "walk.mp4", "encoder": "jpg", "face_w": 512, "faces": [0, 1, 2, 3]}
+
+
+def test_resume(tmp_path):
+    m = manifest.Manifest(str(tmp_path), signature=SIGNATURE)
+    m.add(0, [])
+    m = manifest.Manifest(str(tmp_path), signature=SIGNATURE)
+    assert (m.todo([0, 3]) == [3])
+
+
+def test_signature_mismatch(tmp_path):
+    manifest.Manifest(str(tmp_path), signature=SIGNATURE)
+    with pytest.raises(ValueError) as e:
+        manifest.Manifest(str(tmp_path), signature=dict(SIGNATURE, encoder="png", faces=[0]))
+    # only the changed options are named, with the option to write all frames again
+    assert ("(encoder, faces)" in str(e.value))
+    assert ("--overwrite" in str(e.value))
+    assert ("walk.mp4" not in str(e.value))
+    m = manifest.Manifest(str(tmp_path), signature=dict(SIGNATURE, encoder="png"), overwrite=True)
+    assert (m.signature["encoder"] == "png")
@@ -0,0 +1,48 @@
+# tests of reprojection plans persisted in a plan cache directory
+import os
+import numpy as np
+import pytest
+from odmax import plan
+
+SHAPE = (64, 128)
+
+
+@pytest.fixture(autouse=True)
+def clear_plans():
+    plan.clear_plans()
+    yield
+    plan.clear_plans()
+
+
+def test_get_plan_cache_dir(tmp_path):
+    p = plan.get_plan(SHAPE, face_w=32, cache_dir=str(tmp_path))
+    # only the plan is written, without temporary files
+    assert (os.listdir(tmp_path) == [os.path.basename(plan.plan_fn(p.key, str(tmp_path)))])
+    plan.clear_plans()
+    cached = plan.get_plan(SHAPE, face_w=32, cache_dir=str(tmp_path))
+    assert (np.array_equal(cached.maps[0], p.maps[0]))
+
+
+def test_get_plan_truncated(tmp_path):
+    # a partially written plan, e.g. of a killed process, is computed and written again
+    p = plan.get_plan(SHAPE, face_w=32, cache_dir=str(tmp_path))
+    fn = plan.plan_fn(p.key, str(tmp_path))
+    with open(fn, "rb") as f:
+        data = f.read()
+    with open(fn, "wb") as f:
+        f.write(data[:len(data) // 2])
+    plan.clear_plans()
+    cached = plan.get_plan(SHAPE, face_w=32, cache_dir=str(tmp_path))
+    assert (np.array_equal(cached.maps[0], p.maps[0]))
+    assert (os.path.getsize(fn) == len(data))
+
+
+def test_to_file_failed(tmp_path, monkeypatch):
+    def savez(f, **arrays):
+        f.write(b"PK")
+        raise OSError("No space left on device")
+    p = plan.ReprojectionPlan(*SHAPE, face_w=32)
+    monkeypatch.setattr(np, "savez", savez)
+    with pytest.raises(OSError):
+        p.to_file(str(tmp_path / "plan.npz"))
+    assert (os.listdir(tmp_path) == [])
@@ -0,0 +1,91 @@
+# tests of the opencv sampling backend against the scipy reference implementation
+import os
+import cv2
+import numpy as np
+import pytest
+from odmax import plan, py360
+
+REFERENCE_FRAME = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "GS__2098.JPG")
+# maximum and mean absolute difference in grey values between the backends, with bilinear interpolation
+MAX_DIFF = 4
+MEAN_DIFF = 0.25
+# maximum fraction of pixels that differ between the backends with nearest interpolation, where coordinates at exactly
+# half a pixel may be rounded to either neighbour. This happens mostly at the poles, where all pixels of the first and
+# last row of an equirectangular image are sampled at the same point
+NEAREST_DIFF = 0.01
+
+
+@pytest.fixture(autouse=True)
+def clear_plans():
+    plan.clear_plans()
+    yield
+    plan.clear_plans()
+
+
+@pytest.fixture(scope="module")
+def img():
+    return cv2.imread(REFERENCE_FRAME)
+
+
+def ramp(h, w):
+    # horizontal ramp from 0 to 255, with the largest jump in value at the seam at -180 / 180 degrees longitude
+    return np.tile(np.linspace(0, 255, w).astype(np.uint8)[None, :, None], (h, 1, 3))
+
+
+def compare(a, b, mode):
+    diff = np.abs(a.astype("int") - b.astype("int"))
+    if mode == "bilinear":
+        assert (diff.max() <= MAX_DIFF), f"maximum difference {diff.max()} larger than {MAX_DIFF}"
+        assert (diff.mean() <= MEAN_DIFF), f"mean difference {diff.mean()} larger than {MEAN_DIFF}"
+    else:
+        assert ((diff > 0).mean() <= NEAREST_DIFF), f"fraction of different pixels {(diff > 0).mean()} larger than {NEAREST_DIFF}"
+
+
+@pytest.mark.parametrize("mode", ["bilinear", "nearest"])
+def test_e2c(img, mode):
+    faces = {
+        backend: py360.e2c(img, face_w=512, mode=mode, cube_format="list", overlap=0.1, backend=backend)
+        for backend in ["opencv", "scipy"]
+    }
+    for a, b in zip(faces["opencv"], faces["scipy"]):
+        assert (a.dtype == b.dtype and a.shape == b.shape)
+        compare(a, b, mode)
+
+
+@pytest.mark.parametrize("mode", ["bilinear", "nearest"])
+def test_e2c_seam(mode):
+    # the back face is sampled across the seam, which must wrap around instead of repeating the edge columns. With an
+    # odd face width, the middle column of the back face is sampled at 180 degrees, between the last and first column
+    img = ramp(512, 1024)
+    back = {
+        backend: py360.e2c(img, face_w=255, mode=mode, cube_format="list", overlap=0.1, backend=backend)[2]
+        for backend in ["opencv", "scipy"]
+    }
+    compare(back["opencv"], back["scipy"], mode)
+    if mode == "bilinear":
+        # the middle column is blended from the last (255) and first (0) column of the image
+        for face in back.values():
+            assert (np.abs(face[:, 127].astype("float") - 127.5).max() <= 1)
+
+
+@pytest.mark.parametrize("mode", ["bilinear", "nearest"])
+def test_e2p_seam(mode):
+    img = ramp(512, 1024)
+    views = {
+        backend: py360.e2p(img, 30., 180., 0., (64, 256), mode=mode, backend=backend)
+        for backend in ["opencv", "scipy"]
+    }
+    compare(views["opencv"], views["scipy"], mode)
+    if mode == "bilinear":
+        # columns that are sampled between the last and first column of the image are blended over the seam
+        assert (np.any((views["opencv"] > 10) & (views["opencv"] < 245)))
+
+
+@pytest.mark.parametrize("mode", ["bilinear", "nearest"])
+def test_c2e(img, mode):
+    cube = py360.e2c(img, face_w=512, mode=mode, cube_format="list")
+    equirect = {
+        backend: py360.c2e(cube, 512, 1024, mode=mode, cube_format="list", backend=backend)
+        for backend in ["opencv", "scipy"]
+    }
+    compare(equirect["opencv"], equirect["scipy"], mode)
@@ -0,0 +1,257 @@
+# tests of odmax.upload against a local stand-in for the NodeODM and WebODM task API
+import json
+import re
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import default
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import pytest
+from odmax import upload
+
+TOKEN = "secret"
+JWT = "jwt-token"
+USERNAME = "user"
+PASSWORD = "password"
+
+
+def parse_multipart(content_type, body):
+    msg = BytesParser(policy=default).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    fields, files = {}, []
+    for part in msg.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if part.get_filename():
+            files.append((name, part.get_filename(), part.get_payload(decode=True)))
+        else:
+            fields[name] = part.get_content()
+    return fields, files
+
+
+class StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.lock = threading.Lock()
+        self.tasks = {}
+        self.requests = []
+        # behaviour of upload requests: n-th requests that fail with 503 or drop the connection, status of all
+        # uploads, and time spent on each upload
+        self.fail = set()
+        self.drop = set()
+        self.status = 200
+        self.delay = 0.
+        self.uploads = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, result):
+        data = json.dumps(result).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            fields, files = parse_multipart(content_type, body)
+        else:
+            fields, files = {k: v[0] for k, v in parse_qs(body.decode()).items()}, []
+        path = parts.path
+        with server.lock:
+            server.requests.append(path)
+        if path == "/api/token-auth/":
+            if fields.get("username") == USERNAME and fields.get("password") == PASSWORD:
+                return self.reply(200, {"token": JWT})
+            return self.reply(400, {"non_field_errors": ["Unable to log in"]})
+        if path.startswith("/task/"):
+            if query.get("token") != [TOKEN]:
+                return self.reply(200, {"error": "Invalid authentication token"})
+        elif self.headers.get("Authorization") != f"JWT {JWT}":
+            return self.reply(403, {"detail": "Authentication credentials were not provided."})
+        if path == "/task/new/init" or re.match(r"^/api/projects/\d+/tasks/$", path):
+            with server.lock:
+                task_id = f"task{len(server.tasks)}"
+                server.tasks[task_id] = {"fields": fields, "files": {}, "committed": False}
+            return self.reply(200, {"uuid": task_id} if path.startswith("/task/") else {"id": task_id})
+        match = re.match(r"^/task/new/(upload|commit)/(\w+)$", path)
+        if match:
+            action, task_id = match.groups()
+        else:
+            task_id, action = re.match(r"^/api/projects/\d+/tasks/(\w+)/(upload|commit)/$", path).groups()
+        task = server.tasks[task_id]
+        if action == "commit":
+            task["committed"] = True
+            return self.reply(200, {"uuid": task_id})
+        with server.lock:
+            server.uploads += 1
+            n = server.uploads
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if n in server.drop:
+                # connection dropped without a response
+                self.close_connection = True
+                return
+            if n in server.fail:
+                return self.reply(503, {"error": "Service unavailable"})
+            time.sleep(server.delay)
+            if server.status != 200:
+                return self.reply(server.status, {"error": "Upload failed"})
+            with server.lock:
+                task["files"].update({fn: data for _, fn, data in files})
+            return self.reply(200, {"success": True})
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+@pytest.fixture
+def server():
+    server = StandIn()
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def images(n):
+    return [(f"still_{i:04d}.jpg", f"image {i}".encode()) for i in range(n)]
+
+
+def fast_retries(task):
+    # retry without waiting a second
+    task.client.backoff = 0.01
+    return task
+
+
+def test_nodeodm(server):
+    task = upload.Task(server.url, token=TOKEN, name="walk", options={"camera-lens": "spherical"}, chunk_size=3)
+    with task:
+        for fn, data in images(10):
+            task.add(fn, data)
+    (task_id, received), = server.tasks.items()
+    assert (task.id == task_id)
+    assert (received["fields"]["name"] == "walk")
+    assert (json.loads(received["fields"]["options"]) == [{"name": "camera-lens", "value": "spherical"}])
+    assert (received["files"] == dict(images(10)))
+    assert (received["committed"])
+    assert (task.uploaded == 10)
+    assert (server.requests.count(f"/task/new/upload/{task_id}") == 4)
+    assert (server.requests[-1] == f"/task/new/commit/{task_id}")
+
+
+def test_webodm(server):
+    task = upload.Task(server.url, project=1, username=USERNAME, password=PASSWORD, chunk_size=4)
+    with task:
+        for fn, data in images(6):
+            task.add(fn, data)
+    received = server.tasks[task.id]
+    assert (server.requests[:2] == ["/api/token-auth/", "/api/projects/1/tasks/"])
+    assert (received["fields"]["partial"] == "true")
+    assert (received["files"] == dict(images(6)))
+    assert (received["committed"])
+    assert (server.requests[-1] == f"/api/projects/1/tasks/{task.id}/commit/")
+
+
+def test_webodm_login_failed(server):
+    with pytest.raises(IOError):
+        upload.Task(server.url, project=1, username=USERNAME, password="wrong")
+
+
+def test_nodeodm_invalid_token(server):
+    task = upload.Task(server.url, token="wrong")
+    with pytest.raises(IOError, match="Invalid authentication token"):
+        task.create()
+    task.close()
+
+
+def test_retry_status(server):
+    server.fail = {1, 3, 4}
+    task = fast_retries(upload.Task(server.url, token=TOKEN, chunk_size=2, connections=1))
+    with task:
+        for fn, data in images(8):
+            task.add(fn, data)
+    received = server.tasks[task.id]
+    assert (received["files"] == dict(images(8)))
+    assert (received["committed"])
+    assert (server.uploads == 7)
+
+
+def test_retry_dropped_connection(server):
+    server.drop = {2, 5}
+    task = fast_retries(upload.Task(server.url, token=TOKEN, chunk_size=2, connections=2))
+    with task:
+        for fn, data in images(8):
+            task.add(fn, data)
+    received = server.tasks[task.id]
+    assert (received["files"] == dict(images(8)))
+    assert (received["committed"])
+    assert (server.uploads == 6)
+
+
+def test_in_flight(server):
+    server.delay = 0.05
+    task = upload.Task(server.url, token=TOKEN, chunk_size=1, connections=4, max_in_flight=2)
+    with task:
+        for fn, data in images(12):
+            task.add(fn, data)
+    assert (server.max_in_flight == 2)
+    assert (len(server.tasks[task.id]["files"]) == 12)
+
+
+def test_failed_upload_not_committed(server):
+    server.status = 500
+    task = fast_retries(upload.Task(server.url, token=TOKEN, chunk_size=2, retries=1))
+    with pytest.raises(IOError):
+        with task:
+            for fn, data in images(4):
+                task.add(fn, data)
+    assert not(server.tasks[task.id]["committed"])
+    assert not(any(path.startswith("/task/new/commit") for path in server.requests))
+
+
+def test_failed_upload_stops_adding(server):
+    server.status = 500
+    task = fast_retries(upload.Task(server.url, token=TOKEN, chunk_size=1, connections=1, max_in_flight=1, retries=0))
+    with pytest.raises(IOError):
+        for fn, data in images(10):
+            task.add(fn, data)
+    task.close()
+    assert (server.uploads < 10)
+    assert not(server.tasks[task.id]["committed"])
+
+
+def test_close_discards(server):
+    # closing without committing waits for the request being sent, and discards queued and collected images
+    server.delay = 0.2
+    task = upload.Task(server.url, token=TOKEN, chunk_size=1, connections=1, max_in_flight=10)
+    for fn, data in images(5):
+        task.add(fn, data)
+    time.sleep(0.1)
+    t0 = time.perf_counter()
+    task.close()
+    assert (time.perf_counter() - t0 < 0.5)
+    assert (server.uploads == 1)
+    assert (task.uploaded == 1)
+    assert not(server.tasks[task.id]["committed"])